@@ -2,15 +2,16 @@ from flask import Flask, request, abort, jsonify
 from linebot.v3 import WebhookHandler
 from linebot.v3.exceptions import InvalidSignatureError
 from linebot.v3.messaging import (
-    Configuration, ApiClient, MessagingApi,
-    ReplyMessageRequest, TextMessage, FlexMessage, FlexContainer
+    TextMessage, FlexMessage
 )
 from linebot.v3.webhooks import MessageEvent, TextMessageContent
 import os
 import sys
 import logging
-from datetime import datetime, timedelta
+import time
+from collections import OrderedDict
 from threading import Lock
+from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
 
 logging.basicConfig(
@@ -19,6 +20,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# بداية preload: كل ما يلي حتى lifecycle.preloaded يعمل مرة واحدة في الـ master
+PRELOAD_STARTED = time.perf_counter()
+
 app = Flask(__name__)
 
 LINE_TOKEN = os.getenv('LINE_CHANNEL_ACCESS_TOKEN')
@@ -28,12 +32,23 @@ if not LINE_TOKEN or not LINE_SECRET:
     logger.error("Missing LINE credentials")
     sys.exit(1)
 
-configuration = Configuration(access_token=LINE_TOKEN)
 handler = WebhookHandler(LINE_SECRET)
 
-from database import DB
+from database import DB, DB_PATH
 from ui import UI
 from text_commands import TextCommands
+from session_store import create_session_store
+from dispatcher import EventDispatcher
+from line_client import LineClient
+from line_messages import RawFlexContainer, flex_message, text_message
+import normalize
+import content
+from router import CommandRouter, Route
+from timers import ExpiryTimer
+from watcher import ReloadWatcher
+from jobs import JobRunner
+import lifecycle
+from outbound import outbound
 from games import (
     CategoryGame, FastGame, CompatibilityGame, SongGame,
     OppositeGame, ChainGame, LettersGame, RiddleGame,
@@ -42,14 +57,17 @@ from games import (
 
 DB.init()
 TextCommands.load_all()
+content.preload()
+LineClient.configure(LINE_TOKEN)
+
+# مهلة اللعبة من آخر نشاط في المجموعة (30 دقيقة)
+GAME_TIMEOUT_MINUTES = 30
 
-# إصلاح: lock موحد لحماية كل الحالات المشتركة
-_state_lock = Lock()
+# الحالة المشتركة (الألعاب، الانتظار، الصامتون، الثيمات) في مخزن قابل للمشاركة بين workers
+sessions = create_session_store(ttl=GAME_TIMEOUT_MINUTES * 60)
 
-game_sessions = {}
-waiting_for_name = set()
-user_themes = {}
-silent_users = set()
+WAITING_FOR_NAME = 'waiting_for_name'
+SILENT_USERS = 'silent_users'
 
 TEXT_COMMANDS = {
     'سؤال': 'questions',
@@ -79,194 +97,380 @@ GAME_MAP = {
     'حرف': LetterGame
 }
 
-# إصلاح: timeout للألعاب المتروكة (30 دقيقة)
-GAME_TIMEOUT_MINUTES = 30
+START_COMMANDS = ('بداية', 'start', 'ابدا')
+# الأوامر التي تعيد المستخدم المنسحب
+REACTIVATE_COMMANDS = frozenset(('تسجيل',) + START_COMMANDS)
+
+# جدول الأوامر يبنى مرة واحدة - كل نص آخر اجابة محتملة لللعبة
+router = CommandRouter()
+router.add(Route.TEXT, TEXT_COMMANDS)
+router.add(Route.START, START_COMMANDS)
+router.add(Route.HELP, ('مساعدة', 'help', 'مساعده'))
+router.add(Route.TEXTS_MENU, ('نص', 'نصوص'))
+router.add(Route.GAMES_MENU, ('العاب', 'ألعاب', 'الالعاب'))
+router.add(Route.REGISTER, ('تسجيل', 'تغيير'))
+router.add(Route.STATS, ('نقاطي',))
+router.add(Route.LEADERBOARD, ('الصدارة', 'صدارة'))
+router.add(Route.GROUP_LEADERBOARD, ('صدارة المجموعة', 'صدارة المجموعه'))
+router.add(Route.GAME_LEADERBOARD, {f'صدارة {name}': name for name in GAME_MAP})
+router.add(Route.THEME, ('ثيم',))
+router.add(Route.WITHDRAW, ('انسحب',))
+router.add(Route.STOP, ('ايقاف',))
+router.add(Route.GAME_START, {name: name for name in GAME_MAP})
+
+# بطاقات الصدارة الجاهزة: (scope, theme) -> (version, RawFlexContainer)
+LEADERBOARD_CACHE_SIZE = 256
+leaderboard_cache = OrderedDict()
+leaderboard_lock = Lock()
+
+# وضع استقبال webhook: sync (المعالجة قبل الرد على LINE) او async (طابور + workers)
+# في الوضعين تمر الأحداث عبر نفس الـ dispatcher فتعالج أحداث كل مجموعة بالتسلسل داخل
+# الـ worker - وبين الـ workers يحمي المخزن المشترك كل تعديل بنسخة اللعبة (set_game)
+WEBHOOK_MODE = os.getenv('WEBHOOK_MODE', 'sync').strip().lower()
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '0')) or None
+WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))
+
+# محاولات حفظ اللعبة عندما يغيرها طلب في worker آخر بين قراءتها وحفظها
+GAME_WRITE_ATTEMPTS = 5
 
 scheduler = BackgroundScheduler()
 
 
 def cleanup_inactive_users():
-    """حذف المستخدمين غير النشطين بعد 7 أيام"""
+    """حذف المستخدمين غير النشطين بعد 7 أيام - الأخطاء تسجل في jobs"""
+    deleted = DB.cleanup_inactive_users(days=7)
+    logger.info(f"Cleanup: Removed {deleted} inactive users")
+
+
+def expire_game(group_id):
+    """انتهاء مهلة اللعبة: حذفها وابلاغ المجموعة، او اعادة الجدولة اذا مددت"""
+    game, deadline = sessions.expire_game(group_id, LineClient.api())
+    if game is None:
+        if deadline is not None:
+            game_timer.schedule(group_id, deadline)
+        return
+    logger.info(f"Game {game.game_name} in {group_id} timed out")
+    outbound.push(LineClient.api(), group_id, [text_message(
+        f"انتهت لعبة {game.game_name} لعدم النشاط\nلبدء لعبة جديدة اكتب: العاب", UI.get_quick_reply()
+    )])
+
+
+# موعد لكل لعبة نشطة - تنتهي بعد ثوان من مهلتها بدل فحص كل الجلسات
+game_timer = ExpiryTimer(expire_game, name="game-expiry")
+
+
+def touch_game(group_id):
+    deadline = sessions.touch_game(group_id)
+    if deadline is not None:
+        game_timer.schedule(group_id, deadline)
+
+
+def end_game_session(group_id):
+    game_timer.cancel(group_id)
+    question_timer.cancel(group_id)
+    return sessions.pop_game(group_id)
+
+
+def save_game(group_id, game):
+    """حفظ اللعبة بعد تعديلها - False اذا غيرها او حذفها طلب آخر منذ قراءتها"""
+    if not sessions.set_game(group_id, game):
+        return False
+    arm_question_timer(group_id, game)
+    return True
+
+
+def finish_game(game, group_id, result):
+    """نهاية اللعبة بالاجابة الأخيرة او انتهاء مهلة السؤال او الانسحاب
+
+    تسجل نقاط كل لاعب من game.scores، والفائز صاحب أعلى نقاط كما في بطاقة النتيجة.
+    ترجع False اذا تغيرت اللعبة منذ قراءتها، فلا تنتهي ولا تسجل نقاطها مرتين.
+    """
+    if not sessions.pop_game(group_id, game):
+        return False
+    game_timer.cancel(group_id)
+    question_timer.cancel(group_id)
+    if result.get('withdrawn'):
+        return True
+    players = sorted(game.scores.items(), key=lambda item: -item[1]['score'])
+    for rank, (uid, entry) in enumerate(players):
+        if entry['score'] > 0:
+            won = rank == 0 and result.get('won', True)
+            DB.add_points(uid, entry['score'], won, game.game_name, group_id)
+    return True
+
+
+def send_pushes(line_api, result):
+    """رسائل الخاص من نتيجة اللعبة ({"pushes": {المستلم: رسائل}}) - بعد حفظها فقط
+
+    on_pushed يستدعى بعد انتهاء الارسال بـ {المستلم: وصلت}.
+    """
+    pushes = result.get('pushes')
+    if not pushes:
+        return
+    deliveries = {to: outbound.push(line_api, to, messages) for to, messages in pushes.items()}
+    if result.get('on_pushed'):
+        outbound.when_done(deliveries, result['on_pushed'])
+
+
+def question_timeout(group_id):
+    # على shard المجموعة نفسه حتى لا تتزامن المهلة مع اجابة تعالج الآن
+    if event_dispatcher.submit(group_id, expire_question, group_id) is None:
+        logger.warning(f"Question timeout for {group_id} dropped - queue full")
+
+
+def expire_question(group_id):
+    """انتهاء مهلة السؤال: اظهار الجواب وارسال السؤال التالي عبر push"""
+    line_api = LineClient.api()
+    for _ in range(GAME_WRITE_ATTEMPTS):
+        game = sessions.get_game(group_id, line_api)
+        # الموعد تغير (سؤال جديد) - المؤقت الجديد مجدول من مكان تغييره
+        if game is None or game.question_deadline is None or game.question_deadline > time.time():
+            return
+        game.group_id = group_id
+        result = game.handle_timeout()
+        if not result:
+            return
+        if result.get('game_over'):
+            saved = finish_game(game, group_id, result)
+        else:
+            saved = save_game(group_id, game)
+        if saved:
+            outbound.push(line_api, group_id, [
+                text_message(f"انتهى الوقت - الاجابة: {game.previous_answer}"),
+                result['response']
+            ])
+            return
+    logger.warning(f"Question timeout in {group_id} dropped - game kept changing")
+
+
+# مؤقت واحد لمهلة الأسئلة في كل المجموعات
+question_timer = ExpiryTimer(question_timeout, name="question-timer")
+
+
+def arm_question_timer(group_id, game):
+    deadline = game.question_deadline
+    if deadline is not None:
+        question_timer.schedule(group_id, deadline)
+
+
+def sweep_expired_games():
+    """احتياط للألعاب التي لا يوجد لها موعد في هذه العملية (مثل worker أعيد تشغيله)"""
     try:
-        deleted = DB.cleanup_inactive_users(days=7)
-        logger.info(f"Cleanup: Removed {deleted} inactive users")
+        expired = sessions.expired_groups(time.time())
     except Exception as e:
-        logger.error(f"Cleanup error: {e}")
+        logger.error(f"Expired games sweep error: {e}")
+        return
+    for group_id in expired:
+        try:
+            expire_game(group_id)
+        except Exception as e:
+            logger.error(f"Game expiry error for {group_id}: {e}")
+
 
+# المجدول يعمل في worker واحد فقط (القائد) - الـ master لا يعالج الطلبات
+# والمهام تعمل على قاعدة البيانات والمخزن المشترك فلا تتكرر في كل worker
+SCHEDULER_LOCK = os.getenv('SCHEDULER_LOCK') or os.path.join(
+    os.path.dirname(os.path.abspath(DB_PATH)), '.scheduler.lock'
+)
+jobs = JobRunner(scheduler, SCHEDULER_LOCK)
+# التنظيف اليومي يحجز في جدول jobs: مرة واحدة حتى مع عدة مضيفات على نفس القرص
+jobs.add(cleanup_inactive_users, 'cron', min_interval=20 * 3600,
+         hour=3, minute=0, misfire_grace_time=3600)
+# انهاء الألعاب ذري في المخزن فلا يحتاج حجزا
+jobs.add(sweep_expired_games, 'interval', minutes=5)
 
-def cleanup_stale_games():
-    """إصلاح: حذف الألعاب المتروكة أكثر من 30 دقيقة"""
-    cutoff = datetime.now() - timedelta(minutes=GAME_TIMEOUT_MINUTES)
-    stale_groups = []
+# خيط لكل worker يعيد تحميل بنوك الألعاب وملفات النصوص عند تغيرها (0: معطل)
+CONTENT_POLL_SECONDS = float(os.getenv('CONTENT_POLL_SECONDS', '30'))
+content_watcher = ReloadWatcher(CONTENT_POLL_SECONDS, name="content-watch")
+content_watcher.register('content', content.reload)
+content_watcher.register('texts', TextCommands.reload)
 
-    with _state_lock:
-        for gid, game in list(game_sessions.items()):
-            started = getattr(game, '_started_at', None)
-            if started and started < cutoff:
-                stale_groups.append(gid)
 
-    if stale_groups:
-        with _state_lock:
-            for gid in stale_groups:
-                game_sessions.pop(gid, None)
-        logger.info(f"Cleaned {len(stale_groups)} stale game sessions")
+def event_group_id(event):
+    return getattr(event.source, 'group_id', None) or event.source.user_id
 
 
-scheduler.add_job(cleanup_inactive_users, 'cron', hour=3, minute=0)
-scheduler.add_job(cleanup_stale_games, 'interval', minutes=10)
-scheduler.start()
+def dispatch_event(event):
+    """معالجة حدث واحد على shard مجموعته"""
+    if isinstance(event, MessageEvent) and isinstance(event.message, TextMessageContent):
+        handle_message(event)
+
+
+event_dispatcher = EventDispatcher(
+    workers=WEBHOOK_WORKERS, maxsize=WEBHOOK_QUEUE_SIZE, name="webhook"
+)
 
 
 @app.route("/callback", methods=['POST'])
 def callback():
+    lifecycle.start_worker()
     signature = request.headers.get('X-Line-Signature', '')
     body = request.get_data(as_text=True)
+
     try:
-        handler.handle(body, signature)
+        events = handler.parser.parse(body, signature)
     except InvalidSignatureError:
         logger.error("Invalid signature")
         abort(400)
     except Exception as e:
-        logger.error(f"Webhook error: {e}")
+        logger.error(f"Webhook parse error: {e}")
+        return 'OK', 200
+
+    if WEBHOOK_MODE == 'async':
+        # الرد فورا - المعالجة في الخلفية
+        for event in events:
+            if not event_dispatcher.submit(event_group_id(event), dispatch_event, event):
+                logger.warning("Webhook queue full - event dropped")
+        return 'OK', 200
+
+    # وضع sync: المجموعات المختلفة بالتوازي ثم الرد بعد انتهاء الكل
+    futures = []
+    for event in events:
+        future = event_dispatcher.submit(event_group_id(event), dispatch_event, event, block=True)
+        if future is None:
+            # المعالج متوقف (worker_exit) - الحدث يعالج هنا بدل ان يضيع
+            logger.warning("Event dispatcher stopped - handling event inline")
+            try:
+                dispatch_event(event)
+            except Exception as e:
+                logger.error(f"Webhook error: {e}")
+            continue
+        futures.append(future)
+    for future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            logger.error(f"Webhook error: {e}")
     return 'OK', 200
 
 
 @handler.add(MessageEvent, message=TextMessageContent)
 def handle_message(event):
-    with ApiClient(configuration) as api_client:
-        line_api = MessagingApi(api_client)
-        user_id = event.source.user_id
-        text = event.message.text.strip()
-        group_id = getattr(event.source, 'group_id', None) or user_id
+    line_api = LineClient.api()
+    user_id = event.source.user_id
+    text = event.message.text.strip()
+    group_id = event_group_id(event)
 
-        try:
-            response = process_message(text, user_id, group_id, line_api)
-            if response:
-                messages = response if isinstance(response, list) else [response]
-                line_api.reply_message(
-                    ReplyMessageRequest(
-                        reply_token=event.reply_token,
-                        messages=messages
-                    )
-                )
-        except Exception as e:
-            logger.error(f"Message processing error: {e}", exc_info=True)
+    try:
+        response = process_message(text, user_id, group_id, line_api, event.timestamp / 1000)
+        if response:
+            messages = response if isinstance(response, list) else [response]
+            LineClient.reply(event.reply_token, messages)
+    except Exception as e:
+        logger.error(f"Message processing error: {e}", exc_info=True)
 
 
-def process_message(text, user_id, group_id, line_api):
+def process_message(text, user_id, group_id, line_api, received_at=None):
     normalized_text = text.lower().strip()
+    route, arg = router.route(normalized_text)
 
-    # إصلاح: قراءة الحالة داخل lock
-    with _state_lock:
-        is_silent = user_id in silent_users
-        is_waiting = user_id in waiting_for_name
+    # نص عادي بدون لعبة نشطة ولا اسم منتظر - لا حاجة لقاعدة البيانات
+    if route == Route.ANSWER and not sessions.has_game(group_id) \
+            and not sessions.is_member(WAITING_FOR_NAME, user_id):
+        router.count(Route.IGNORED)
+        return None
+    router.count(route)
+
+    is_silent = sessions.is_member(SILENT_USERS, user_id)
+    is_waiting = sessions.is_member(WAITING_FOR_NAME, user_id)
 
     if is_silent:
-        if normalized_text in ['تسجيل', 'بداية', 'start', 'ابدا']:
-            with _state_lock:
-                silent_users.discard(user_id)
+        if normalized_text in REACTIVATE_COMMANDS:
+            sessions.discard_member(SILENT_USERS, user_id)
             logger.info(f"User {user_id} reactivated")
         else:
             return None
 
     user = DB.get_user(user_id)
-    theme = user_themes.get(user_id, user['theme'] if user else 'light')
+    theme = sessions.get_theme(user_id) or (user['theme'] if user else 'light')
 
     if is_waiting:
         return handle_name_registration(text, user_id)
 
-    if normalized_text in TEXT_COMMANDS:
-        content = TextCommands.get_random(TEXT_COMMANDS[normalized_text])
-        msg = TextMessage(text=content)
-        msg.quick_reply = UI.get_quick_reply()
-        return msg
+    if route == Route.TEXT:
+        return text_message(TextCommands.get_random(arg, group_id), UI.get_quick_reply())
 
-    if normalized_text in ['بداية', 'start', 'ابدا']:
+    if route == Route.START:
         if user:
             DB.update_activity(user_id)
         return create_welcome_message(user, theme)
 
-    if normalized_text in ['مساعدة', 'help', 'مساعده']:
-        return FlexMessage(
-            alt_text="Help",
-            contents=FlexContainer.from_dict(UI.help_card(theme))
-        )
+    if route == Route.HELP:
+        return flex_message("Help", UI.render('help_card', theme))
 
-    if normalized_text in ['نص', 'نصوص']:
-        return FlexMessage(
-            alt_text="Text Commands",
-            contents=FlexContainer.from_dict(UI.text_commands_menu(theme))
-        )
+    if route == Route.TEXTS_MENU:
+        return flex_message("Text Commands", UI.render('text_commands_menu', theme))
 
-    if normalized_text in ['العاب', 'ألعاب', 'الالعاب']:
-        return FlexMessage(
-            alt_text="Games",
-            contents=FlexContainer.from_dict(UI.games_menu(theme))
-        )
+    if route == Route.GAMES_MENU:
+        return flex_message("Games", UI.render('games_menu', theme))
 
-    if normalized_text in ['تسجيل', 'تغيير']:
-        with _state_lock:
-            silent_users.discard(user_id)
-            waiting_for_name.add(user_id)
-        msg = TextMessage(text="اكتب اسمك الان")
-        msg.quick_reply = UI.get_quick_reply()
+    if route == Route.REGISTER:
+        sessions.discard_member(SILENT_USERS, user_id)
+        sessions.add_member(WAITING_FOR_NAME, user_id)
+        msg = text_message("اكتب اسمك الان", UI.get_quick_reply())
         return msg
 
-    if normalized_text == 'نقاطي':
+    if route == Route.STATS:
         if not user:
             return create_error_message("يجب التسجيل اولا - اكتب: تسجيل")
         DB.update_activity(user_id)
-        return FlexMessage(
-            alt_text="Your Stats",
-            contents=FlexContainer.from_dict(UI.stats(user, theme))
+        best_ms = DB.get_best_time(user_id, 'اسرع')
+        return flex_message("Your Stats", RawFlexContainer.validated(UI.stats(user, theme, best_ms)))
+
+    if route == Route.LEADERBOARD:
+        return leaderboard_message('all', theme, "قائمة المتصدرين", DB.get_leaderboard)
+
+    if route == Route.GROUP_LEADERBOARD:
+        return leaderboard_message(
+            f"group:{group_id}", theme, "متصدرو المجموعة",
+            lambda: DB.get_group_leaderboard(group_id)
         )
 
-    if normalized_text in ['الصدارة', 'صدارة']:
-        leaders = DB.get_leaderboard()
-        return FlexMessage(
-            alt_text="Leaderboard",
-            contents=FlexContainer.from_dict(UI.leaderboard(leaders, theme))
+    if route == Route.GAME_LEADERBOARD:
+        return leaderboard_message(
+            f"game:{arg}", theme, f"متصدرو {arg}",
+            lambda: DB.get_game_leaderboard(arg)
         )
 
-    if normalized_text == 'ثيم':
+    if route == Route.THEME:
         if not user:
             return create_error_message("يجب التسجيل اولا")
         new_theme = 'dark' if theme == 'light' else 'light'
         DB.set_theme(user_id, new_theme)
-        user_themes[user_id] = new_theme
+        sessions.set_theme(user_id, new_theme)
         theme_name = 'الداكن' if new_theme == 'dark' else 'الفاتح'
         return create_success_message(f"تم التغيير للثيم {theme_name}")
 
-    if normalized_text == 'انسحب':
-        with _state_lock:
-            game = game_sessions.get(group_id)
-            if game:
-                game.withdrawn_users.add(user_id)
-            silent_users.add(user_id)
+    if route == Route.WITHDRAW:
+        for _ in range(GAME_WRITE_ATTEMPTS):
+            game = sessions.get_game(group_id, line_api)
+            if game is None:
+                break
+            game.withdrawn_users.add(user_id)
+            if sessions.set_game(group_id, game):
+                break
+        sessions.add_member(SILENT_USERS, user_id)
 
         logger.info(f"User {user_id} entered silent mode")
-        msg = TextMessage(text="تم الانسحاب - لن يتم احتساب اجاباتك\nللعودة اكتب: تسجيل")
-        msg.quick_reply = UI.get_quick_reply()
+        msg = text_message("تم الانسحاب - لن يتم احتساب اجاباتك\nللعودة اكتب: تسجيل", UI.get_quick_reply())
         return msg
 
-    if normalized_text == 'ايقاف':
-        with _state_lock:
-            removed = game_sessions.pop(group_id, None)
-        if removed:
+    if route == Route.STOP:
+        if end_game_session(group_id):
             return create_success_message("تم ايقاف اللعبة")
         return None
 
     if not user:
         return None
 
-    if normalized_text in GAME_MAP:
-        return start_game(normalized_text, group_id, line_api, theme)
+    if route == Route.GAME_START:
+        return start_game(arg, group_id, line_api, theme)
 
-    with _state_lock:
-        active_game = game_sessions.get(group_id)
+    active_game = sessions.get_game(group_id, line_api)
 
     if active_game:
-        return handle_game_answer(group_id, text, user_id, user)
+        touch_game(group_id)
+        return handle_game_answer(active_game, group_id, text, user_id, user, line_api, received_at)
 
     return None
 
@@ -275,108 +479,152 @@ def handle_name_registration(name, user_id):
     name = name.strip()
     if 1 <= len(name) <= 20:
         DB.register_user(user_id, name)
-        with _state_lock:
-            waiting_for_name.discard(user_id)
-            silent_users.discard(user_id)
+        sessions.discard_member(WAITING_FOR_NAME, user_id)
+        sessions.discard_member(SILENT_USERS, user_id)
 
         user = DB.get_user(user_id)
-        msg = FlexMessage(
-            alt_text="Registration Complete",
-            contents=FlexContainer.from_dict(
-                UI.welcome(name, True, user['theme'])
-            )
+        return flex_message(
+            "Registration Complete",
+            UI.welcome_container(name, True, user['theme']),
+            UI.get_quick_reply()
         )
-        msg.quick_reply = UI.get_quick_reply()
-        return msg
 
-    with _state_lock:
-        waiting_for_name.discard(user_id)
+    sessions.discard_member(WAITING_FOR_NAME, user_id)
     return create_error_message("الاسم يجب ان يكون بين 1 و 20 حرف")
 
 
 def create_welcome_message(user, theme):
     name = user['name'] if user else 'لاعب'
     is_registered = bool(user)
-    msg = FlexMessage(
-        alt_text="Bot Mesh",
-        contents=FlexContainer.from_dict(UI.welcome(name, is_registered, theme))
+    return flex_message(
+        "Bot Mesh",
+        UI.welcome_container(name, is_registered, theme),
+        UI.get_quick_reply()
     )
-    msg.quick_reply = UI.get_quick_reply()
-    return msg
+
+
+def leaderboard_message(scope, theme, title, load):
+    """بطاقة الصدارة محفوظة حتى يتغير رقم نسخة الترتيب في قاعدة البيانات"""
+    version = DB.leaderboard_version(scope)
+    key = (scope, theme)
+    with leaderboard_lock:
+        cached = leaderboard_cache.get(key)
+        if cached and version is not None and cached[0] == version:
+            leaderboard_cache.move_to_end(key)
+            return flex_message("Leaderboard", cached[1])
+
+    contents = RawFlexContainer.validated(UI.leaderboard(load(), theme, title))
+    if version is not None:
+        with leaderboard_lock:
+            leaderboard_cache[key] = (version, contents)
+            while len(leaderboard_cache) > LEADERBOARD_CACHE_SIZE:
+                leaderboard_cache.popitem(last=False)
+    return flex_message("Leaderboard", contents)
 
 
 def create_error_message(text):
-    msg = TextMessage(text=text)
-    msg.quick_reply = UI.get_quick_reply()
+    msg = text_message(text, UI.get_quick_reply())
     return msg
 
 
 def create_success_message(text):
-    msg = TextMessage(text=text)
-    msg.quick_reply = UI.get_quick_reply()
+    msg = text_message(text, UI.get_quick_reply())
     return msg
 
 
 def start_game(game_type, group_id, line_api, theme):
+    started = {}
+
+    def create():
+        game = GAME_MAP[game_type](line_api, theme=theme)
+        game.group_id = group_id
+        started['response'] = game.start_game()
+        return game
+
     try:
-        game_class = GAME_MAP[game_type]
-        game = game_class(line_api, theme=theme)
-        with _state_lock:
-            game_sessions[group_id] = game
-        return game.start_game()
+        # طلبان لبدء لعبة في نفس المجموعة: الأول فقط ينشئ اللعبة
+        game, created = sessions.get_or_create(group_id, create, line_api)
     except Exception as e:
         logger.error(f"Game start error {game_type}: {e}", exc_info=True)
         return create_error_message("حدث خطأ في بدء اللعبة")
 
+    if not created:
+        return create_error_message(f"توجد لعبة {game.game_name} نشطة - اكتب ايقاف لانهائها")
+    game_timer.schedule(group_id, time.time() + sessions.ttl)
+    arm_question_timer(group_id, game)
+    return started['response']
 
-def handle_game_answer(group_id, text, user_id, user):
-    with _state_lock:
-        game = game_sessions.get(group_id)
 
-    if not game:
-        return None
+def handle_game_answer(game, group_id, text, user_id, user, line_api, received_at=None):
+    for attempt in range(GAME_WRITE_ATTEMPTS):
+        if attempt:
+            # طلب آخر غير اللعبة بعد قراءتها: الاجابة تقيم من جديد على حالتها الحالية
+            game = sessions.get_game(group_id, line_api)
+            if game is None:
+                return None
 
-    if user_id in game.withdrawn_users:
-        return None
+        if user_id in game.withdrawn_users:
+            return None
 
-    try:
-        result = game.check_answer(text, user_id, user['name'])
-    except Exception as e:
-        logger.error(f"Game answer error: {e}", exc_info=True)
-        return None
+        game.group_id = group_id
+        game.received_at = received_at
 
-    if not result:
-        return None
+        try:
+            result = game.check_answer(text, user_id, user['name'])
+        except Exception as e:
+            logger.error(f"Game answer error: {e}", exc_info=True)
+            return None
+
+        if not result:
+            return None
 
-    if isinstance(result, (TextMessage, FlexMessage)):
-        return result
+        if isinstance(result, (TextMessage, FlexMessage)):
+            if not save_game(group_id, game):
+                continue
+            return result
 
-    if not isinstance(result, dict):
-        return None
+        if not isinstance(result, dict):
+            return None
 
-    if result.get('withdrawn') or result.get('game_over'):
-        with _state_lock:
-            game_sessions.pop(group_id, None)
+        if result.get('withdrawn') or result.get('game_over'):
+            saved = finish_game(game, group_id, result)
+        else:
+            saved = save_game(group_id, game)
+        if not saved:
+            continue
 
-        points = result.get('points', 0)
-        if points > 0 and not result.get('withdrawn'):
-            won = result.get('won', True)
-            DB.add_points(user_id, points, won, game.game_name)
+        send_pushes(line_api, result)
+        if result.get('elapsed_ms') is not None:
+            DB.record_best_time(user_id, game.game_name, result['elapsed_ms'])
+        return result.get('response')
 
-    return result.get('response')
+    logger.warning(f"Answer from {user_id} in {group_id} dropped - game kept changing")
+    return None
 
 
 @app.route('/health')
 def health():
-    with _state_lock:
-        active_games = len(game_sessions)
-        silent_count = len(silent_users)
     return jsonify({
         'status': 'ok',
         'time': datetime.now().isoformat(),
         'users': DB.get_stats(),
-        'active_games': active_games,
-        'silent_users': silent_count
+        'user_cache': DB.cache.stats(),
+        'results': DB.results.stats(),
+        'session_store': sessions.name,
+        'active_games': sessions.count_games(),
+        'silent_users': sessions.count_members(SILENT_USERS),
+        'webhook': {'mode': WEBHOOK_MODE, **event_dispatcher.stats()},
+        'line_client': LineClient.stats(),
+        'outbound': outbound.stats(),
+        'normalize': normalize.stats(),
+        'content': content.stats(),
+        'texts': TextCommands.stats(),
+        'reload': content_watcher.stats(),
+        'router': router.stats(),
+        'game_timer': game_timer.stats(),
+        'question_timer': question_timer.stats(),
+        'lifecycle': lifecycle.stats(),
+        'jobs': jobs.stats()
     }), 200
 
 
@@ -385,6 +633,18 @@ def index():
     return "Bot Mesh - Running", 200
 
 
+# اتصالات قاعدة البيانات تغلق قبل fork، وكل worker يفتح اتصالاته وخيوطه
+# ويحاول قيادة المجدول (post_worker_init في gunicorn_config او أول طلب)
+lifecycle.on_release(DB.close_pool)
+lifecycle.on_release(sessions.release)
+lifecycle.on_worker(DB.open_pool)
+lifecycle.on_worker(LineClient.api)
+lifecycle.on_worker(content_watcher.ensure_started)
+lifecycle.on_worker(jobs.start)
+lifecycle.preloaded(PRELOAD_STARTED)
+
+
 if __name__ == "__main__":
+    lifecycle.start_worker()
     port = int(os.environ.get("PORT", 10000))
     app.run(host="0.0.0.0", port=port)
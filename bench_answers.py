@@ -0,0 +1,105 @@
+"""make bench-answers: فحص الاجابات على سجل محادثة معاد - التطبيع لكل رسالة مقابل المجموعات الجاهزة
+
+fixtures/chat_log.tsv سجل محادثة مجهول الهوية (مستخدم<TAB>نص): دردشة وأوامر
+وتخمينات من بنوك الأسئلة بصيغ مختلفة (همزات، تشكيل، مسافات، رموز). لكل لعبة
+لها answer_bank: يمر على أسئلة البنك، ولكل سؤال جزء من السجل مع صيغ اجابته
+الصحيحة، حتى MESSAGES رسالة. الفحص القديم يطبع كل اجابة صحيحة مع كل رسالة
+(validate_answer قبل answer_set)، والجديد تطبيع واحد ثم البحث في المجموعة.
+أي اختلاف في قرار القبول فشل.
+"""
+import os
+import sys
+import time
+
+from bench_normalize import old_normalize
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CHAT_LOG = os.path.join(ROOT, 'fixtures', 'chat_log.tsv')
+MESSAGES = int(os.getenv('ANSWERS_MESSAGES', '20000'))
+SLICE = 25
+
+
+def load_log(path=CHAT_LOG):
+    with open(path, encoding='utf-8') as f:
+        return [line.rstrip('\n').split('\t', 1)[1] for line in f if '\t' in line]
+
+
+def variants(answer):
+    # كما يكتبها اللاعبون: همزة، تشكيل، مسافات، علامة استفهام، تاء مربوطة
+    answer = str(answer)
+    yield answer
+    yield answer.replace('ا', 'أ', 1)
+    yield '  ' + answer + ' '
+    yield answer + '؟'
+    yield '\u064e'.join(answer)
+    yield answer[:-1] + 'ة' if answer.endswith('ه') else answer + '!!'
+
+
+def stream(log, bank):
+    """(answers, text) حتى MESSAGES رسالة - جزء من السجل ثم صيغ الاجابة لكل سؤال"""
+    count = 0
+    position = 0
+    while True:
+        for answers in bank:
+            answers = answers if isinstance(answers, (list, tuple)) else [answers]
+            texts = log[position:position + SLICE]
+            position = (position + SLICE) % max(1, len(log) - SLICE)
+            for answer in answers:
+                texts.extend(variants(answer))
+            for text in texts:
+                yield answers, text
+                count += 1
+                if count >= MESSAGES:
+                    return
+
+
+def old_check(answers, text):
+    normalized = old_normalize(text)
+    for correct in answers:
+        if old_normalize(str(correct)) == normalized:
+            return True
+    return False
+
+
+def main():
+    import games
+    from games.base_game import BaseGame, answer_set
+
+    log = load_log()
+    failures = []
+    print(f"chat log: {len(log)} messages, {MESSAGES} replayed per game")
+    for name in sorted(dir(games)):
+        cls = getattr(games, name)
+        if name.startswith('_') or not isinstance(cls, type) or not issubclass(cls, BaseGame):
+            continue
+        bank = list(cls.answer_bank())
+        if not bank:
+            continue
+        messages = list(stream(log, bank))
+
+        started = time.perf_counter()
+        old = [old_check(answers, text) for answers, text in messages]
+        old_us = (time.perf_counter() - started) * 1e6 / len(messages)
+
+        # الجديد: المجموعة تحسب مع تغيير السؤال (current_answer) وليس مع كل رسالة
+        started = time.perf_counter()
+        new = []
+        current, accepted = None, None
+        for answers, text in messages:
+            if answers is not current:
+                current, accepted = answers, answer_set(answers)
+            new.append(BaseGame.normalize_text(text) in accepted)
+        new_us = (time.perf_counter() - started) * 1e6 / len(messages)
+
+        mismatches = sum(a != b for a, b in zip(old, new))
+        print(f"  {name}: {len(bank)} questions, {sum(new)} accepted, "
+              f"{old_us:.2f} us/msg -> {new_us:.2f} us/msg, {mismatches} mismatches")
+        if mismatches:
+            failures.append(f"{name}: {mismatches} accept/reject decisions differ from the old check")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
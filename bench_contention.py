@@ -0,0 +1,182 @@
+"""make bench-contention: تزاحم الخيوط على حالة الجلسات - قفل واحد مقابل الأقفال الموزعة
+
+LockedRegistry هي الحالة قبل SessionStore: قواميس ومجموعات خلف _state_lock
+واحد لكل عملية. MemorySessionStore يقرأ بدون قفل ويكتب بقفل المجموعة فقط.
+نفس الحمل على الاثنين بعدد خيوط THREADS: لكل رسالة قراءة الصامتين والمنتظرين
+واللعبة، وكل عاشرة كتابة (حفظ اللعبة او تمديد مهلتها او تعديل مجموعة)، مع خيط
+تنظيف يمر على كل الألعاب. ثم سباق بدء لعبة: RACERS خيطا يبدؤون لعبة في نفس
+المجموعة، ويجب ان تنشأ لعبة واحدة فقط (memory و sqlite).
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix='botmesh-contention-')
+SECONDS = float(os.getenv('CONTENTION_SECONDS', '1'))
+THREADS = tuple(int(n) for n in os.getenv('CONTENTION_THREADS', '1,8,32').split(','))
+RACERS = 32
+GROUPS = 200
+USERS = 2000
+
+
+class LockedRegistry:
+    """الحالة القديمة في app.py: كل قراءة وكتابة تمر على قفل واحد"""
+
+    name = "single lock"
+
+    def __init__(self):
+        self._state_lock = threading.Lock()
+        self.game_sessions = {}
+        self.sets = {'silent_users': set(), 'waiting_for_name': set()}
+
+    def get_game(self, group_id, line_api):
+        with self._state_lock:
+            return self.game_sessions.get(group_id)
+
+    def set_game(self, group_id, game):
+        with self._state_lock:
+            self.game_sessions[group_id] = game
+            return True
+
+    def touch_game(self, group_id):
+        with self._state_lock:
+            return group_id in self.game_sessions
+
+    def get_or_create(self, group_id, factory, line_api):
+        with self._state_lock:
+            game = self.game_sessions.get(group_id)
+            if game is not None:
+                return game, False
+            game = self.game_sessions[group_id] = factory()
+            return game, True
+
+    def is_member(self, set_name, user_id):
+        with self._state_lock:
+            return user_id in self.sets[set_name]
+
+    def add_member(self, set_name, user_id):
+        with self._state_lock:
+            self.sets[set_name].add(user_id)
+
+    def discard_member(self, set_name, user_id):
+        with self._state_lock:
+            self.sets[set_name].discard(user_id)
+
+    def sweep(self):
+        # cleanup_stale_games: المرور على كل الألعاب تحت القفل
+        with self._state_lock:
+            return [gid for gid, game in self.game_sessions.items() if game is None]
+
+
+class Game:
+    pass
+
+
+def sweep(store):
+    if isinstance(store, LockedRegistry):
+        return store.sweep()
+    return store.expired_groups(time.time())
+
+
+def workload(store, stop, counts, seed):
+    rnd = random.Random(seed)
+    ops = 0
+    while not stop.is_set():
+        group_id = f'G{rnd.randrange(GROUPS)}'
+        user_id = f'U{rnd.randrange(USERS)}'
+        store.is_member('silent_users', user_id)
+        store.is_member('waiting_for_name', user_id)
+        game = store.get_game(group_id, None)
+        ops += 3
+        if rnd.random() < 0.1:
+            choice = rnd.random()
+            if choice < 0.5 and game is not None:
+                store.set_game(group_id, game)
+            elif choice < 0.8:
+                store.touch_game(group_id)
+            elif choice < 0.9:
+                store.add_member('silent_users', user_id)
+            else:
+                store.discard_member('silent_users', user_id)
+            ops += 1
+    counts.append(ops)
+
+
+def sweeper(store, stop):
+    while not stop.is_set():
+        sweep(store)
+        time.sleep(0.01)
+
+
+def throughput(store, threads):
+    for i in range(GROUPS):
+        store.get_or_create(f'G{i}', Game, None)
+    stop = threading.Event()
+    counts = []
+    workers = [threading.Thread(target=workload, args=(store, stop, counts, t)) for t in range(threads)]
+    workers.append(threading.Thread(target=sweeper, args=(store, stop)))
+    for worker in workers:
+        worker.start()
+    time.sleep(SECONDS)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / SECONDS
+
+
+def race(store, group_id):
+    created = []
+    barrier = threading.Barrier(RACERS)
+
+    def start():
+        barrier.wait()
+        game, is_new = store.get_or_create(group_id, factory, None)
+        if is_new:
+            created.append(game)
+
+    def factory():
+        from games import RiddleGame
+        game = RiddleGame(None)
+        game.start_game()
+        return game
+
+    racers = [threading.Thread(target=start) for _ in range(RACERS)]
+    for racer in racers:
+        racer.start()
+    for racer in racers:
+        racer.join()
+    store.pop_game(group_id)
+    return len(created)
+
+
+def main():
+    from session_store import MemorySessionStore, SQLiteSessionStore
+
+    failures = []
+    for threads in THREADS:
+        old = throughput(LockedRegistry(), threads)
+        new = throughput(MemorySessionStore(), threads)
+        print(f"{threads:>3} threads: single lock {old:,.0f} ops/s, "
+              f"striped store {new:,.0f} ops/s ({new / old:.1f}x)")
+
+    stores = (MemorySessionStore(), SQLiteSessionStore(os.path.join(WORKDIR, 'sessions.db')))
+    for store in stores:
+        created = race(store, 'race-group')
+        print(f"{RACERS} threads starting a game in one group on {store.name}: {created} created")
+        if created != 1:
+            failures.append(f"{store.name}: {created} games created by concurrent starts")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    try:
+        status = main()
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    sys.exit(status)
@@ -0,0 +1,107 @@
+"""make bench-line-client: زمن الرد على نقطة LINE وهمية - عميل لكل حدث مقابل العميل المشترك
+
+خادم http.server محلي (HTTP/1.1 keep-alive) يرد 200 على /v2/bot/message/reply
+ويعد الاتصالات المفتوحة. ثلاث طرق لارسال REPLIES ردا:
+- عميل لكل حدث: with ApiClient(...) كما كان handle_message قبل LineClient
+- LineClient.api().reply_message: نفس الـ SDK على ApiClient واحد للعملية
+- LineClient.reply: JSON جاهز مباشرة على pool نفس العميل
+HTTP بدون TLS، فالفرق الحقيقي مع api.line.me أكبر (مصافحة TLS لكل اتصال).
+"""
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLIES = int(os.getenv('LINE_BENCH_REPLIES', '500'))
+TOKEN = 'bench-token'
+
+
+class FakeLine(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # الرأس والجسم في كتابتين: بدون هذا ينتظر Nagle الـ ACK المؤجل (~40 ms)
+    disable_nagle_algorithm = True
+    connections = 0
+    replies = 0
+    _lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with FakeLine._lock:
+            FakeLine.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        with FakeLine._lock:
+            FakeLine.replies += 1
+        body = b'{"sentMessages":[{"id":"1","quoteToken":"q"}]}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def timed(send):
+    FakeLine.connections = 0
+    latencies = []
+    for i in range(REPLIES):
+        started = time.perf_counter()
+        send(f'token-{i}')
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, FakeLine.connections
+
+
+def main():
+    from linebot.v3.messaging import ApiClient, Configuration, MessagingApi, ReplyMessageRequest, TextMessage
+    from line_client import LineClient
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeLine)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    messages = [TextMessage(text='اجابة صحيحة')]
+
+    def per_event(token):
+        with ApiClient(Configuration(access_token=TOKEN)) as api_client:
+            api = MessagingApi(api_client)
+            api.line_base_path = base
+            api.reply_message(ReplyMessageRequest(reply_token=token, messages=messages))
+
+    LineClient.configure(TOKEN)
+    pooled = LineClient.api()
+    pooled.line_base_path = base
+
+    def pooled_sdk(token):
+        pooled.reply_message(ReplyMessageRequest(reply_token=token, messages=messages))
+
+    def pooled_raw(token):
+        LineClient.reply(token, messages)
+
+    failures = []
+    print(f"{REPLIES} replies to a local fake LINE endpoint:")
+    for name, send in (('client per event', per_event), ('pooled SDK', pooled_sdk),
+                       ('pooled raw JSON', pooled_raw)):
+        latencies, connections = timed(send)
+        print(f"  {name}: p50 {percentile(latencies, 50):.2f} ms, p99 {percentile(latencies, 99):.2f} ms, "
+              f"{connections} new connections")
+        if send is not per_event and connections > 1:
+            failures.append(f"{name} opened {connections} connections for sequential replies")
+    server.shutdown()
+    if FakeLine.replies != 3 * REPLIES:
+        failures.append(f"fake endpoint received {FakeLine.replies} of {3 * REPLIES} replies")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
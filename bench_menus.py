@@ -0,0 +1,72 @@
+"""make bench-menus: كلفة بناء رسائل القوائم لكل طلب - from_dict لكل طلب مقابل UI.render
+
+المسار القديم: dict جديد من UI ثم FlexContainer.from_dict (تحقق pydantic للشجرة
+كلها) ثم FlexMessage. الجديد: flex_message على UI.render المحفوظ، و welcome من
+قالبه مع تبديل التحية فقط. يقاس البناء وحده، ثم البناء مع تحويل الرسالة لـ JSON
+(to_dict للقديم و message_json للجديد). JSON المسارين يجب ان يتطابق.
+"""
+import json
+import os
+import sys
+import time
+
+from linebot.v3.messaging import FlexContainer, FlexMessage
+
+from line_messages import flex_message, message_json
+from ui import UI
+
+CALLS = int(os.getenv('MENUS_CALLS', '2000'))
+MENUS = (
+    ('help_card', 'Help'),
+    ('games_menu', 'Games'),
+    ('text_commands_menu', 'Text Commands'),
+)
+
+
+def per_call_us(fn):
+    fn()
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        fn()
+    return (time.perf_counter() - started) * 1e6 / CALLS
+
+
+def cases(theme):
+    for template, alt_text in MENUS:
+        yield (
+            template,
+            lambda t=template, a=alt_text: FlexMessage(
+                alt_text=a, contents=FlexContainer.from_dict(getattr(UI, t)(theme=theme))
+            ),
+            lambda t=template, a=alt_text: flex_message(a, UI.render(t, theme))
+        )
+    yield (
+        'welcome',
+        lambda: FlexMessage(
+            alt_text="Bot Mesh", contents=FlexContainer.from_dict(UI.welcome("لاعب 7", True, theme))
+        ),
+        lambda: flex_message("Bot Mesh", UI.welcome_container("لاعب 7", True, theme))
+    )
+
+
+def main():
+    failures = []
+    print(f"{CALLS} calls per menu (build / build + JSON):")
+    for theme in ('light', 'dark'):
+        for name, old, new in cases(theme):
+            old_json = json.dumps(old().to_dict(), ensure_ascii=False)
+            if json.loads(old_json) != json.loads(message_json(new())):
+                failures.append(f"{name} ({theme}): JSON differs from the from_dict path")
+            old_build = per_call_us(old)
+            new_build = per_call_us(new)
+            old_total = per_call_us(lambda: json.dumps(old().to_dict(), ensure_ascii=False))
+            new_total = per_call_us(lambda: message_json(new()))
+            print(f"  {name} ({theme}): {old_build:,.1f} -> {new_build:,.1f} us, "
+                  f"{old_total:,.1f} -> {new_total:,.1f} us")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
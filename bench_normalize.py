@@ -0,0 +1,119 @@
+"""make bench-normalize: مطابقة normalize.normalize للتطبيع القديم وقياس سرعته
+
+المجموعة الثابتة: كل سطر في games/*.txt، كل النصوص في content/*.json، حالات
+Unicode حدية، وعدد FUZZ من النصوص العشوائية (بذرة ثابتة). كل نص يطبع بالدالة
+القديمة (BaseGame.normalize_text قبل normalize.py) وبالجديدة، وأي اختلاف فشل.
+ثم السرعة على خليط محادثة (أوامر، اجابات، دردشة) بالرسائل في الثانية: القديمة،
+الجديدة مع الـ memo، والجديدة بدونه.
+"""
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+
+import normalize
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+FUZZ = int(os.getenv('NORMALIZE_FUZZ', '50000'))
+MESSAGES = int(os.getenv('NORMALIZE_MESSAGES', '200000'))
+
+EDGE_CASES = (
+    '', ' ', '\t\n', 'ـــ', '\u200f\u200e', '\xa0نص\xa0', '\u3000', 'ٱلله', 'آمين!!',
+    'إ\u0650ن\u064e\u0651', 'م\u064fح\u064eم\u064e\u0651د\u064c', 'ﷲ', 'ﻻ', '٠١٢٣٤٥٦٧٨٩', '۱۲۳', 'İstanbul', 'ß', 'Ǆ', 'ﬁ',
+    '😀 ضحك 😂', 'a_b', '_', '؟،؛', '«اقتباس»', 'x\u0301y', '\u0670\u065f', 'ئؤىة',
+    'ABC def', '  كلمة   كلمتين  ', 'سطر\nسطر', '\x00\x1f', '\ufeffبداية'
+)
+
+# حروف الاختبار العشوائي: عربي وتشكيل ورموز ومسافات ولاتيني وأرقام
+FUZZ_ALPHABET = (
+    [chr(c) for c in range(0x0600, 0x0700)]
+    + list('abcXYZ019_ .,!?-\t\n\xa0\u200f\u3000')
+    + ['ß', 'İ', '😀', '\u0301', 'ﷲ', 'ﻻ']
+)
+
+
+def old_normalize(text):
+    # BaseGame.normalize_text قبل normalize.py
+    if not text:
+        return ""
+    text = str(text).strip().lower()
+    text = re.sub(r'[\u064B-\u065F\u0670]', '', text)
+    replacements = {
+        'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+        'ى': 'ي', 'ة': 'ه', 'ؤ': 'و', 'ئ': 'ي'
+    }
+    for old, new in replacements.items():
+        text = text.replace(old, new)
+    text = re.sub(r'[^\w\s]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from strings(key)
+            yield from strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from strings(item)
+
+
+def corpus():
+    texts = list(EDGE_CASES)
+    for path in sorted(glob.glob(os.path.join(ROOT, 'games', '*.txt'))):
+        with open(path, encoding='utf-8') as f:
+            texts.extend(f.read().splitlines())
+    for path in sorted(glob.glob(os.path.join(ROOT, 'content', '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            texts.extend(strings(json.load(f)['items']))
+    rnd = random.Random(15)
+    for _ in range(FUZZ):
+        texts.append(''.join(rnd.choice(FUZZ_ALPHABET) for _ in range(rnd.randint(1, 40))))
+    return texts
+
+
+def chat_mix(texts):
+    # محادثة: أوامر واجابات قصيرة تتكرر كثيرا، ودردشة أطول أقل تكرارا
+    rnd = random.Random(16)
+    short = [t for t in texts if 0 < len(t) <= 20][:2000]
+    long = [t for t in texts if len(t) > 20][:2000]
+    return [rnd.choice(short) if rnd.random() < 0.8 else rnd.choice(long) for _ in range(MESSAGES)]
+
+
+def rate(fn, messages):
+    started = time.perf_counter()
+    for text in messages:
+        fn(text)
+    return len(messages) / (time.perf_counter() - started)
+
+
+def main():
+    texts = corpus()
+    mismatches = [(t, old_normalize(t), normalize.normalize(t))
+                  for t in texts if old_normalize(t) != normalize.normalize(t)]
+    print(f"corpus: {len(texts)} strings, {len(mismatches)} mismatches")
+    for text, old, new in mismatches[:10]:
+        print(f"  {text!r}: old {old!r}, new {new!r}")
+
+    messages = chat_mix(texts)
+    old_rate = rate(old_normalize, messages)
+    plain_rate = rate(normalize._normalize, messages)
+    normalize._normalize_memo.cache_clear()
+    memo_rate = rate(normalize.normalize, messages)
+    print(f"{len(messages)} messages: old {old_rate:,.0f} msgs/s, "
+          f"translate {plain_rate:,.0f} msgs/s, translate + memo {memo_rate:,.0f} msgs/s "
+          f"(memo hit ratio {normalize.stats()['hit_ratio']})")
+    if mismatches:
+        print("FAIL: normalize.normalize differs from the old normalizer")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""make bench-reload: زمن الطلبات اثناء اعادة تحميل المحتوى، وزمن التحميل والذاكرة
+
+نسخة من content/ في مجلد مؤقت، وخيط يرسل طلبات (نصوص، قوائم، العاب واجاباتها)
+عبر process_message. المرحلة الأولى بدون اعادة تحميل، والثانية تعيد كتابة كل
+البنوك برقم اصدار جديد وتستدعي content_watcher.check() كل RELOAD_EVERY_MS.
+بعد كل مرحلة gc.collect() ثم RSS وعدد الكائنات: البنوك القديمة (أكثر من
+content.HISTORY) يجب ان تجمع، فلا تكبر الذاكرة مع عدد مرات التحميل.
+"""
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix='botmesh-reload-')
+SOURCE_CONTENT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'content')
+os.environ.setdefault('LINE_CHANNEL_ACCESS_TOKEN', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+os.environ['DB_PATH'] = os.path.join(WORKDIR, 'bot.db')
+os.environ['CONTENT_DIR'] = os.path.join(WORKDIR, 'content')
+os.environ['SESSION_STORE'] = 'memory'
+os.environ['CONTENT_POLL_SECONDS'] = '0'
+shutil.copytree(SOURCE_CONTENT, os.environ['CONTENT_DIR'])
+
+SECONDS = float(os.getenv('RELOAD_SECONDS', '3'))
+RELOAD_EVERY_MS = float(os.getenv('RELOAD_EVERY_MS', '50'))
+GROUPS = 10
+TEXTS = ('سؤال', 'نصيحة', 'اقتباس', 'مساعدة', 'العاب')
+GAMES = ('لغز', 'ضد', 'اغنيه', 'ترتيب')
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def rss_kb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def current_answer(game):
+    answer = game.current_answer
+    return answer[0] if isinstance(answer, (list, tuple)) else answer
+
+
+def request_loop(app, stop, latencies):
+    step = 0
+    while not stop.is_set():
+        group_id = f'G{step % GROUPS}'
+        game = app.sessions.get_game(group_id, None)
+        if step % 3 == 0:
+            text = TEXTS[step % len(TEXTS)]
+        elif game is None:
+            text = GAMES[step % len(GAMES)]
+        else:
+            text = current_answer(game) or 'لا اعرف'
+        started = time.perf_counter()
+        app.process_message(text, f'U{step % 5}', group_id, None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        step += 1
+
+
+def bump_banks(content_dir, generation):
+    # نفس العناصر برقم اصدار جديد - mtime صريح لأن دقة نظام الملفات قد لا تكفي
+    for filename in os.listdir(content_dir):
+        path = os.path.join(content_dir, filename)
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        data['version'] += 1
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.utime(path, (time.time(), 1_000_000 + generation))
+
+
+def run_phase(app, reload):
+    stop = threading.Event()
+    latencies = []
+    reload_ms = []
+    loop = threading.Thread(target=request_loop, args=(app, stop, latencies))
+    loop.start()
+    deadline = time.monotonic() + SECONDS
+    generation = 0
+    while time.monotonic() < deadline:
+        time.sleep(RELOAD_EVERY_MS / 1000)
+        if reload:
+            generation += 1
+            bump_banks(os.environ['CONTENT_DIR'], generation)
+            started = time.perf_counter()
+            app.content_watcher.check()
+            reload_ms.append((time.perf_counter() - started) * 1000)
+    stop.set()
+    loop.join()
+    gc.collect()
+    return latencies, reload_ms, generation
+
+
+def main():
+    started = time.perf_counter()
+    import app
+    import_ms = (time.perf_counter() - started) * 1000
+    for i in range(5):
+        app.DB.register_user(f'U{i}', f'player{i}')
+    print(f"import app {import_ms:.0f} ms (preload {app.lifecycle.stats()['preload_ms']} ms), "
+          f"RSS {rss_kb()} KB")
+
+    gc.collect()
+    baseline_rss, baseline_objects = rss_kb(), len(gc.get_objects())
+    failures = []
+    for name, reload in (('steady', False), ('reloading', True)):
+        latencies, reload_ms, reloads = run_phase(app, reload)
+        rss, objects = rss_kb(), len(gc.get_objects())
+        print(f"{name}: {len(latencies)} requests, p50 {percentile(latencies, 50):.3f} ms, "
+              f"p99 {percentile(latencies, 99):.3f} ms, max {max(latencies):.1f} ms")
+        if reload:
+            print(f"  {reloads} reloads of {len(app.content.stats())} banks: "
+                  f"p50 {percentile(reload_ms, 50):.1f} ms, max {max(reload_ms):.1f} ms")
+        print(f"  after gc.collect: RSS {rss} KB ({rss - baseline_rss:+d}), "
+              f"gc objects {objects} ({objects - baseline_objects:+d})")
+    if gc.get_freeze_count():
+        failures.append(f"{gc.get_freeze_count()} objects frozen in a running worker")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    try:
+        status = main()
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    sys.exit(status)
@@ -0,0 +1,109 @@
+"""make bench-results: نتائج الألعاب في الثانية - add_points القديم مقابل الدفعات
+
+قاعدة بيانات مؤقتة وعدد THREADS من الخيوط تسجل RESULTS نتيجة (كأن مجموعات كثيرة
+انتهت ألعابها معا). المسار القديم: SELECT للسلسلة ثم UPDATE ثم INSERT في
+transaction لكل نتيجة (add_points قبل results.py). المسار الجديد: DB.add_points
+الى ResultQueue ثم الانتظار حتى تكتب كل النتائج. الزمن من أول نتيجة حتى آخر
+كتابة، ومجموع النقاط في الجدول يجب ان يطابق ما أرسل في المسارين.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+WORKDIR = tempfile.mkdtemp(prefix='botmesh-results-')
+os.environ['DB_PATH'] = os.path.join(WORKDIR, 'bot.db')
+
+RESULTS = int(os.getenv('BENCH_RESULTS', '4000'))
+THREADS = int(os.getenv('BENCH_THREADS', '16'))
+USERS = 200
+
+
+def old_add_points(DB, user_id, points, won, game_name):
+    # add_points قبل results.py: transaction لكل نتيجة
+    today = date.today().isoformat()
+    with DB.conn() as c:
+        row = c.execute(
+            'SELECT streak, last_game_date FROM users WHERE user_id = ?', (user_id,)
+        ).fetchone()
+        streak = 0
+        if row:
+            last_date = row['last_game_date']
+            if last_date:
+                diff = (date.today() - date.fromisoformat(last_date)).days
+                streak = (row['streak'] or 0) + 1 if diff == 1 else (row['streak'] or 0) if diff == 0 else 1
+            else:
+                streak = 1
+        c.execute('''UPDATE users SET
+            points = points + ?, games = games + 1, wins = wins + ?,
+            streak = ?, last_game_date = ?, activity = CURRENT_TIMESTAMP
+            WHERE user_id = ?''', (points, 1 if won else 0, streak, today, user_id))
+        c.execute(
+            'INSERT INTO history (user_id, game, points, won) VALUES (?, ?, ?, ?)',
+            (user_id, game_name, points, 1 if won else 0)
+        )
+
+
+def replay(record):
+    # كل خيط يرسل نصيبه من النتائج - اللاعبون موزعون على الخيوط
+    def send(first):
+        for i in range(first, RESULTS, THREADS):
+            record(f'U{(first * 7 + i) % USERS}', 1 + i % 3, i % 2 == 0, 'لغز')
+
+    threads = [threading.Thread(target=send, args=(t,)) for t in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def total_points(DB):
+    with DB.conn() as c:
+        return c.execute('SELECT COALESCE(SUM(points), 0) FROM users').fetchone()[0]
+
+
+def main():
+    from database import DB
+
+    DB.init()
+    for i in range(USERS):
+        DB.register_user(f'U{i}', f'player{i}')
+    expected = sum(1 + i % 3 for i in range(RESULTS))
+    failures = []
+
+    started = time.perf_counter()
+    replay(lambda *args: old_add_points(DB, *args))
+    old_elapsed = time.perf_counter() - started
+    old_points = total_points(DB)
+
+    started = time.perf_counter()
+    replay(DB.add_points)
+    DB.results.flush()
+    new_elapsed = time.perf_counter() - started
+    new_points = total_points(DB) - old_points
+
+    stats = DB.results.stats()
+    print(f"{RESULTS} results from {THREADS} threads:")
+    print(f"  per-call add_points: {old_elapsed:.2f} s, {RESULTS / old_elapsed:,.0f} results/s")
+    print(f"  batched ResultQueue: {new_elapsed:.2f} s, {RESULTS / new_elapsed:,.0f} results/s "
+          f"({stats['batches']} batches, commit p50 {stats['commit_ms']['p50']} ms, "
+          f"latency p50 {stats['latency_ms']['p50']} ms / p99 {stats['latency_ms']['p99']} ms)")
+    for name, points in (('per-call', old_points), ('batched', new_points)):
+        if points != expected:
+            failures.append(f"{name} path recorded {points} points, expected {expected}")
+    if stats['committed'] != RESULTS:
+        failures.append(f"batched path committed {stats['committed']} of {RESULTS} results")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    try:
+        status = main()
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    sys.exit(status)
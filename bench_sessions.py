@@ -0,0 +1,96 @@
+"""make bench-sessions: كلفة تحميل وحفظ حالة اللعبة لكل رسالة في كل مخزن
+
+لكل مخزن (memory، sqlite، redis) تبدأ GROUPS لعبة من كل الأنواع، ثم كل رسالة:
+get_game ثم تعديل (add_score) ثم set_game المشروط بالنسخة - كما في
+handle_game_answer. يطبع زمن القراءة والكتابة والدورة كاملة (p50/p99) وحجم
+الحالة المخزنة. redis يقاس على SESSIONS_REDIS_URL، ويتخطى اذا لم يكن متاحا.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix='botmesh-sessions-')
+ROUNDS = int(os.getenv('SESSIONS_ROUNDS', '5000'))
+GROUPS = 50
+REDIS_URL = os.getenv('SESSIONS_REDIS_URL', 'redis://127.0.0.1:6379/15')
+GAMES = (
+    'RiddleGame', 'CategoryGame', 'SongGame', 'OppositeGame', 'ScrambleGame', 'LettersGame',
+    'FastGame', 'MafiaGame', 'WordColorGame', 'LetterGame', 'ChainGame', 'CompatibilityGame'
+)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def summary(label, values_us):
+    return f"{label} p50 {percentile(values_us, 50):.1f} us, p99 {percentile(values_us, 99):.1f} us"
+
+
+def bench(store):
+    import games
+    from session_store import encode_state
+
+    groups = [f'bench-{i}' for i in range(GROUPS)]
+    sizes = []
+    for i, group_id in enumerate(groups):
+        def factory(name=GAMES[i % len(GAMES)]):
+            game = getattr(games, name)(None)
+            game.start_game()
+            return game
+        game, _ = store.get_or_create(group_id, factory, None)
+        sizes.append(len(encode_state(game)))
+
+    load_us, store_us, round_us = [], [], []
+    conflicts = 0
+    for step in range(ROUNDS):
+        group_id = groups[step % GROUPS]
+        started = time.perf_counter()
+        game = store.get_game(group_id, None)
+        loaded = time.perf_counter()
+        game.add_score(f'U{step % 7}', f'player{step % 7}')
+        saving = time.perf_counter()
+        if not store.set_game(group_id, game):
+            conflicts += 1
+        done = time.perf_counter()
+        load_us.append((loaded - started) * 1e6)
+        store_us.append((done - saving) * 1e6)
+        round_us.append((done - started) * 1e6)
+
+    for group_id in groups:
+        store.pop_game(group_id)
+    print(f"{store.name}: {ROUNDS} messages over {GROUPS} games, "
+          f"state {min(sizes)}-{max(sizes)} bytes")
+    print(f"  {summary('get_game', load_us)}; {summary('set_game', store_us)}")
+    print(f"  {summary('round trip', round_us)}, {ROUNDS / (sum(round_us) / 1e6):,.0f} msgs/s")
+    return conflicts
+
+
+def main():
+    from session_store import RedisError, create_session_store
+
+    failures = []
+    urls = ('memory', 'sqlite:///' + os.path.join(WORKDIR, 'sessions.db'), REDIS_URL)
+    for url in urls:
+        try:
+            store = create_session_store(url)
+            store.has_game('bench-0')
+        except (OSError, RedisError) as e:
+            print(f"{url}: skipped ({e})")
+            continue
+        if bench(store):
+            failures.append(f"{store.name}: set_game lost a write with no other writer")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    try:
+        status = main()
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    sys.exit(status)
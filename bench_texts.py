@@ -0,0 +1,120 @@
+"""make bench-texts: سحب أوامر النصوص - random.choice + list.remove مقابل دورات _Pool
+
+المسار القديم (get_random قبل _Pool): قائمة متبقية لكل أمر، اختيار عشوائي ثم
+list.remove تحت lock واحد، ونسخ القائمة كاملة عند انتهائها. يقاس على ملف
+وهمي بعدد LINES سطر: زمن السحب الواحد، ثم عدد السحبات في الثانية من THREADS
+خيوط. بعدها فحص عدم التكرار: الخيوط تسحب من advice.txt في مجموعة واحدة عددا
+غير مكتمل من الدورات، فكل سطر يجب ان يظهر N او N+1 مرة، ومجموعة اخرى تبدأ
+دورتها كاملة.
+"""
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from threading import Lock
+
+LINES = int(os.getenv('TEXTS_LINES', '50000'))
+THREADS = int(os.getenv('TEXTS_THREADS', '8'))
+SECONDS = float(os.getenv('TEXTS_SECONDS', '1'))
+CYCLES = 17
+
+
+class OldTextCommands:
+    """get_random قبل _Pool - بنفس الـ lock والنسخ"""
+
+    def __init__(self, data):
+        self._data = data
+        self._remaining = {key: list(lines) for key, lines in data.items()}
+        self._lock = Lock()
+
+    def get_random(self, cmd, group_id=None):
+        with self._lock:
+            if not self._remaining.get(cmd):
+                self._remaining[cmd] = self._data[cmd].copy()
+            choice = random.choice(self._remaining[cmd])
+            self._remaining[cmd].remove(choice)
+        return choice
+
+
+def per_call_us(get_random, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        get_random('bench', 'G1')
+    return (time.perf_counter() - started) * 1e6 / calls
+
+
+def calls_per_second(get_random):
+    stop = threading.Event()
+    counts = []
+
+    def draw(group_id):
+        calls = 0
+        while not stop.is_set():
+            get_random('bench', group_id)
+            calls += 1
+        counts.append(calls)
+
+    threads = [threading.Thread(target=draw, args=(f'G{t}',)) for t in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    time.sleep(SECONDS)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / SECONDS
+
+
+def draw_counts(TextCommands, cmd, group_id, draws):
+    drawn = []
+    per_thread = draws // THREADS
+
+    def draw(count):
+        drawn.extend(TextCommands.get_random(cmd, group_id) for _ in range(count))
+
+    threads = [threading.Thread(target=draw, args=(per_thread + (t < draws % THREADS),))
+               for t in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return Counter(drawn)
+
+
+def main():
+    from text_commands import TextCommands
+
+    lines = [f'سطر رقم {i}' for i in range(LINES)]
+    old = OldTextCommands({'bench': lines})
+    TextCommands.load_all()
+    TextCommands._data['bench'] = tuple(lines)
+
+    old_us = per_call_us(old.get_random, min(2000, LINES))
+    new_us = per_call_us(TextCommands.get_random, 20000)
+    print(f"{LINES}-line file: {old_us:,.1f} -> {new_us:,.2f} us/call")
+    old_rate = calls_per_second(old.get_random)
+    new_rate = calls_per_second(TextCommands.get_random)
+    print(f"{THREADS} threads: {old_rate:,.0f} -> {new_rate:,.0f} calls/s")
+
+    failures = []
+    advice = TextCommands._data['advice']
+    size = len(advice)
+    draws = CYCLES * size + size // 2
+    counts = draw_counts(TextCommands, 'advice', 'no-repeat', draws)
+    seen = set(counts.values())
+    print(f"{THREADS} threads drew {draws} lines from the {size}-line advice file: "
+          f"each line drawn {sorted(seen)} times, {len(counts)} distinct")
+    if len(counts) != len(set(advice)) or not seen <= {CYCLES, CYCLES + 1}:
+        failures.append("advice draws repeated a line before its cycle was complete")
+    # مجموعة اخرى لا تتأثر بما سحبته الأولى
+    other = draw_counts(TextCommands, 'advice', 'other-group', size)
+    if set(other.values()) != {1}:
+        failures.append("a second group's first cycle repeated lines")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,8 @@
 import os
-import re
 from dotenv import load_dotenv
 
+from normalize import normalize
+
 load_dotenv()
 
 class Config:
@@ -17,6 +18,18 @@ class Config:
     
     ENV = os.getenv("ENV", "production")
     
+    _pool = os.getenv('LINE_POOL_SIZE', '10').strip()
+    LINE_POOL_SIZE = int(_pool) if _pool else 10
+    LINE_CONNECT_TIMEOUT = float(os.getenv('LINE_CONNECT_TIMEOUT', '3'))
+    LINE_READ_TIMEOUT = float(os.getenv('LINE_READ_TIMEOUT', '10'))
+    # ارسال الرد كـ JSON جاهز بدل بناء نماذج line-bot-sdk
+    LINE_RAW_REPLY = os.getenv('LINE_RAW_REPLY', '1') != '0'
+    OUTBOUND_WORKERS = int(os.getenv('OUTBOUND_WORKERS', '8'))
+    OUTBOUND_RETRIES = int(os.getenv('OUTBOUND_RETRIES', '3'))
+    # اوامر النصوص: عدم التكرار لكل مجموعة على حدة (0: مشترك لكل المجموعات)
+    TEXT_POOLS_PER_GROUP = os.getenv('TEXT_POOLS_PER_GROUP', '1') != '0'
+    TEXT_POOLS_MAX = int(os.getenv('TEXT_POOLS_MAX', '5000'))
+    
     QUESTIONS_PER_GAME = 5
     MAX_NAME_LENGTH = 50
     MIN_NAME_LENGTH = 2
@@ -39,11 +52,4 @@ class Config:
     
     @staticmethod
     def normalize(text):
-        if not text:
-            return ""
-        text = re.sub(r"[\u064B-\u065F\u0670]", "", text)
-        replacements = {"أ": "ا", "إ": "ا", "آ": "ا", "ى": "ي", "ة": "ه", "ؤ": "و", "ئ": "ي"}
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        text = re.sub(r"[^\w\sء-ي]", "", text)
-        return text.strip().lower()
+        return normalize(text)
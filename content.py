@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import threading
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+# ملفات المحتوى: content/<bank>.json بصيغة {"version": N, "items": ...}
+CONTENT_DIR = os.getenv(
+    'CONTENT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'content')
+)
+
+# الاصدارات السابقة المحفوظة لكل بنك - للألعاب التي بدأت قبل اعادة التحميل
+HISTORY = 3
+
+# الاسم -> (items, version, mtime)
+_banks = {}
+# (الاسم، الاصدار) -> items
+_history = {}
+_lock = threading.Lock()
+
+
+class ContentError(ValueError):
+    pass
+
+
+def _freeze(value):
+    # القوائم tuple والكائنات dict للقراءة فقط - البنك مشترك بين كل الألعاب
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    return value
+
+
+def _path(name):
+    return os.path.join(CONTENT_DIR, f'{name}.json')
+
+
+def _load(name):
+    path = _path(name)
+    try:
+        mtime = os.path.getmtime(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        version = int(data['version'])
+        items = _freeze(data['items'])
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise ContentError(f"Cannot load content bank {name} from {path}: {e}") from e
+    if not items:
+        raise ContentError(f"Content bank {name} is empty")
+    logger.info(f"Loaded content bank {name} v{version} ({len(items)} items)")
+    return items, version, mtime
+
+
+def _remember(name, items, version):
+    _history[(name, version)] = items
+    old = sorted(v for n, v in _history if n == name)[:-HISTORY]
+    for v in old:
+        _history.pop((name, v), None)
+
+
+def snapshot(name, version=None):
+    """(items, version) للبنك - الاصدار المطلوب ان كان محفوظا والا الحالي"""
+    if version is not None:
+        items = _history.get((name, version))
+        if items is not None:
+            return items, version
+    loaded = _banks.get(name)
+    if loaded is None:
+        with _lock:
+            if name not in _banks:
+                loaded = _load(name)
+                _remember(name, loaded[0], loaded[1])
+                _banks[name] = loaded
+            loaded = _banks[name]
+    return loaded[0], loaded[1]
+
+
+def bank(name):
+    """بنك المحتوى الحالي بالاسم - يقرأ من الملف مرة واحدة لكل عملية"""
+    return snapshot(name)[0]
+
+
+def version(name):
+    return snapshot(name)[1]
+
+
+def preload():
+    """تحميل كل البنوك في content/ - في الـ master قبل fork لتتشاركها الـ workers"""
+    for filename in sorted(os.listdir(CONTENT_DIR)):
+        if filename.endswith('.json'):
+            snapshot(filename[:-len('.json')])
+    return len(_banks)
+
+
+def reload():
+    """اعادة تحميل البنوك التي تغير ملفها - ترجع أسماء البنوك المستبدلة
+
+    البنك الجديد يبنى كاملا ثم يستبدل بتعيين واحد، فالقراءة لا تنتظر.
+    تغيير المحتوى يتطلب رفع version حتى لا يختلط اصداران بنفس الرقم.
+    """
+    changed = []
+    for name, (items, current, mtime) in list(_banks.items()):
+        try:
+            modified = os.path.getmtime(_path(name))
+            if modified == mtime:
+                continue
+            new_items, new_version, new_mtime = _load(name)
+        except (OSError, ContentError) as e:
+            logger.error(f"Content reload failed for {name}: {e}")
+            # البنك الحالي يبقى، والملف المعطوب لا يعاد فحصه حتى يتغير
+            if isinstance(e, ContentError):
+                _banks[name] = (items, current, modified)
+            continue
+
+        with _lock:
+            if new_version == current:
+                if new_items != items:
+                    logger.error(f"Content bank {name} changed without a version bump - not reloaded")
+                # نفس المحتوى (او مرفوض): لا يعاد فحصه حتى يتغير الملف مرة اخرى
+                _banks[name] = (items, current, new_mtime)
+                continue
+            _remember(name, new_items, new_version)
+            _banks[name] = (new_items, new_version, new_mtime)
+        changed.append(name)
+    return changed
+
+
+def stats():
+    return {name: {'version': bank_version, 'items': len(items)}
+            for name, (items, bank_version, _) in list(_banks.items())}
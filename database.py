@@ -1,10 +1,15 @@
 import sqlite3
+import atexit
 import logging
 import os
-from threading import Lock
+import time
+from collections import OrderedDict
+from threading import Lock, Thread, Event
 from datetime import datetime, timedelta, date
 from contextlib import contextmanager
 
+from results import ResultQueue
+
 logger = logging.getLogger(__name__)
 
 if os.getenv("RENDER"):
@@ -12,12 +17,102 @@ if os.getenv("RENDER"):
 else:
     DB_PATH = os.getenv("DB_PATH", "data/bot65.db")
 
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "5000"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "300"))
+# أقصى مدة قبل رؤية تعديلات worker آخر على المستخدمين
+USER_CACHE_CHECK = float(os.getenv("USER_CACHE_CHECK", "1.0"))
+# أقصى تأخير لكتابة وقت النشاط في قاعدة البيانات
+ACTIVITY_FLUSH_SECONDS = float(os.getenv("ACTIVITY_FLUSH_SECONDS", "5"))
+# نافذة تجميع نتائج الألعاب قبل كتابتها في transaction واحدة
+RESULTS_WINDOW_MS = int(os.getenv("RESULTS_WINDOW_MS", "100"))
+RESULTS_FSYNC = os.getenv("RESULTS_FSYNC", "0") == "1"
+# عدد المتصدرين المحفوظين في جدول leaderboard
+LEADERBOARD_SIZE = 20
+
+_MISS = object()
+
+
+class UserCache:
+    """LRU + TTL لصفوف المستخدمين - يحفظ None ايضا لغير المسجلين"""
+
+    def __init__(self, maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = Lock()
+        self._data = OrderedDict()
+        # آخر (generation, epoch) رآها هذا الـ worker من جدول meta
+        self.generation = None
+        self.epoch = None
+        self.checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None or entry[0] < now:
+                self.misses += 1
+                return _MISS
+            self._data.move_to_end(user_id)
+            self.hits += 1
+            return dict(entry[1]) if entry[1] else None
+
+    def put(self, user_id, row):
+        with self._lock:
+            self._data[user_id] = (time.monotonic() + self.ttl, row)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def update(self, user_id, **fields):
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry and entry[1]:
+                entry[1].update(fields)
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                if self._data.pop(user_id, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 3) if total else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'generation': self.generation
+            }
+
 
 class DB:
     _lock = Lock()
     _connection_pool = []
     _pool_size = 5
+    # العملية التي فتحت اتصالات الـ pool - اتصالات sqlite لا تعبر fork
+    _pool_pid = None
+    _inherited = []
     _initialized = False
+    cache = UserCache()
+    _activity = {}
+    _activity_lock = Lock()
+    _flusher_pid = None
+    _flusher_stop = Event()
 
     @staticmethod
     @contextmanager
@@ -31,6 +126,12 @@ class DB:
 
         c = None
         with DB._lock:
+            if DB._pool_pid != os.getpid():
+                # pool موروث من الـ master: لا يستخدم ولا يغلق هنا (اغلاقه قد يحذف
+                # ملف WAL المستخدم في العمليات الاخرى) - يبقى مرجعه حتى خروج العملية
+                DB._inherited.extend(DB._connection_pool)
+                DB._connection_pool = []
+                DB._pool_pid = os.getpid()
             if DB._connection_pool:
                 c = DB._connection_pool.pop()
 
@@ -57,6 +158,23 @@ class DB:
             c.close()
             raise
 
+    @staticmethod
+    def open_pool():
+        """فتح اتصال أول في العملية الحالية حتى لا يدفع أول طلب كلفة الاتصال"""
+        with DB.conn() as c:
+            c.execute('SELECT 1')
+
+    @staticmethod
+    def close_pool():
+        """اغلاق اتصالات العملية الحالية - قبل fork في الـ master"""
+        with DB._lock:
+            pool, DB._connection_pool = DB._connection_pool, []
+            owned = DB._pool_pid == os.getpid()
+            DB._pool_pid = None
+        if owned:
+            for c in pool:
+                c.close()
+
     @staticmethod
     def init():
         try:
@@ -76,6 +194,8 @@ class DB:
 
                 c.execute('''CREATE TABLE IF NOT EXISTS history (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    result_key TEXT,
+                    group_id TEXT,
                     user_id TEXT,
                     game TEXT,
                     points INTEGER,
@@ -84,6 +204,50 @@ class DB:
                     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
                 )''')
 
+                # generation: يزيد مع كل تعديل على مستخدم، epoch: مع كل حذف
+                c.execute('''CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                )''')
+                c.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('users_generation', 0), ('users_epoch', 0)")
+
+                # أفضل LEADERBOARD_SIZE لاعب - تحدث مع كل دفعة نتائج بدلا من ترتيب users
+                c.execute('''CREATE TABLE IF NOT EXISTS leaderboard (
+                    user_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    points INTEGER NOT NULL,
+                    games INTEGER NOT NULL,
+                    wins INTEGER NOT NULL,
+                    streak INTEGER NOT NULL
+                )''')
+                # أسرع اجابة لكل مستخدم في الألعاب ذات المهلة (بالملي ثانية)
+                c.execute('''CREATE TABLE IF NOT EXISTS best_times (
+                    user_id TEXT NOT NULL,
+                    game TEXT NOT NULL,
+                    ms INTEGER NOT NULL,
+                    played TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (user_id, game)
+                ) WITHOUT ROWID''')
+
+                # رقم يتغير مع كل تغيير في ترتيب: all، group:<id>، game:<اسم>
+                c.execute('''CREATE TABLE IF NOT EXISTS leaderboard_versions (
+                    scope TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0
+                )''')
+
+                # آخر تشغيل لكل مهمة خلفية - مشترك بين العمليات والمضيفات على نفس القرص
+                c.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                    name TEXT PRIMARY KEY,
+                    owner TEXT,
+                    started REAL,
+                    finished REAL,
+                    duration_ms REAL,
+                    max_ms REAL NOT NULL DEFAULT 0,
+                    runs INTEGER NOT NULL DEFAULT 0,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT
+                )''')
+
                 # إضافة الأعمدة الجديدة إذا لم تكن موجودة (للمستخدمين القدامى)
                 try:
                     c.execute('ALTER TABLE users ADD COLUMN streak INTEGER DEFAULT 0')
@@ -93,28 +257,99 @@ class DB:
                     c.execute('ALTER TABLE users ADD COLUMN last_game_date TEXT')
                 except Exception:
                     pass
+                try:
+                    c.execute('ALTER TABLE users ADD COLUMN gen INTEGER DEFAULT 0')
+                except Exception:
+                    pass
+                try:
+                    c.execute('ALTER TABLE history ADD COLUMN result_key TEXT')
+                except Exception:
+                    pass
+                try:
+                    c.execute('ALTER TABLE history ADD COLUMN group_id TEXT')
+                except Exception:
+                    pass
+                try:
+                    # وقت حجز المهمة - يفرغ عند فشلها حتى تعاد قبل موعدها التالي
+                    c.execute('ALTER TABLE jobs ADD COLUMN claimed REAL')
+                except Exception:
+                    pass
 
                 c.execute('CREATE INDEX IF NOT EXISTS idx_points ON users(points DESC)')
                 c.execute('CREATE INDEX IF NOT EXISTS idx_activity ON users(activity DESC)')
+                c.execute('CREATE INDEX IF NOT EXISTS idx_users_gen ON users(gen)')
+                c.execute('''CREATE INDEX IF NOT EXISTS idx_users_rank
+                    ON users(points DESC, wins DESC) WHERE points > 0''')
+                c.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_history_key
+                    ON history(result_key) WHERE result_key IS NOT NULL''')
                 c.execute('CREATE INDEX IF NOT EXISTS idx_history_user ON history(user_id)')
-                c.execute('CREATE INDEX IF NOT EXISTS idx_history_game ON history(game)')
+                c.execute('CREATE INDEX IF NOT EXISTS idx_history_game ON history(game, user_id, points, won)')
+                c.execute('''CREATE INDEX IF NOT EXISTS idx_history_group
+                    ON history(group_id, user_id, points, won) WHERE group_id IS NOT NULL''')
                 c.execute('CREATE INDEX IF NOT EXISTS idx_history_played ON history(played DESC)')
 
+                DB._rebuild_leaderboard(c)
+
                 row = c.execute('SELECT COUNT(*) as count FROM users').fetchone()
                 user_count = row['count'] if row else 0
 
             DB._initialized = True
+            # نتائج workers توقفوا قبل كتابتها
+            DB.results.replay_orphans()
             logger.info(f"Database initialized at: {DB_PATH} | Users: {user_count}")
         except Exception as e:
             logger.error(f"Database init failed: {e}")
             raise
 
+    @staticmethod
+    def _next_generation(c):
+        """رقم generation جديد داخل نفس transaction التعديل"""
+        return c.execute(
+            "UPDATE meta SET value = value + 1 WHERE key = 'users_generation' RETURNING value"
+        ).fetchone()[0]
+
+    @staticmethod
+    def _written(generation):
+        # اذا لم يكتب worker آخر منذ آخر فحص، لا حاجة لفحص جديد بسبب كتابتنا
+        if DB.cache.generation == generation - 1:
+            DB.cache.generation = generation
+
+    @staticmethod
+    def _sync_cache():
+        """حذف المستخدمين الذين عدلهم worker آخر من الـ cache"""
+        now = time.monotonic()
+        if now - DB.cache.checked_at < USER_CACHE_CHECK:
+            return
+        DB.cache.checked_at = now
+        with DB.conn() as c:
+            meta = dict(c.execute(
+                "SELECT key, value FROM meta WHERE key IN ('users_generation', 'users_epoch')"
+            ).fetchall())
+            generation, epoch = meta['users_generation'], meta['users_epoch']
+            if epoch != DB.cache.epoch or DB.cache.generation is None:
+                DB.cache.clear()
+            elif generation != DB.cache.generation:
+                rows = c.execute(
+                    'SELECT user_id FROM users WHERE gen > ?', (DB.cache.generation,)
+                ).fetchall()
+                DB.cache.invalidate([row['user_id'] for row in rows])
+        DB.cache.generation, DB.cache.epoch = generation, epoch
+
     @staticmethod
     def get_user(user_id):
         try:
+            DB._sync_cache()
+            user = DB.cache.get(user_id)
+            if user is not _MISS:
+                return user
+            known = DB.cache.generation
             with DB.conn() as c:
                 row = c.execute('SELECT * FROM users WHERE user_id = ?', (user_id,)).fetchone()
-                return dict(row) if row else None
+                user = dict(row) if row else None
+            # اذا تغيرت generation اثناء القراءة قد يكون الصف قديما - لا يحفظ
+            if DB.cache.generation == known:
+                DB.cache.put(user_id, user)
+            return dict(user) if user else None
         except Exception as e:
             logger.error(f"Error fetching user {user_id}: {e}")
             return None
@@ -123,88 +358,246 @@ class DB:
     def register_user(user_id, name):
         try:
             with DB.conn() as c:
-                existing = c.execute('SELECT user_id FROM users WHERE user_id = ?', (user_id,)).fetchone()
+                generation = DB._next_generation(c)
+                existing = c.execute('SELECT name FROM users WHERE user_id = ?', (user_id,)).fetchone()
                 if existing:
                     c.execute(
-                        'UPDATE users SET name = ?, activity = CURRENT_TIMESTAMP WHERE user_id = ?',
-                        (name, user_id)
+                        'UPDATE users SET name = ?, gen = ?, activity = CURRENT_TIMESTAMP WHERE user_id = ?',
+                        (name, generation, user_id)
                     )
+                    if existing['name'] != name:
+                        DB._bump_leaderboards(c, DB._user_scopes(c, user_id, name))
                 else:
-                    c.execute('INSERT INTO users (user_id, name) VALUES (?, ?)', (user_id, name))
+                    c.execute('INSERT INTO users (user_id, name, gen) VALUES (?, ?, ?)', (user_id, name, generation))
                     logger.info(f"New user registered: {user_id} - {name}")
+                row = c.execute('SELECT * FROM users WHERE user_id = ?', (user_id,)).fetchone()
+            DB.cache.put(user_id, dict(row))
+            DB._written(generation)
             return True
         except Exception as e:
+            DB.cache.invalidate([user_id])
             logger.error(f"Error registering user {user_id}: {e}")
             return False
 
     @staticmethod
     def update_activity(user_id):
+        """تسجيل النشاط في الذاكرة - يكتب مع غيره كل ACTIVITY_FLUSH_SECONDS"""
+        DB._ensure_flusher()
+        # نفس صيغة CURRENT_TIMESTAMP في SQLite (UTC) حتى تبقى المقارنات صحيحة
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        with DB._activity_lock:
+            DB._activity[user_id] = now
+
+    @staticmethod
+    def _ensure_flusher():
+        # الخيط لا ينتقل مع fork - يبدأ عند أول استخدام داخل كل عملية
+        if DB._flusher_pid == os.getpid():
+            return
+        with DB._activity_lock:
+            if DB._flusher_pid == os.getpid():
+                return
+            DB._flusher_pid = os.getpid()
+            DB._flusher_stop = Event()
+            Thread(target=DB._flush_loop, args=(DB._flusher_stop,),
+                   name="activity-flush", daemon=True).start()
+            atexit.register(DB.flush_activity)
+
+    @staticmethod
+    def _flush_loop(stop):
+        while not stop.wait(ACTIVITY_FLUSH_SECONDS):
+            DB.flush_activity()
+
+    @staticmethod
+    def flush_activity():
+        """كتابة أوقات النشاط المتراكمة في transaction واحدة"""
+        with DB._activity_lock:
+            if not DB._activity:
+                return 0
+            pending, DB._activity = DB._activity, {}
         try:
             with DB.conn() as c:
-                c.execute(
-                    'UPDATE users SET activity = CURRENT_TIMESTAMP WHERE user_id = ?',
-                    (user_id,)
+                c.executemany(
+                    'UPDATE users SET activity = ? WHERE user_id = ? AND (activity IS NULL OR activity < ?)',
+                    [(ts, uid, ts) for uid, ts in pending.items()]
                 )
+            return len(pending)
         except Exception as e:
-            logger.error(f"Error updating activity {user_id}: {e}")
+            # اعادة الأوقات للمحاولة التالية دون الكتابة فوق ما هو أحدث منها
+            with DB._activity_lock:
+                for uid, ts in pending.items():
+                    if DB._activity.get(uid, '') < ts:
+                        DB._activity[uid] = ts
+            logger.error(f"Error flushing activity for {len(pending)} users: {e}")
+            return 0
 
     @staticmethod
-    def add_points(user_id, points, won, game_name):
+    def add_points(user_id, points, won, game_name, group_id=None):
+        """تسجيل نتيجة لعبة - تكتب مع غيرها في دفعة واحدة (انظر results.py)"""
         try:
-            today = date.today().isoformat()
-            with DB.conn() as c:
-                row = c.execute(
-                    'SELECT streak, last_game_date FROM users WHERE user_id = ?',
-                    (user_id,)
-                ).fetchone()
+            DB.results.submit(user_id, points, won, game_name, group_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error queueing points for {user_id}: {e}")
+            return False
+
+    @staticmethod
+    def _next_streak(streak, last_date, day):
+        if not last_date:
+            return 1, day
+        try:
+            diff = (date.fromisoformat(day) - date.fromisoformat(last_date)).days
+        except Exception:
+            return 1, day
+        if diff < 0:
+            # نتيجة قديمة أعيدت من journal - لا تغير السلسلة
+            return streak, last_date
+        if diff == 1:
+            return streak + 1, day
+        if diff == 0:
+            return streak, day
+        return 1, day
+
+    @staticmethod
+    def _commit_results(records):
+        """كتابة دفعة نتائج في transaction واحدة - ترجع عدد النتائج الجديدة"""
+        user_ids = list({r['u'] for r in records})
+        with DB.conn() as c:
+            users = {}
+            for i in range(0, len(user_ids), 500):
+                chunk = user_ids[i:i + 500]
+                for row in c.execute(
+                    f'SELECT user_id, streak, last_game_date FROM users WHERE user_id IN ({",".join("?" * len(chunk))})',
+                    chunk
+                ):
+                    users[row['user_id']] = [0, 0, 0, row['streak'] or 0, row['last_game_date']]
 
-                streak = 0
-                if row:
-                    old_streak = row['streak'] or 0
-                    last_date = row['last_game_date']
-                    if last_date:
-                        try:
-                            last = date.fromisoformat(last_date)
-                            diff = (date.today() - last).days
-                            if diff == 1:
-                                streak = old_streak + 1
-                            elif diff == 0:
-                                streak = old_streak
-                            else:
-                                streak = 1
-                        except Exception:
-                            streak = 1
-                    else:
-                        streak = 1
-
-                c.execute('''UPDATE users SET
+            # السلسلة تحسب بترتيب النتائج داخل الدفعة
+            applied = 0
+            scopes = set()
+            for r in records:
+                totals = users.get(r['u'])
+                if totals is None:
+                    logger.warning(f"Dropping result {r['k']} for unknown user {r['u']}")
+                    continue
+                inserted = c.execute(
+                    '''INSERT OR IGNORE INTO history (result_key, group_id, user_id, game, points, won, played)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                    (r['k'], r.get('c'), r['u'], r['g'], r['p'], r['w'],
+                     datetime.utcfromtimestamp(r['t']).strftime('%Y-%m-%d %H:%M:%S'))
+                ).rowcount
+                if not inserted:
+                    continue
+                applied += 1
+                scopes.add(f"game:{r['g']}")
+                if r.get('c'):
+                    scopes.add(f"group:{r['c']}")
+                totals[0] += r['p']
+                totals[1] += 1
+                totals[2] += r['w']
+                totals[3], totals[4] = DB._next_streak(
+                    totals[3], totals[4], date.fromtimestamp(r['t']).isoformat()
+                )
+
+            changed = {uid: t for uid, t in users.items() if t[1]}
+            if not changed:
+                return applied
+            generation = DB._next_generation(c)
+            rows = {}
+            for uid, (points, games, wins, streak, last_date) in changed.items():
+                rows[uid] = c.execute('''UPDATE users SET
                     points = points + ?,
-                    games = games + 1,
+                    games = games + ?,
                     wins = wins + ?,
                     streak = ?,
                     last_game_date = ?,
+                    gen = ?,
                     activity = CURRENT_TIMESTAMP
-                    WHERE user_id = ?''',
-                    (points, 1 if won else 0, streak, today, user_id)
-                )
+                    WHERE user_id = ?
+                    RETURNING points, games, wins, streak, last_game_date''',
+                    (points, games, wins, streak, last_date, generation, uid)
+                ).fetchone()
 
-                c.execute(
-                    'INSERT INTO history (user_id, game, points, won) VALUES (?, ?, ?, ?)',
-                    (user_id, game_name, points, 1 if won else 0)
-                )
+            if DB._update_leaderboard(c, list(changed)):
+                scopes.add('all')
+            DB._bump_leaderboards(c, scopes)
 
-            logger.info(f"Added {points} pts to {user_id} ({game_name}) streak={streak}")
-            return True
-        except Exception as e:
-            logger.error(f"Error adding points to {user_id}: {e}")
+        for uid, row in rows.items():
+            DB.cache.update(uid, gen=generation, **dict(row))
+        DB._written(generation)
+        logger.info(f"Committed {applied} results for {len(changed)} users")
+        return applied
+
+    @staticmethod
+    def _user_scopes(c, user_id, name):
+        """بطاقات الصدارة التي يظهر فيها اسم المستخدم - تتغير مع تغيير اسمه"""
+        scopes = []
+        if c.execute('UPDATE leaderboard SET name = ? WHERE user_id = ?', (name, user_id)).rowcount:
+            scopes.append('all')
+        # صدارة المجموعة واللعبة تقرأ الاسم من users عند كل بناء للبطاقة
+        rows = c.execute(
+            'SELECT DISTINCT group_id, game FROM history WHERE user_id = ? AND points > 0', (user_id,)
+        ).fetchall()
+        scopes.extend({f"group:{row['group_id']}" for row in rows if row['group_id']})
+        scopes.extend({f"game:{row['game']}" for row in rows if row['game']})
+        return scopes
+
+    @staticmethod
+    def _bump_leaderboards(c, scopes):
+        c.executemany(
+            '''INSERT INTO leaderboard_versions (scope, version) VALUES (?, 1)
+            ON CONFLICT(scope) DO UPDATE SET version = version + 1''',
+            [(scope,) for scope in scopes]
+        )
+
+    @staticmethod
+    def _update_leaderboard(c, user_ids):
+        """ادخال اللاعبين المعدلين ثم قص الجدول - يرجع True اذا تغير الترتيب"""
+        if not user_ids:
             return False
+        marks = ",".join("?" * len(user_ids))
+        # النقاط لا تنقص الا بالحذف، فمن يخرج من القائمة لا يعود الا بنقاط جديدة
+        c.execute(f'''INSERT INTO leaderboard (user_id, name, points, games, wins, streak)
+            SELECT user_id, name, points, games, wins, streak FROM users
+            WHERE user_id IN ({marks}) AND points > 0
+            ON CONFLICT(user_id) DO UPDATE SET
+                name = excluded.name, points = excluded.points, games = excluded.games,
+                wins = excluded.wins, streak = excluded.streak''', user_ids)
+        c.execute('''DELETE FROM leaderboard WHERE user_id NOT IN (
+            SELECT user_id FROM leaderboard ORDER BY points DESC, wins DESC LIMIT ?)''',
+            (LEADERBOARD_SIZE,))
+        return c.execute(
+            f'SELECT 1 FROM leaderboard WHERE user_id IN ({marks}) LIMIT 1', user_ids
+        ).fetchone() is not None
+
+    @staticmethod
+    def _rebuild_leaderboard(c):
+        c.execute('DELETE FROM leaderboard')
+        c.execute('''INSERT INTO leaderboard (user_id, name, points, games, wins, streak)
+            SELECT user_id, name, points, games, wins, COALESCE(streak, 0) FROM users
+            WHERE points > 0
+            ORDER BY points DESC, wins DESC
+            LIMIT ?''', (LEADERBOARD_SIZE,))
+        DB._bump_leaderboards(c, ['all'])
+
+    @staticmethod
+    def leaderboard_version(scope='all'):
+        try:
+            with DB.conn() as c:
+                row = c.execute(
+                    'SELECT version FROM leaderboard_versions WHERE scope = ?', (scope,)
+                ).fetchone()
+                return row['version'] if row else 0
+        except Exception as e:
+            logger.error(f"Error fetching leaderboard version {scope}: {e}")
+            return None
 
     @staticmethod
     def get_leaderboard(limit=20):
         try:
             with DB.conn() as c:
-                rows = c.execute('''SELECT user_id, name, points, games, wins, streak
-                    FROM users
+                source = 'leaderboard' if limit <= LEADERBOARD_SIZE else 'users'
+                rows = c.execute(f'''SELECT user_id, name, points, games, wins, streak
+                    FROM {source}
                     WHERE points > 0
                     ORDER BY points DESC, wins DESC
                     LIMIT ?''', (limit,)).fetchall()
@@ -213,16 +606,72 @@ class DB:
             logger.error(f"Error fetching leaderboard: {e}")
             return []
 
+    @staticmethod
+    def _history_leaderboard(column, value, limit):
+        try:
+            with DB.conn() as c:
+                rows = c.execute(f'''SELECT h.user_id, u.name,
+                        SUM(h.points) AS points, COUNT(*) AS games, SUM(h.won) AS wins
+                    FROM history h JOIN users u ON u.user_id = h.user_id
+                    WHERE h.{column} = ?
+                    GROUP BY h.user_id
+                    HAVING SUM(h.points) > 0
+                    ORDER BY points DESC, wins DESC
+                    LIMIT ?''', (value, limit)).fetchall()
+                return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error fetching {column} leaderboard {value}: {e}")
+            return []
+
+    @staticmethod
+    def get_group_leaderboard(group_id, limit=10):
+        return DB._history_leaderboard('group_id', group_id, limit)
+
+    @staticmethod
+    def get_game_leaderboard(game_name, limit=10):
+        return DB._history_leaderboard('game', game_name, limit)
+
+    @staticmethod
+    def record_best_time(user_id, game_name, ms):
+        """حفظ زمن الاجابة اذا كان أسرع من السابق - يرجع True للرقم الجديد"""
+        try:
+            with DB.conn() as c:
+                row = c.execute('''INSERT INTO best_times (user_id, game, ms) VALUES (?, ?, ?)
+                    ON CONFLICT (user_id, game) DO UPDATE
+                    SET ms = excluded.ms, played = CURRENT_TIMESTAMP
+                    WHERE excluded.ms < best_times.ms
+                    RETURNING ms''', (user_id, game_name, ms)).fetchone()
+            return row is not None
+        except Exception as e:
+            logger.error(f"Error recording best time for {user_id}: {e}")
+            return False
+
+    @staticmethod
+    def get_best_time(user_id, game_name):
+        try:
+            with DB.conn() as c:
+                row = c.execute(
+                    'SELECT ms FROM best_times WHERE user_id = ? AND game = ?', (user_id, game_name)
+                ).fetchone()
+            return row['ms'] if row else None
+        except Exception as e:
+            logger.error(f"Error fetching best time for {user_id}: {e}")
+            return None
+
     @staticmethod
     def set_theme(user_id, theme):
         try:
             with DB.conn() as c:
+                generation = DB._next_generation(c)
                 c.execute(
-                    'UPDATE users SET theme = ?, activity = CURRENT_TIMESTAMP WHERE user_id = ?',
-                    (theme, user_id)
+                    'UPDATE users SET theme = ?, gen = ?, activity = CURRENT_TIMESTAMP WHERE user_id = ?',
+                    (theme, generation, user_id)
                 )
+            DB.cache.update(user_id, theme=theme, gen=generation)
+            DB._written(generation)
             return True
         except Exception as e:
+            DB.cache.invalidate([user_id])
             logger.error(f"Error setting theme for {user_id}: {e}")
             return False
 
@@ -233,20 +682,74 @@ class DB:
 
     @staticmethod
     def cleanup_inactive_users(days=7):
+        """الأخطاء لا تلتقط هنا - تسجلها مهمة الخلفية في جدول jobs وتعيد المحاولة"""
+        # النشاط المؤجل يكتب أولا حتى لا يحذف مستخدم نشط
+        DB.flush_activity()
+        cutoff_date = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        with DB.conn() as c:
+            c.execute('''DELETE FROM history WHERE user_id IN (
+                SELECT user_id FROM users WHERE activity < ?)''', (cutoff_date,))
+            c.execute('''DELETE FROM best_times WHERE user_id IN (
+                SELECT user_id FROM users WHERE activity < ?)''', (cutoff_date,))
+            result = c.execute(
+                'DELETE FROM users WHERE activity < ?', (cutoff_date,)
+            )
+            deleted = result.rowcount
+            if deleted:
+                c.execute("UPDATE meta SET value = value + 1 WHERE key = 'users_epoch'")
+                c.execute('UPDATE leaderboard_versions SET version = version + 1')
+                DB._rebuild_leaderboard(c)
+        if deleted:
+            DB.cache.clear()
+        logger.info(f"Cleaned up {deleted} inactive users (>{days} days)")
+        return deleted
+
+    @staticmethod
+    def claim_job(name, owner, now, min_interval):
+        """حجز تشغيل المهمة اذا مر min_interval ثانية على آخر حجز ناجح - ذري بين العمليات"""
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
             with DB.conn() as c:
-                c.execute('''DELETE FROM history WHERE user_id IN (
-                    SELECT user_id FROM users WHERE activity < ?)''', (cutoff_date,))
-                result = c.execute(
-                    'DELETE FROM users WHERE activity < ?', (cutoff_date,)
-                )
-                deleted = result.rowcount
-            logger.info(f"Cleaned up {deleted} inactive users (>{days} days)")
-            return deleted
+                # قراءة أولا: القراءة لا تنتظر قفل الكتابة الذي تمسكه المهمة الجارية
+                row = c.execute('SELECT claimed FROM jobs WHERE name = ?', (name,)).fetchone()
+                if row is not None and row['claimed'] is not None and row['claimed'] > now - min_interval:
+                    return False
+                row = c.execute('''INSERT INTO jobs (name, owner, started, claimed) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (name) DO UPDATE
+                    SET owner = excluded.owner, started = excluded.started, claimed = excluded.claimed
+                    WHERE jobs.claimed IS NULL OR jobs.claimed <= excluded.claimed - ?
+                    RETURNING name''', (name, owner, now, now, min_interval)).fetchone()
+            return row is not None
         except Exception as e:
-            logger.error(f"Cleanup error: {e}")
-            return 0
+            logger.error(f"Error claiming job {name}: {e}")
+            return False
+
+    @staticmethod
+    def finish_job(name, owner, started, duration_ms, error=None):
+        try:
+            with DB.conn() as c:
+                c.execute('''INSERT INTO jobs
+                    (name, owner, started, finished, duration_ms, max_ms, runs, failures, last_error)
+                    VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET
+                    owner = excluded.owner, started = excluded.started, finished = excluded.finished,
+                    duration_ms = excluded.duration_ms, max_ms = MAX(jobs.max_ms, excluded.max_ms),
+                    runs = jobs.runs + 1, failures = jobs.failures + excluded.failures,
+                    last_error = COALESCE(excluded.last_error, jobs.last_error),
+                    claimed = CASE WHEN excluded.failures THEN NULL ELSE jobs.claimed END''',
+                    (name, owner, started, time.time(), duration_ms, duration_ms,
+                     int(error is not None), error))
+        except Exception as e:
+            logger.error(f"Error recording job {name}: {e}")
+
+    @staticmethod
+    def get_jobs():
+        try:
+            with DB.conn() as c:
+                rows = c.execute('SELECT * FROM jobs ORDER BY name').fetchall()
+            return {row['name']: {key: row[key] for key in row.keys() if key != 'name'} for row in rows}
+        except Exception as e:
+            logger.error(f"Error fetching jobs: {e}")
+            return None
 
     @staticmethod
     def get_stats():
@@ -255,7 +758,7 @@ class DB:
                 users_count = c.execute('SELECT COUNT(*) as count FROM users').fetchone()['count']
                 games_count = c.execute('SELECT COUNT(*) as count FROM history').fetchone()['count']
                 total_points = c.execute('SELECT SUM(points) as total FROM users').fetchone()['total'] or 0
-                cutoff = datetime.now() - timedelta(days=7)
+                cutoff = (datetime.utcnow() - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
                 inactive_count = c.execute(
                     'SELECT COUNT(*) as count FROM users WHERE activity < ?', (cutoff,)
                 ).fetchone()['count']
@@ -270,3 +773,11 @@ class DB:
         except Exception as e:
             logger.error(f"Error getting stats: {e}")
             return None
+
+
+DB.results = ResultQueue(
+    DB._commit_results,
+    os.path.dirname(DB_PATH),
+    window=RESULTS_WINDOW_MS / 1000,
+    fsync=RESULTS_FSYNC
+)
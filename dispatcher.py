@@ -0,0 +1,176 @@
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[idx]
+
+
+class EventDispatcher:
+    """طابور محدود لأحداث webhook يعالجها workers مع الحفاظ على ترتيب كل مجموعة
+
+    كل مجموعة تذهب دائما لنفس الـ shard (طابور + خيط واحد)، فأحداث المجموعة
+    الواحدة تعالج بالتسلسل بينما المجموعات المختلفة تعالج بالتوازي. لذلك لا
+    تحتاج الألعاب الى locks خاصة بها لمنع تسجيل نفس الاجابة مرتين.
+
+    الترتيب داخل العملية فقط: مع عدة workers تصل أحداث نفس المجموعة لأكثر من
+    عملية، ويمنع التعارض بينها set_game المشروط بنسخة اللعبة (انظر stress.py).
+    """
+
+    def __init__(self, workers=None, maxsize=1000, name="events"):
+        self.workers = max(1, workers or os.cpu_count() or 4)
+        self.maxsize = max(self.workers, maxsize)
+        self.name = name
+        self._lock = threading.Lock()
+        self._pid = None
+        self._shards = []
+        self._threads = []
+        self._stopped = False
+        self._wait_ms = deque(maxlen=1000)
+        self._run_ms = deque(maxlen=1000)
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        # الخيوط لا تنتقل مع fork - تبدأ عند أول استخدام داخل كل عملية
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            per_shard = -(-self.maxsize // self.workers)
+            self._shards = [queue.Queue(maxsize=per_shard) for _ in range(self.workers)]
+            self._threads = [
+                threading.Thread(target=self._worker, args=(shard,), name=f"{self.name}-{i}", daemon=True)
+                for i, shard in enumerate(self._shards)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._stopped = False
+            self._pid = os.getpid()
+            logger.info(f"Dispatcher {self.name} started: {self.workers} workers, queue {self.maxsize}")
+
+    def _shard_for(self, key):
+        return self._shards[zlib.crc32(str(key).encode('utf-8')) % self.workers]
+
+    def submit(self, key, fn, *args, block=False):
+        """جدولة fn(*args) على shard المفتاح
+
+        يرجع Future، او None اذا كان الطابور ممتلئا و block=False او بعد stop().
+        """
+        self._ensure_started()
+        if self._stopped:
+            with self._lock:
+                self.dropped += 1
+            return None
+        future = Future()
+        try:
+            self._shard_for(key).put((time.monotonic(), future, fn, args), block=block)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return None
+        with self._lock:
+            self.enqueued += 1
+        return future
+
+    def run(self, key, fn, *args):
+        """تنفيذ fn(*args) على shard المفتاح وانتظار النتيجة - مباشرة بعد stop()"""
+        future = self.submit(key, fn, *args, block=True)
+        if future is None:
+            return fn(*args)
+        return future.result()
+
+    def stop(self, timeout=10):
+        """معالجة ما في الطوابير ثم ايقاف الخيوط - قبل خروج الـ worker
+
+        أحداث async ردت عليها LINE بـ 200 ولن تعاد، فتعالج قبل الخروج بحد أقصى
+        timeout ثانية. يرجع عدد الأحداث التي لم تعالج.
+        """
+        if self._pid != os.getpid():
+            return 0
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._stopped = True
+        # علامة نهاية في آخر كل طابور: الخيط يخرج بعد معالجة ما قبلها
+        marked = []
+        for shard in self._shards:
+            try:
+                shard.put(None, timeout=max(0, deadline - time.monotonic()))
+                marked.append(True)
+            except queue.Full:
+                marked.append(False)
+        left = 0
+        for shard, thread, has_marker in zip(self._shards, self._threads, marked):
+            thread.join(max(0, deadline - time.monotonic()))
+            if thread.is_alive():
+                left += shard.qsize() - has_marker
+        if left:
+            logger.warning(f"Dispatcher {self.name} stopped with {left} unprocessed events")
+        return left
+
+    def _worker(self, shard):
+        while True:
+            item = shard.get()
+            if item is None:
+                shard.task_done()
+                return
+            queued_at, future, fn, args = item
+            started = time.monotonic()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                logger.error(f"Dispatcher {self.name} handler error: {e}", exc_info=True)
+                with self._lock:
+                    self.failed += 1
+                future.set_exception(e)
+            finished = time.monotonic()
+            with self._lock:
+                self.processed += 1
+                self._wait_ms.append((started - queued_at) * 1000)
+                self._run_ms.append((finished - started) * 1000)
+            shard.task_done()
+
+    def depth(self):
+        return sum(shard.qsize() for shard in self._shards) if self._pid == os.getpid() else 0
+
+    def stats(self):
+        with self._lock:
+            wait = list(self._wait_ms)
+            run = list(self._run_ms)
+            counters = {
+                'enqueued': self.enqueued,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'failed': self.failed
+            }
+        return {
+            'workers': self.workers,
+            'capacity': self.maxsize,
+            'depth': self.depth(),
+            **counters,
+            'queue_wait_ms': {
+                'p50': round(percentile(wait, 50), 2),
+                'p95': round(percentile(wait, 95), 2),
+                'max': round(max(wait), 2) if wait else 0.0
+            },
+            'handle_ms': {
+                'p50': round(percentile(run, 50), 2),
+                'p95': round(percentile(run, 95), 2),
+                'max': round(max(run), 2) if run else 0.0
+            }
+        }
@@ -14,5 +14,19 @@ from games.letter_game import LetterGame
 __all__ = [
     'CategoryGame', 'FastGame', 'CompatibilityGame', 'SongGame',
     'OppositeGame', 'ChainGame', 'LettersGame', 'RiddleGame',
-    'ScrambleGame', 'MafiaGame', 'WordColorGame', 'LetterGame'
+    'ScrambleGame', 'MafiaGame', 'WordColorGame', 'LetterGame',
+    'GAME_CLASSES'
 ]
+
+# لاسترجاع اللعبة من حالتها المحفوظة حسب اسم الفئة
+GAME_CLASSES = {
+    cls.__name__: cls for cls in (
+        CategoryGame, FastGame, CompatibilityGame, SongGame,
+        OppositeGame, ChainGame, LettersGame, RiddleGame,
+        ScrambleGame, MafiaGame, WordColorGame, LetterGame
+    )
+}
+
+# تطبيع كل بنوك الاجابات مرة واحدة عند التحميل (قبل fork في gunicorn)
+for _game_class in GAME_CLASSES.values():
+    _game_class.index_answers()
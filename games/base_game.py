@@ -1,8 +1,16 @@
 from linebot.v3.messaging import TextMessage, FlexMessage, FlexContainer
-import re
+import random
+import time
 from abc import ABC, abstractmethod
 from threading import Lock
 from datetime import datetime
+from line_messages import flex_message, FlexTemplate
+from normalize import normalize
+import content
+
+# اجابات كل سؤال بعد التطبيع: tuple الاجابات -> frozenset
+_answer_sets = {}
+ANSWER_SETS_MAX = 50000
 
 
 class BaseGame(ABC):
@@ -10,6 +18,12 @@ class BaseGame(ABC):
 
     BUTTON_COLOR = "#F8FBFC"
 
+    # مهلة كل سؤال بالثواني - None: السؤال ينتظر حتى يجيب احد او يكتب جاوب
+    QUESTION_SECONDS = None
+
+    # قوالب بطاقة السؤال المبنية: (الفئة، الاسم، الثيم، لمح، جاوب، جواب سابق، سطر فرعي)
+    _question_templates = {}
+
     THEMES = {
         "light": {
             "primary": "#1E293B",
@@ -41,6 +55,40 @@ class BaseGame(ABC):
         }
     }
 
+    @property
+    def current_answer(self):
+        return self._current_answer
+
+    @current_answer.setter
+    def current_answer(self, value):
+        # الاجابات المقبولة تحسب مرة واحدة مع تغيير السؤال وليس مع كل رسالة
+        self._current_answer = value
+        self._accepted_answers = answer_set(value)
+
+    @property
+    def accepted_answers(self):
+        """الاجابات الصحيحة للسؤال الحالي بعد التطبيع"""
+        return self._accepted_answers
+
+    # بنوك المحتوى: اسم الخاصية -> اسم البنك في content/
+    CONTENT = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # خاصية الفئة هي المحتوى وقت التحميل (لـ answer_bank)، وكل لعبة تربط نسختها في load_content
+        for attr, name in cls.__dict__.get('CONTENT', {}).items():
+            setattr(cls, attr, content.bank(name))
+
+    @classmethod
+    def answer_bank(cls):
+        """قوائم اجابات بنك الأسئلة - تطبع كلها عند التحميل (انظر index_answers)"""
+        return ()
+
+    @classmethod
+    def index_answers(cls):
+        for answers in cls.answer_bank():
+            answer_set(answers)
+
     def __init__(self, line_bot_api, theme="light", game_type="competitive", difficulty=1):
         self.line_bot_api = line_bot_api
         self.theme = theme
@@ -59,26 +107,84 @@ class BaseGame(ABC):
         self.supports_hint = True
         self.supports_reveal = True
         self.used_questions = set()
+        self.seed = random.getrandbits(32)
+        # معرف المجموعة يعينه app عند كل حدث - لا يدخل في الحالة المحفوظة
+        self.group_id = None
+        # وقت استلام الرسالة الحالية من LINE - يعينه app مثل group_id
+        self.received_at = None
+        # وقت عرض السؤال الحالي (للألعاب ذات المهلة)
+        self.question_started = None
+        # (seed، الترتيب) - يعاد حسابه من seed بعد الاسترجاع
+        self._order = None
+        self.content_versions = {}
+        self.load_content()
 
         # إصلاح: lock لمنع race condition عند الإجابة المتزامنة
         self._lock = Lock()
         # إصلاح: تتبع وقت بدء اللعبة للـ timeout
         self._started_at = datetime.now()
 
-    def normalize_text(self, text):
-        if not text:
-            return ""
-        text = str(text).strip().lower()
-        text = re.sub(r'[\u064B-\u065F\u0670]', '', text)
-        replacements = {
-            'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
-            'ى': 'ي', 'ة': 'ه', 'ؤ': 'و', 'ئ': 'ي'
-        }
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        text = re.sub(r'[^\w\s]', '', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
+    # الحقول المتغيرة فقط - بنك الأسئلة وقوالب Flex لا تدخل في الحالة المحفوظة
+    STATE_FIELDS = (
+        'theme', 'questions_count', 'current_question', 'game_active',
+        'scores', 'answered_users', 'withdrawn_users', 'current_answer',
+        'previous_answer', 'previous_question', '_started_at', 'seed'
+    )
+
+    def load_content(self, versions=None):
+        """ربط بنوك المحتوى باللعبة: الاصدار المحفوظ ان كان متاحا والا الحالي
+
+        اللعبة تبقى على نفس المحتوى حتى تنتهي ولو اعيد تحميل الملفات.
+        """
+        versions = versions or {}
+        self.content_versions = {}
+        for attr, name in self.CONTENT.items():
+            items, version = content.snapshot(name, versions.get(name))
+            setattr(self, attr, items)
+            self.content_versions[name] = version
+
+    def to_state(self):
+        """حالة اللعبة القابلة للحفظ (انظر games/snapshot.py)"""
+        state = {name: getattr(self, name, None) for name in self.STATE_FIELDS}
+        state['scores'] = [[uid, s['name'], s['score']] for uid, s in self.scores.items()]
+        state['_started_at'] = int(self._started_at.timestamp())
+        return state
+
+    def load_state(self, state):
+        for name in self.STATE_FIELDS:
+            if name in state:
+                setattr(self, name, state[name])
+        self.scores = {uid: {'name': name, 'score': score}
+                       for uid, name, score in state.get('scores') or []}
+        if state.get('_started_at'):
+            self._started_at = datetime.fromtimestamp(state['_started_at'])
+        if state.get('content_versions'):
+            self.load_content(state['content_versions'])
+
+    @classmethod
+    def from_state(cls, state, line_bot_api):
+        """استرجاع اللعبة من حالة محفوظة"""
+        game = cls(line_bot_api, theme=state.get('theme') or 'light')
+        game.load_state(state)
+        return game
+
+    def shuffled_indices(self, count):
+        """ترتيب عشوائي ثابت مشتق من seed - يحفظ في الحالة بدل القائمة كاملة"""
+        cached = self._order
+        if cached is not None and cached[0] == self.seed and len(cached[1]) == count:
+            return cached[1]
+        order = list(range(count))
+        random.Random(self.seed).shuffle(order)
+        self._order = (self.seed, tuple(order))
+        return self._order[1]
+
+    def question_index(self, count):
+        """رقم عنصر السؤال الحالي في بنك من count عنصر - بدون تكرار حتى ينتهي البنك"""
+        return self.shuffled_indices(count)[self.current_question % count]
+
+    @staticmethod
+    def normalize_text(text):
+        return normalize(text)
 
     def add_score(self, user_id, display_name, points=1):
         if user_id not in self.scores:
@@ -92,9 +198,81 @@ class BaseGame(ABC):
     def build_text_message(self, text):
         return TextMessage(text=str(text))
 
-    def build_question_message(self, question_text, subtitle=""):
-        colors = self.get_theme_colors()
+    @property
+    def question_deadline(self):
+        if not self.QUESTION_SECONDS or self.question_started is None:
+            return None
+        return self.question_started + self.QUESTION_SECONDS
+
+    def elapsed_ms(self):
+        """الوقت من عرض السؤال حتى استلام الرسالة الحالية"""
+        if self.question_started is None:
+            return None
+        received = self.received_at or time.time()
+        return max(0, int((received - self.question_started) * 1000))
+
+    def handle_timeout(self):
+        """انتهاء مهلة السؤال: اظهار الجواب والانتقال للسؤال التالي"""
+        deadline = self.question_deadline
+        if not self.game_active or deadline is None or deadline > time.time():
+            return None
+        return self.handle_reveal()
+
+    def build_question_message(self, question_text, subtitle="", **values):
+        """بطاقة السؤال من قالب محفوظ - تبدل فيه القيم المتغيرة فقط"""
+        if self.QUESTION_SECONDS:
+            self.question_started = time.time()
+        template = self.question_template(bool(self.previous_answer), bool(subtitle))
         progress = int((self.current_question / self.questions_count) * 100)
+        values.update(
+            progress_text=f"السؤال {self.current_question + 1} من {self.questions_count}",
+            progress_width=f"{progress}%",
+            question=str(question_text)
+        )
+        if self.previous_answer:
+            values["previous"] = f"الجواب السابق: {self.previous_answer}"
+        if subtitle:
+            values["subtitle"] = str(subtitle)
+        return flex_message(self.game_name, template.render(**values))
+
+    def question_template(self, has_previous, has_subtitle):
+        key = (type(self), self.game_name, self.theme, self.supports_hint,
+               self.supports_reveal, has_previous, has_subtitle)
+        template = BaseGame._question_templates.get(key)
+        if template is None:
+            template = self._compile_question_template(has_previous, has_subtitle)
+            BaseGame._question_templates[key] = template
+        return template
+
+    def question_body(self, colors, has_subtitle):
+        """عقد السؤال بعد الفاصل ومسارات القيم المتغيرة فيها
+
+        تعيد تعريفها الألعاب ذات التصميم الخاص (اسرع، لون).
+        """
+        nodes = [{
+            "type": "text",
+            "text": "-",
+            "size": "lg",
+            "wrap": True,
+            "color": colors["text"],
+            "align": "center",
+            "margin": "lg"
+        }]
+        slots = {"question": (0, "text")}
+        if has_subtitle:
+            nodes.append({
+                "type": "text",
+                "text": "-",
+                "size": "sm",
+                "color": colors["text2"],
+                "align": "center",
+                "margin": "md"
+            })
+            slots["subtitle"] = (1, "text")
+        return nodes, slots
+
+    def _compile_question_template(self, has_previous, has_subtitle):
+        colors = self.THEMES.get(self.theme, self.THEMES['light'])
 
         contents = [
             {
@@ -112,7 +290,7 @@ class BaseGame(ABC):
                 "contents": [
                     {
                         "type": "text",
-                        "text": f"السؤال {self.current_question + 1} من {self.questions_count}",
+                        "text": "-",
                         "size": "xs",
                         "color": colors["text2"],
                         "align": "center"
@@ -126,7 +304,7 @@ class BaseGame(ABC):
                                 "type": "box",
                                 "layout": "vertical",
                                 "contents": [],
-                                "width": f"{progress}%",
+                                "width": "0%",
                                 "height": "4px",
                                 "backgroundColor": colors["success"],
                                 "cornerRadius": "2px"
@@ -139,8 +317,12 @@ class BaseGame(ABC):
                 ]
             }
         ]
+        slots = {
+            "progress_text": ("body", "contents", 1, "contents", 0, "text"),
+            "progress_width": ("body", "contents", 1, "contents", 1, "contents", 0, "width")
+        }
 
-        if self.previous_answer:
+        if has_previous:
             contents.extend([
                 {"type": "separator", "margin": "md", "color": colors["border"]},
                 {
@@ -153,7 +335,7 @@ class BaseGame(ABC):
                     "contents": [
                         {
                             "type": "text",
-                            "text": f"الجواب السابق: {self.previous_answer}",
+                            "text": "-",
                             "size": "xs",
                             "color": colors["success"],
                             "weight": "bold",
@@ -162,29 +344,13 @@ class BaseGame(ABC):
                     ]
                 }
             ])
+            slots["previous"] = ("body", "contents", len(contents) - 1, "contents", 0, "text")
 
-        contents.extend([
-            {"type": "separator", "margin": "lg", "color": colors["border"]},
-            {
-                "type": "text",
-                "text": str(question_text),
-                "size": "lg",
-                "wrap": True,
-                "color": colors["text"],
-                "align": "center",
-                "margin": "lg"
-            }
-        ])
-
-        if subtitle:
-            contents.append({
-                "type": "text",
-                "text": str(subtitle),
-                "size": "sm",
-                "color": colors["text2"],
-                "align": "center",
-                "margin": "md"
-            })
+        contents.append({"type": "separator", "margin": "lg", "color": colors["border"]})
+        nodes, body_slots = self.question_body(colors, has_subtitle)
+        for name, path in body_slots.items():
+            slots[name] = ("body", "contents", len(contents) + path[0]) + path[1:]
+        contents.extend(nodes)
 
         footer_buttons = []
         if self.supports_hint:
@@ -233,11 +399,7 @@ class BaseGame(ABC):
                 "backgroundColor": colors["card"]
             }
         }
-
-        return FlexMessage(
-            alt_text=self.game_name,
-            contents=FlexContainer.from_dict(bubble)
-        )
+        return FlexTemplate(bubble, slots)
 
     def start_game(self):
         self.game_active = True
@@ -279,14 +441,14 @@ class BaseGame(ABC):
     def handle_hint(self):
         if not self.current_answer:
             return None
-        answer_sample = self.current_answer[0] if isinstance(self.current_answer, list) else str(self.current_answer)
+        answer_sample = self.current_answer[0] if isinstance(self.current_answer, (list, tuple)) else str(self.current_answer)
         hint = f"يبدأ بـ: {answer_sample[0]}\nعدد الحروف: {len(answer_sample)}"
         return {"response": self.build_text_message(hint), "points": 0}
 
     def handle_reveal(self):
         if not self.current_answer:
             return None
-        answer_text = " او ".join(self.current_answer) if isinstance(self.current_answer, list) else str(self.current_answer)
+        answer_text = " او ".join(self.current_answer) if isinstance(self.current_answer, (list, tuple)) else str(self.current_answer)
         self.previous_answer = answer_text
         self.current_question += 1
         self.answered_users.clear()
@@ -295,22 +457,20 @@ class BaseGame(ABC):
         return {"response": self.get_question(), "points": 0, "next_question": True}
 
     def validate_answer(self, normalized, user_id, display_name):
-        correct_answers = self.current_answer if isinstance(self.current_answer, list) else [self.current_answer]
-        for correct in correct_answers:
-            if self.normalize_text(str(correct)) == normalized:
-                return self.handle_correct_answer(user_id, display_name)
+        if normalized in self.accepted_answers:
+            return self.handle_correct_answer(user_id, display_name)
         return None
 
-    def handle_correct_answer(self, user_id, display_name):
+    def handle_correct_answer(self, user_id, display_name, points=1):
         # إصلاح: lock لمنع تسجيل نفس الإجابة مرتين في المجموعات
         with self._lock:
             if user_id in self.answered_users:
                 return None
 
             self.answered_users.add(user_id)
-            points = self.add_score(user_id, display_name, 1)
+            points = self.add_score(user_id, display_name, points)
 
-            answer_text = " او ".join(self.current_answer) if isinstance(self.current_answer, list) else str(self.current_answer)
+            answer_text = " او ".join(self.current_answer) if isinstance(self.current_answer, (list, tuple)) else str(self.current_answer)
             self.previous_answer = answer_text
             self.current_question += 1
             self.answered_users.clear()
@@ -472,3 +632,17 @@ class BaseGame(ABC):
             "game_over": True,
             "won": True
         }
+
+
+def answer_set(answers):
+    """frozenset الاجابات بعد التطبيع - محفوظ لكل قائمة اجابات"""
+    if answers is None:
+        return frozenset()
+    key = tuple(answers) if isinstance(answers, (list, tuple)) else (answers,)
+    accepted = _answer_sets.get(key)
+    if accepted is None:
+        if len(_answer_sets) >= ANSWER_SETS_MAX:
+            _answer_sets.clear()
+        accepted = frozenset(BaseGame.normalize_text(str(a)) for a in key) - {""}
+        _answer_sets[key] = accepted
+    return accepted
@@ -1,8 +1,16 @@
-import random
 from games.base_game import BaseGame
 
 
 class CategoryGame(BaseGame):
+    CONTENT = {'CHALLENGES': 'categories'}
+
+    # used_challenges لم يعد مستخدما (الترتيب من seed) - يبقى مكانه لقراءة snapshots القديمة
+    STATE_FIELDS = BaseGame.STATE_FIELDS + ('used_challenges',)
+
+    @classmethod
+    def answer_bank(cls):
+        return (c["answers"] for c in cls.CHALLENGES)
+
     def __init__(self, line_bot_api, theme='light'):
         super().__init__(line_bot_api, theme=theme)
         self.game_name = "فئه"
@@ -10,54 +18,9 @@ class CategoryGame(BaseGame):
         self.supports_hint = True
         self.supports_reveal = True
 
-        self.challenges = [
-            {"category": "المطبخ", "letter": "ق", "answers": ["قدر", "قلاية"]},
-            {"category": "حيوان", "letter": "ب", "answers": ["بطة", "بقرة"]},
-            {"category": "فاكهة", "letter": "ت", "answers": ["تفاح", "توت"]},
-            {"category": "بلاد", "letter": "س", "answers": ["سعودية", "سوريا"]},
-            {"category": "اسم ولد", "letter": "م", "answers": ["محمد", "مصطفى"]},
-            {"category": "اسم بنت", "letter": "ف", "answers": ["فاطمة", "فرح"]},
-            {"category": "نبات", "letter": "ز", "answers": ["زيتون", "زهرة"]},
-            {"category": "جماد", "letter": "ك", "answers": ["كرسي", "كتاب"]},
-            {"category": "مهنة", "letter": "ط", "answers": ["طبيب", "طباخ"]},
-            {"category": "لون", "letter": "ا", "answers": ["احمر", "ازرق"]},
-            {"category": "رياضة", "letter": "ك", "answers": ["كرة", "كاراتيه"]},
-            {"category": "مدينة", "letter": "ج", "answers": ["جدة", "جازان"]},
-            {"category": "طعام", "letter": "ر", "answers": ["رز", "رمان"]},
-            {"category": "شراب", "letter": "ق", "answers": ["قهوة", "قمر الدين"]},
-            {"category": "اثاث", "letter": "س", "answers": ["سرير", "سجادة"]},
-            {"category": "ملابس", "letter": "ث", "answers": ["ثوب", "ثياب"]},
-            {"category": "حشرة", "letter": "ن", "answers": ["نملة", "نحلة"]},
-            {"category": "طائر", "letter": "ح", "answers": ["حمامة", "حسون"]},
-            {"category": "زهرة", "letter": "و", "answers": ["ورد", "ورقة"]},
-            {"category": "معدن", "letter": "ذ", "answers": ["ذهب", "ذرة"]},
-            {"category": "سيارة", "letter": "م", "answers": ["مرسيدس", "مازدا"]},
-            {"category": "عضو جسم", "letter": "ي", "answers": ["يد", "ياقة"]},
-            {"category": "دولة", "letter": "ل", "answers": ["لبنان", "ليبيا"]},
-            {"category": "حلوى", "letter": "ب", "answers": ["بسبوسة", "بقلاوة"]},
-            {"category": "ادوات مدرسية", "letter": "د", "answers": ["دفتر", "دبوس"]},
-            {"category": "وسيلة مواصلات", "letter": "ح", "answers": ["حافلة", "حمار"]},
-            {"category": "شهر", "letter": "ر", "answers": ["رمضان", "رجب"]},
-            {"category": "كوكب", "letter": "ز", "answers": ["زهرة", "زحل"]},
-            {"category": "بحر", "letter": "ا", "answers": ["احمر", "اسود"]},
-            {"category": "عاصمة", "letter": "ب", "answers": ["بغداد", "بيروت"]},
-            {"category": "دواء", "letter": "ا", "answers": ["اسبرين", "انسولين"]},
-            {"category": "جهاز منزلي", "letter": "غ", "answers": ["غسالة", "غلاية"]},
-            {"category": "حلوى شعبية", "letter": "ك", "answers": ["كنافة", "كعك"]},
-            {"category": "الة موسيقية", "letter": "ع", "answers": ["عود", "عصا"]},
-            {"category": "مكان عبادة", "letter": "م", "answers": ["مسجد", "معبد"]}
-        ]
-        self.used_challenges = []
-
     def get_question(self):
-        available = [c for c in self.challenges if c not in self.used_challenges]
-        if not available:
-            self.used_challenges = []
-            available = self.challenges.copy()
-            random.shuffle(available)
-
-        challenge = random.choice(available)
-        self.used_challenges.append(challenge)
+        idx = self.question_index(len(self.CHALLENGES))
+        challenge = self.CHALLENGES[idx]
         self.current_answer = challenge["answers"]
 
         return self.build_question_message(
@@ -89,8 +52,7 @@ class CategoryGame(BaseGame):
                 return self.end_game()
             return {"response": self.get_question(), "points": 0, "next_question": True}
 
-        valid_answers = [self.normalize_text(a) for a in self.current_answer]
-        if normalized in valid_answers:
+        if normalized in self.accepted_answers:
             return self.handle_correct_answer(user_id, display_name)
 
         return None
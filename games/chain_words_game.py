@@ -3,25 +3,23 @@ from games.base_game import BaseGame
 
 
 class ChainGame(BaseGame):
+    CONTENT = {'STARTING_WORDS': 'chain_words'}
+
+    STATE_FIELDS = BaseGame.STATE_FIELDS + ('last_word', 'used_words')
+
     def __init__(self, line_bot_api, difficulty=3, theme='light'):
         super().__init__(line_bot_api, difficulty=difficulty, theme=theme)
         self.game_name = "سلسله"
         self.supports_hint = True
         self.supports_reveal = True
 
-        self.starting_words = [
-            "سيارة", "تفاح", "قلم", "نجم", "كتاب", "باب", "رمل",
-            "طائرة", "حديقة", "مدرسة", "كرسي", "شمس", "قمر", "بحر",
-            "جبل", "وردة", "شجرة", "كوب", "ساعة", "مفتاح",
-            "نافذة", "طاولة", "مكتب", "دفتر", "حقيبة"
-        ]
         self.last_word = None
         self.used_words = set()
 
     def start_game(self):
         self.current_question = 0
         self.game_active = True
-        self.last_word = random.choice(self.starting_words)
+        self.last_word = random.choice(self.STARTING_WORDS)
         self.used_words = {self.normalize_text(self.last_word)}
         self.answered_users.clear()
         return self.get_question()
@@ -53,7 +51,7 @@ class ChainGame(BaseGame):
 
         if self.supports_reveal and normalized == "جاوب":
             required_letter = self.last_word[-1]
-            possible = [w for w in self.starting_words
+            possible = [w for w in self.STARTING_WORDS
                         if w.startswith(required_letter) and
                         self.normalize_text(w) not in self.used_words]
             example = random.choice(possible) if possible else f"كلمة تبدأ بـ {required_letter}"
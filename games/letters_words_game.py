@@ -1,52 +1,25 @@
-import random
 from games.base_game import BaseGame
 
 
 class LettersGame(BaseGame):
+    CONTENT = {'LETTER_SETS': 'letter_sets'}
+
+    STATE_FIELDS = BaseGame.STATE_FIELDS + ('found_words',)
+
+    @classmethod
+    def answer_bank(cls):
+        return (q["words"] for q in cls.LETTER_SETS)
+
     def __init__(self, line_bot_api, difficulty=3, theme='light'):
         super().__init__(line_bot_api, difficulty=difficulty, theme=theme)
         self.game_name = "تكوين"
 
-        self.letter_sets = [
-            {"letters": ["ق", "ل", "م", "ع", "ر"], "words": ["قلم", "علم", "عمر"]},
-            {"letters": ["ك", "ت", "ا", "ب", "م"], "words": ["كتاب", "كتب", "مكتب"]},
-            {"letters": ["د", "ر", "س", "ة", "م"], "words": ["مدرسة", "درس", "مدرس"]},
-            {"letters": ["ح", "د", "ي", "ق", "ة"], "words": ["حديقة", "حدق", "دقيق"]},
-            {"letters": ["ط", "ا", "و", "ل", "ة"], "words": ["طاولة", "طول", "والة"]},
-            {"letters": ["س", "ي", "ا", "ر", "ة"], "words": ["سيارة", "سار", "راس"]},
-            {"letters": ["ش", "ج", "ر", "ة", "ت"], "words": ["شجرة", "شجر", "جرت"]},
-            {"letters": ["ن", "ا", "ف", "ذ", "ة"], "words": ["نافذة", "نفذ", "اذن"]},
-            {"letters": ["م", "ك", "ت", "ب", "ة"], "words": ["مكتبة", "مكتب", "كتب"]},
-            {"letters": ["ح", "ق", "ي", "ب", "ة"], "words": ["حقيبة", "حبيب", "حقب"]},
-            {"letters": ["ط", "ا", "ئ", "ر", "ة"], "words": ["طائرة", "طار", "رائ"]},
-            {"letters": ["س", "ر", "ي", "ر", "ة"], "words": ["سرير", "سير", "رير"]},
-            {"letters": ["و", "س", "ا", "د", "ة"], "words": ["وسادة", "وساد", "سادة"]},
-            {"letters": ["خ", "ز", "ا", "ن", "ة"], "words": ["خزانة", "خزان", "زان"]},
-            {"letters": ["م", "ل", "ع", "ق", "ة"], "words": ["ملعقة", "معلق", "علق"]},
-            {"letters": ["ص", "ح", "ن", "و", "ة"], "words": ["صحن", "حصن", "نحو"]},
-            {"letters": ["ف", "ن", "ج", "ا", "ن"], "words": ["فنجان", "فنان", "جان"]},
-            {"letters": ["ف", "ر", "ن", "ة", "ت"], "words": ["فرن", "فرة", "نفر"]},
-            {"letters": ["ث", "ل", "ا", "ج", "ة"], "words": ["ثلاجة", "ثلج", "لجا"]},
-            {"letters": ["م", "ك", "ن", "س", "ة"], "words": ["مكنسة", "مسكن", "سكن"]},
-            {"letters": ["ص", "ا", "ب", "و", "ن"], "words": ["صابون", "صاب", "بون"]},
-            {"letters": ["ف", "ر", "ش", "ا", "ة"], "words": ["فرشاة", "فرش", "رشا"]},
-            {"letters": ["ش", "ا", "م", "ب", "و"], "words": ["شامبو", "شام", "بوش"]},
-            {"letters": ["ص", "ن", "د", "ل", "ة"], "words": ["صندل", "صدل", "ندل"]},
-            {"letters": ["م", "ن", "ش", "ف", "ة"], "words": ["منشفة", "منش", "شفن"]},
-            {"letters": ["م", "ع", "ج", "و", "ن"], "words": ["معجون", "معج", "جون"]},
-            {"letters": ["م", "ر", "ا", "ة", "ت"], "words": ["مراة", "مرات", "رمت"]},
-            {"letters": ["ق", "د", "ر", "ة", "ت"], "words": ["قدر", "درة", "قدرة"]},
-            {"letters": ["س", "ك", "ي", "ن", "ة"], "words": ["سكين", "سكن", "نسك"]},
-            {"letters": ["م", "م", "س", "ح", "ة"], "words": ["ممسحة", "مسح", "محس"]}
-        ]
-
-        random.shuffle(self.letter_sets)
         self.current_set = None
         self.found_words = set()
         self.required_words = 2
 
     def get_question(self):
-        q = self.letter_sets[self.current_question % len(self.letter_sets)]
+        q = self.LETTER_SETS[self.question_index(len(self.LETTER_SETS))]
         self.current_set = q
         self.current_answer = q["words"]
         self.found_words.clear()
@@ -83,9 +56,7 @@ class LettersGame(BaseGame):
                 return self.end_game()
             return {"response": self.get_question(), "points": 0, "next_question": True}
 
-        valid_words = [self.normalize_text(w) for w in self.current_answer]
-
-        if normalized not in valid_words or normalized in self.found_words:
+        if normalized not in self.accepted_answers or normalized in self.found_words:
             return None
 
         self.found_words.add(normalized)
@@ -1,8 +1,8 @@
 from linebot.v3.messaging import TextMessage, FlexMessage, FlexContainer
-from linebot.v3.messaging import PushMessageRequest
 import random
 import logging
 from games.base_game import BaseGame
+from outbound import outbound
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +10,13 @@ logger = logging.getLogger(__name__)
 class MafiaGame(BaseGame):
     """لعبة المافيا - لعبة جماعية"""
 
+    ROLES = ('mafia', 'detective', 'doctor', 'citizen')
+    PHASES = ('registration', 'night', 'day', 'voting', 'ended')
+
+    STATE_FIELDS = BaseGame.STATE_FIELDS + (
+        'players', 'phase', 'day_number', 'night_actions', 'votes'
+    )
+
     def __init__(self, line_bot_api, theme='light'):
         super().__init__(line_bot_api, theme=theme)
         self.game_name = "مافيا"
@@ -28,6 +35,37 @@ class MafiaGame(BaseGame):
         self.min_players = 4
         self.game_active = False
 
+    def to_state(self):
+        state = super().to_state()
+        # اللاعب: [المعرف، الاسم، رقم الدور، حي]
+        state['players'] = [
+            [uid, p['name'], self.ROLES.index(p['role']) if p['role'] else None, p['alive']]
+            for uid, p in self.players.items()
+        ]
+        state['phase'] = self.PHASES.index(self.phase)
+        state['night_actions'] = [
+            self.night_actions['mafia_target'],
+            self.night_actions['doctor_target'],
+            self.night_actions['detective_check']
+        ]
+        return state
+
+    def load_state(self, state):
+        super().load_state(state)
+        self.players = {
+            uid: {'name': name, 'role': self.ROLES[role] if role is not None else None, 'alive': alive}
+            for uid, name, role, alive in state.get('players') or []
+        }
+        self.phase = self.PHASES[state.get('phase') or 0]
+        self.day_number = state.get('day_number') or 0
+        mafia, doctor, detective = state.get('night_actions') or (None, None, None)
+        self.night_actions = {
+            'mafia_target': mafia,
+            'doctor_target': doctor,
+            'detective_check': detective
+        }
+        self.votes = state.get('votes') or {}
+
     # --- دالة مطلوبة من BaseGame ---
     def get_question(self):
         return self.registration_message()
@@ -164,9 +202,12 @@ class MafiaGame(BaseGame):
         roles = ['mafia', 'detective', 'doctor'] + \
                 ['citizen'] * (len(player_ids) - 3)
 
+        # الأدوار لا ترسل هنا: app يرسلها في الخلفية بعد حفظ اللعبة، فالمحاولة
+        # التي تخسر حفظ النسخة (وتعاد بأدوار جديدة) لا ترسل شيئا
+        pushes = {}
         for uid, role in zip(player_ids, roles):
             self.players[uid]['role'] = role
-            self._send_role_private(uid, role)
+            pushes[uid] = [self._role_message(role)]
 
         self.phase = "night"
         self.day_number = 1
@@ -176,10 +217,12 @@ class MafiaGame(BaseGame):
             "response": [
                 self.build_text_message("تم توزيع الادوار في الخاص"),
                 self.night_message()
-            ]
+            ],
+            "pushes": pushes,
+            "on_pushed": self._report_failed_roles
         }
 
-    def _send_role_private(self, user_id, role):
+    def _role_message(self, role):
         role_names = {
             'mafia': 'المافيا', 'detective': 'المحقق',
             'doctor': 'الدكتور', 'citizen': 'مواطن'
@@ -190,17 +233,18 @@ class MafiaGame(BaseGame):
             'doctor':   'دورك: احمي شخص ليلا - اكتب: احمي [اسم] او احمي نفسي',
             'citizen':  'دورك: صوت نهارا لطرد المافيا'
         }
-        try:
-            self.line_bot_api.push_message(
-                PushMessageRequest(
-                    to=user_id,
-                    messages=[TextMessage(
-                        text=f"دورك: {role_names[role]}\n{role_desc[role]}"
-                    )]
-                )
-            )
-        except Exception as e:
-            logger.error(f"Failed to send role to {user_id}: {e}")
+        return TextMessage(text=f"دورك: {role_names[role]}\n{role_desc[role]}")
+
+    def _report_failed_roles(self, results):
+        failed = [self.players[uid]['name'] for uid, ok in results.items()
+                  if not ok and uid in self.players]
+        if not failed or not self.group_id:
+            return
+        logger.warning(f"Roles not delivered in {self.group_id}: {len(failed)} players")
+        outbound.push(self.line_bot_api, self.group_id, [self.build_text_message(
+            "تعذر ارسال الدور في الخاص الى:\n" + "\n".join(failed) +
+            "\nيجب اضافة البوت كصديق"
+        )])
 
     # --- رسالة الليل ---
     def night_message(self):
@@ -1,49 +1,26 @@
-import random
 from games.base_game import BaseGame
 
 
 class OppositeGame(BaseGame):
+    CONTENT = {'QUESTIONS': 'opposites'}
+
+    # used_indices لم يعد مستخدما (الترتيب من seed) - يبقى مكانه لقراءة snapshots القديمة
+    STATE_FIELDS = BaseGame.STATE_FIELDS + ('used_indices',)
+
+    @classmethod
+    def answer_bank(cls):
+        return (q["answers"] for q in cls.QUESTIONS)
+
     def __init__(self, line_bot_api, difficulty=3, theme='light'):
         super().__init__(line_bot_api, difficulty=difficulty, theme=theme)
         self.game_name = "ضد"
         self.supports_hint = True
         self.supports_reveal = True
 
-        self.opposites = {
-            "كبير": ["صغير"], "طويل": ["قصير"], "سريع": ["بطيء"],
-            "ساخن": ["بارد"], "نظيف": ["وسخ"], "جديد": ["قديم"],
-            "صعب": ["سهل"], "قوي": ["ضعيف"], "غني": ["فقير"],
-            "سعيد": ["حزين"], "جميل": ["قبيح"], "ثقيل": ["خفيف"],
-            "عالي": ["منخفض"], "واسع": ["ضيق"], "طيب": ["خبيث"],
-            "شجاع": ["جبان"], "ذكي": ["غبي"], "بعيد": ["قريب"],
-            "فوق": ["تحت"], "يمين": ["يسار"], "اول": ["اخر"],
-            "كثير": ["قليل"], "رطب": ["جاف"], "مبتسم": ["عابس"],
-            "نشيط": ["كسول"], "صادق": ["كاذب"], "لين": ["قاسي"],
-            "مضيء": ["مظلم"], "حلو": ["مر"], "ناعم": ["خشن"],
-            "صحيح": ["خطا"], "داخل": ["خارج"], "مفتوح": ["مغلق"],
-            "ممتلئ": ["فارغ"], "شتاء": ["صيف"], "ليل": ["نهار"],
-            "شرق": ["غرب"], "شمال": ["جنوب"], "امن": ["خطر"],
-            "سلام": ["حرب"], "فرح": ["حزن"], "حياة": ["موت"],
-            "صحة": ["مرض"], "نور": ["ظلام"], "حق": ["باطل"],
-            "خير": ["شر"], "ذكر": ["انثى"]
-        }
-
-        self.questions_list = list(self.opposites.items())
-        random.shuffle(self.questions_list)
-        self.used_indices = []
-
     def get_question(self):
-        available = [i for i in range(len(self.questions_list)) if i not in self.used_indices]
-        if not available:
-            self.used_indices = []
-            random.shuffle(self.questions_list)
-            available = list(range(len(self.questions_list)))
-
-        idx = random.choice(available)
-        self.used_indices.append(idx)
-
-        word, answers = self.questions_list[idx]
-        self.current_answer = answers
+        q = self.QUESTIONS[self.question_index(len(self.QUESTIONS))]
+        word = q["word"]
+        self.current_answer = q["answers"]
         self.previous_question = f"ما عكس: {word}"
 
         return self.build_question_message(f"ما عكس كلمة:\n{word}")
@@ -66,8 +43,7 @@ class OppositeGame(BaseGame):
         if self.supports_reveal and normalized == "جاوب":
             return self.handle_reveal()
 
-        for correct in self.current_answer:
-            if self.normalize_text(correct) == normalized:
-                return self.handle_correct_answer(user_id, display_name)
+        if normalized in self.accepted_answers:
+            return self.handle_correct_answer(user_id, display_name)
 
         return None
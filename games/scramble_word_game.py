@@ -3,23 +3,21 @@ from games.base_game import BaseGame
 
 
 class ScrambleGame(BaseGame):
+    CONTENT = {'WORDS': 'scramble_words'}
+
+    QUESTION_SECONDS = 30
+
+    # used_words لم يعد مستخدما (الترتيب من seed) - يبقى مكانه لقراءة snapshots القديمة
+    STATE_FIELDS = BaseGame.STATE_FIELDS + ('used_words', 'question_started')
+
+    @classmethod
+    def answer_bank(cls):
+        return cls.WORDS
+
     def __init__(self, line_bot_api, difficulty=3, theme='light'):
         super().__init__(line_bot_api, difficulty=difficulty, theme=theme)
         self.game_name = "ترتيب"
 
-        self.words = [
-            "مدرسة", "كتاب", "قلم", "باب", "نافذة", "طاولة", "كرسي",
-            "سيارة", "طائرة", "حديقة", "شجرة", "وردة", "فراشة",
-            "سمكة", "نجمة", "قمر", "شمس", "سحابة", "مطر",
-            "جبل", "بحر", "نهر", "صحراء", "جزيرة",
-            "مدينة", "قرية", "بيت", "مسجد", "مستشفى", "جامعة",
-            "مكتبة", "متحف", "سوق", "ملعب", "مسبح", "مطار",
-            "جسر", "طريق", "شارع", "ميدان"
-        ]
-
-        random.shuffle(self.words)
-        self.used_words = []
-
     def scramble_word(self, word):
         letters = list(word)
         for _ in range(10):
@@ -29,14 +27,7 @@ class ScrambleGame(BaseGame):
         return " ".join(letters)
 
     def get_question(self):
-        available = [w for w in self.words if w not in self.used_words]
-        if not available:
-            self.used_words = []
-            available = self.words.copy()
-            random.shuffle(available)
-
-        word = random.choice(available)
-        self.used_words.append(word)
+        word = self.WORDS[self.question_index(len(self.WORDS))]
         self.current_answer = word
 
         return self.build_question_message(
@@ -60,7 +51,7 @@ class ScrambleGame(BaseGame):
                 return self.end_game()
             return {"response": self.get_question(), "points": 0, "next_question": True}
 
-        if normalized == self.normalize_text(str(self.current_answer)):
+        if normalized in self.accepted_answers:
             return self.handle_correct_answer(user_id, display_name)
 
         return None
@@ -0,0 +1,168 @@
+import struct
+import re
+
+# صيغة ثنائية مضغوطة لحالة الألعاب:
+#   MAGIC | VERSION | رمز الفئة | قائمة قيم STATE_FIELDS بالترتيب (بدون أسماء الحقول)
+#   | اصدارات بنوك المحتوى (اختياري - dict، والقراءات الأقدم تتجاهله)
+MAGIC = 0xB7
+VERSION = 1
+
+# رموز الفئات ثابتة - تضاف الألعاب الجديدة في النهاية فقط
+CLASS_CODES = (
+    'CategoryGame', 'FastGame', 'CompatibilityGame', 'SongGame',
+    'OppositeGame', 'ChainGame', 'LettersGame', 'RiddleGame',
+    'ScrambleGame', 'MafiaGame', 'WordColorGame', 'LetterGame'
+)
+
+_NONE, _FALSE, _TRUE = 0x00, 0x01, 0x02
+_INT, _STR, _LIST, _SET, _DICT, _LINE_ID, _FLOAT, _TUPLE = range(0x03, 0x0B)
+_FIXINT = 0x40      # 0x40..0x7F: اعداد صغيرة 0..63
+_FIXSTR = 0x80      # 0x80..0xBF: نصوص بطول 0..63 بايت
+
+# معرفات LINE: حرف + 32 رقم hex - تحفظ في 17 بايت بدلا من 33
+_LINE_ID_RE = re.compile(r'[UCR][0-9a-f]{32}')
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def dumps(game):
+    """تحويل اللعبة الى snapshot ثنائي"""
+    name = type(game).__name__
+    if name not in CLASS_CODES:
+        raise SnapshotError(f"Unknown game class: {name}")
+    state = game.to_state()
+    out = bytearray((MAGIC, VERSION, CLASS_CODES.index(name)))
+    _pack([state.get(field) for field in game.STATE_FIELDS], out)
+    if game.content_versions:
+        _pack(game.content_versions, out)
+    return bytes(out)
+
+
+def loads(data, line_bot_api):
+    """استرجاع اللعبة من snapshot ثنائي"""
+    from games import GAME_CLASSES
+
+    if len(data) < 3 or data[0] != MAGIC:
+        raise SnapshotError("Not a game snapshot")
+    if data[1] > VERSION:
+        raise SnapshotError(f"Unsupported snapshot version: {data[1]}")
+    if data[2] >= len(CLASS_CODES):
+        raise SnapshotError(f"Unknown class code: {data[2]}")
+
+    game_class = GAME_CLASSES[CLASS_CODES[data[2]]]
+    values, pos = _unpack(data, 3)
+    # الحقول المضافة في اصدارات لاحقة تبقى على قيمها الافتراضية
+    state = dict(zip(game_class.STATE_FIELDS, values))
+    if pos < len(data):
+        state['content_versions'], _ = _unpack(data, pos)
+    return game_class.from_state(state, line_bot_api)
+
+
+def _pack_uint(n, out):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _pack(value, out):
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, int):
+        if 0 <= value < 64:
+            out.append(_FIXINT | value)
+        else:
+            out.append(_INT)
+            _pack_uint((value << 1) ^ (value >> 63) if value < 0 else value << 1, out)
+    elif isinstance(value, str):
+        if len(value) == 33 and _LINE_ID_RE.fullmatch(value):
+            out.append(_LINE_ID)
+            out.append(ord(value[0]))
+            out += bytes.fromhex(value[1:])
+            return
+        raw = value.encode('utf-8')
+        if len(raw) < 64:
+            out.append(_FIXSTR | len(raw))
+        else:
+            out.append(_STR)
+            _pack_uint(len(raw), out)
+        out += raw
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += struct.pack('<d', value)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        out.append(_LIST if isinstance(value, list) else
+                   _TUPLE if isinstance(value, tuple) else _SET)
+        _pack_uint(len(value), out)
+        for item in value:
+            _pack(item, out)
+    elif isinstance(value, dict):
+        out.append(_DICT)
+        _pack_uint(len(value), out)
+        for key, item in value.items():
+            _pack(key, out)
+            _pack(item, out)
+    else:
+        raise SnapshotError(f"Unsupported state value: {type(value).__name__}")
+
+
+def _unpack_uint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _unpack(data, pos):
+    tag = data[pos]
+    pos += 1
+    if tag >= _FIXSTR and tag < 0xC0:
+        end = pos + (tag & 0x3F)
+        return data[pos:end].decode('utf-8'), end
+    if tag >= _FIXINT and tag < _FIXSTR:
+        return tag & 0x3F, pos
+    if tag == _NONE:
+        return None, pos
+    if tag == _TRUE:
+        return True, pos
+    if tag == _FALSE:
+        return False, pos
+    if tag == _INT:
+        n, pos = _unpack_uint(data, pos)
+        return (n >> 1) ^ -(n & 1), pos
+    if tag == _STR:
+        length, pos = _unpack_uint(data, pos)
+        return data[pos:pos + length].decode('utf-8'), pos + length
+    if tag == _LINE_ID:
+        return chr(data[pos]) + data[pos + 1:pos + 17].hex(), pos + 17
+    if tag == _FLOAT:
+        return struct.unpack_from('<d', data, pos)[0], pos + 8
+    if tag in (_LIST, _TUPLE, _SET):
+        count, pos = _unpack_uint(data, pos)
+        items = []
+        for _ in range(count):
+            item, pos = _unpack(data, pos)
+            items.append(item)
+        if tag == _TUPLE:
+            return tuple(items), pos
+        if tag == _SET:
+            return set(items), pos
+        return items, pos
+    if tag == _DICT:
+        count, pos = _unpack_uint(data, pos)
+        result = {}
+        for _ in range(count):
+            key, pos = _unpack(data, pos)
+            result[key], pos = _unpack(data, pos)
+        return result, pos
+    raise SnapshotError(f"Bad tag 0x{tag:02x} at {pos - 1}")
@@ -1,112 +1,23 @@
-import random
 from games.base_game import BaseGame
 
 
 class SongGame(BaseGame):
+    CONTENT = {'SONGS': 'songs'}
+
+    # used_songs لم يعد مستخدما (الترتيب من seed) - يبقى مكانه لقراءة snapshots القديمة
+    STATE_FIELDS = BaseGame.STATE_FIELDS + ('used_songs',)
+
+    @classmethod
+    def answer_bank(cls):
+        return ([song['artist']] for song in cls.SONGS)
+
     def __init__(self, line_bot_api, difficulty=3, theme='light'):
         super().__init__(line_bot_api, difficulty=difficulty, theme=theme)
         self.game_name = "اغنيه"
 
-        self.songs = [
-            {"lyrics":"رجعت لي أيام الماضي معاك","artist":"أم كلثوم"},
-            {"lyrics":"قولي أحبك كي تزيد وسامتي","artist":"كاظم الساهر"},
-            {"lyrics":"بردان أنا تكفى أبي احترق بدفا لعيونك","artist":"محمد عبده"},
-            {"lyrics":"جلست والخوف بعينيها تتأمل فنجاني","artist":"عبد الحليم حافظ"},
-            {"lyrics":"أحبك موت كلمة مالها تفسير","artist":"ماجد المهندس"},
-            {"lyrics":"تملي معاك ولو حتى بعيد عني","artist":"عمرو دياب"},
-            {"lyrics":"يا بنات يا بنات","artist":"نانسي عجرم"},
-            {"lyrics":"رحت عني ما قويت جيت لك لاتردني","artist":"عبدالمجيد عبدالله"},
-            {"lyrics":"أنا لحبيبي وحبيبي إلي","artist":"فيروز"},
-            {"lyrics":"كيف أبيّن لك شعوري دون ما أحكي","artist":"عايض"},
-            {"lyrics":"حبيبي يا كل الحياة اوعدني تبقى معايا","artist":"تامر حسني"},
-            {"lyrics":"خذني من ليلي لليلك","artist":"عبادي الجوهر"},
-            {"lyrics":"قلبي بيسألني عنك دخلك طمني وينك","artist":"وائل كفوري"},
-            {"lyrics":"تدري كثر ماني من البعد مخنوق","artist":"راشد الماجد"},
-            {"lyrics":"اسخر لك غلا وتشوفني مقصر","artist":"عايض"},
-            {"lyrics":"انسى هالعالم ولو هم يزعلون","artist":"عباس ابراهيم"},
-            {"lyrics":"أشوفك كل يوم وأروح وأقول نظرة ترد الروح","artist":"محمد عبده"},
-            {"lyrics":"أنا عندي قلب واحد","artist":"حسين الجسمي"},
-            {"lyrics":"منوتي ليتك معي","artist":"محمد عبده"},
-            {"lyrics":"جننت قلبي بحب يلوي ذراعي","artist":"ماجد المهندس"},
-            {"lyrics":"خلنا مني طمني عليك","artist":"نوال الكويتية"},
-            {"lyrics":"أحبك ليه أنا مدري","artist":"عبدالمجيد عبدالله"},
-            {"lyrics":"أمر الله أقوى أحبك والعقل واعي","artist":"ماجد المهندس"},
-            {"lyrics":"في زحمة الناس صعبة حالتي","artist":"محمد عبده"},
-            {"lyrics":"الحب يتعب من يدله والله في حبه بلاني","artist":"راشد الماجد"},
-            {"lyrics":"محد غيرك شغل عقلي شغل بالي","artist":"وليد الشامي"},
-            {"lyrics":"نكتشف مر الحقيقة بعد ما يفوت الأوان","artist":"أصالة"},
-            {"lyrics":"بديت أطيب بديت احس بك عادي","artist":"ماجد المهندس"},
-            {"lyrics":"يا هي توجع كذبة اخباري تمام","artist":"أميمة طالب"},
-            {"lyrics":"احس اني لقيتك بس عشان تضيع مني","artist":"عبدالمجيد عبدالله"},
-            {"lyrics":"اختلفنا مين يحب الثاني أكثر","artist":"محمد عبده"},
-            {"lyrics":"من أول نظرة شفتك قلت هذا اللي تمنيته","artist":"ماجد المهندس"},
-            {"lyrics":"لبيه يا بو عيون وساع","artist":"محمد عبده"},
-            {"lyrics":"اسمحيلي يا الغرام العف","artist":"محمد عبده"},
-            {"lyrics":"سألوني الناس عنك يا حبيبي","artist":"فيروز"},
-            {"lyrics":"أنا بلياك إذا أرمش تنزل ألف دمعة","artist":"ماجد المهندس"},
-            {"lyrics":"عطشان يا برق السما","artist":"ماجد المهندس"},
-            {"lyrics":"يراودني شعور إني أحبك أكثر من أول","artist":"راشد الماجد"},
-            {"lyrics":"هيجيلي موجوع دموعه ف عينه","artist":"تامر عاشور"},
-            {"lyrics":"تيجي نتراهن إن هيجي اليوم","artist":"تامر عاشور"},
-            {"lyrics":"خليني ف حضنك يا حبيبي","artist":"تامر عاشور"},
-            {"lyrics":"أنا أكثر شخص بالدنيا يحبك","artist":"راشد الماجد"},
-            {"lyrics":"أريد الله يسامحني لأن أذيت نفسي","artist":"رحمة رياض"},
-            {"lyrics":"كون نصير أنا وياك نجمة بالسما","artist":"رحمة رياض"},
-            {"lyrics":"على طاري الزعل والدمعتين","artist":"أصيل هميم"},
-            {"lyrics":"يشبهك قلبي كنك القلب مخلوق","artist":"أصيل هميم"},
-            {"lyrics":"ليت العمر لو كان مليون مرة","artist":"راشد الماجد"},
-            {"lyrics":"أحبه بس مو معناه اسمحله يجرح","artist":"أصيل هميم"},
-            {"lyrics":"المفروض أعوفك من زمان","artist":"أصيل هميم"},
-            {"lyrics":"ضعت منك وانهدم جسر التلاقي","artist":"أميمة طالب"},
-            {"lyrics":"تلمست لك عذر","artist":"راشد الماجد"},
-            {"lyrics":"بيان صادر من معاناة المحبة","artist":"أميمة طالب"},
-            {"lyrics":"أنا ودي إذا ودك نعيد الماضي","artist":"رابح صقر"},
-            {"lyrics":"عظيم إحساسي والشوق فيني","artist":"راشد الماجد"},
-            {"lyrics":"مثل ما تحب ياروحي ألبي رغبتك","artist":"رابح صقر"},
-            {"lyrics":"كل ما بلل مطر وصلك ثيابي","artist":"رابح صقر"},
-            {"lyrics":"خذ راحتك ماعاد تفرق معي","artist":"راشد الماجد"},
-            {"lyrics":"واسع خيالك اكتبه أنا بكذبك معجبه","artist":"شمة حمدان"},
-            {"lyrics":"ما دريت إني أحبك ما دريت","artist":"شمة حمدان"},
-            {"lyrics":"قال الوداع ومقصده يجرح القلب","artist":"راشد الماجد"},
-            {"lyrics":"حبيته بيني وبين نفسي","artist":"شيرين"},
-            {"lyrics":"كلها غيرانة بتحقد","artist":"شيرين"},
-            {"lyrics":"اللي لقى احبابه نسى اصحابه","artist":"راشد الماجد"},
-            {"lyrics":"مشاعر تشاور تودع تسافر","artist":"شيرين"},
-            {"lyrics":"أنا مش بتاعت الكلام ده","artist":"شيرين"},
-            {"lyrics":"مقادير يا قلبي العنا مقادير","artist":"طلال مداح"},
-            {"lyrics":"ظلمتني والله قوي يجازيك","artist":"طلال مداح"},
-            {"lyrics":"كلمة ولو جبر خاطر","artist":"عبادي الجوهر"},
-            {"lyrics":"فزيت من نومي أناديلك","artist":"ذكرى"},
-            {"lyrics":"ابد على حطة يدك","artist":"ذكرى"},
-            {"lyrics":"أنا لولا الغلا والمحبة","artist":"فؤاد عبدالواحد"},
-            {"lyrics":"أحبك لو تكون حاضر","artist":"عبادي الجوهر"},
-            {"lyrics":"إلحق عيني إلحق","artist":"وليد الشامي"},
-            {"lyrics":"يردون قلت لازم يردون","artist":"وليد الشامي"},
-            {"lyrics":"ماعاد يمديني ولا عاد يمديك","artist":"عبدالمجيد عبدالله"},
-            {"lyrics":"ولهان أنا ولهان","artist":"وليد الشامي"},
-            {"lyrics":"اقولها كبر عن الدنيا حبيبي","artist":"وليد الشامي"},
-            {"lyrics":"أنا استاهل وداع أفضل وداع","artist":"نوال الكويتية"},
-            {"lyrics":"لقيت روحي بعد ما لقيتك","artist":"نوال الكويتية"},
-            {"lyrics":"يا بعدهم كلهم يا سراجي بينهم","artist":"عبدالمجيد عبدالله"},
-            {"lyrics":"غريبة الناس غريبة الدنيا","artist":"وائل جسار"},
-            {"lyrics":"اعذريني يوم زفافك","artist":"وائل جسار"},
-            {"lyrics":"حتى الكره احساس","artist":"عبدالمجيد عبدالله"},
-            {"lyrics":"استكثرك وقتي علي","artist":"عبدالمجيد عبدالله"},
-            {"lyrics":"ياما حاولت الفراق وما قويت","artist":"عبدالمجيد عبدالله"}
-        ]
-
-        random.shuffle(self.songs)
-        self.used_songs = []
-
     def get_question(self):
-        available = [s for s in self.songs if s not in self.used_songs]
-        if not available:
-            self.used_songs = []
-            available = self.songs.copy()
-            random.shuffle(available)
-
-        song = random.choice(available)
-        self.used_songs.append(song)
+        idx = self.question_index(len(self.SONGS))
+        song = self.SONGS[idx]
         self.current_answer = [song['artist']]
         self.previous_question = song['lyrics']
 
@@ -130,7 +41,7 @@ class SongGame(BaseGame):
         if self.supports_reveal and normalized == "جاوب":
             return self.handle_reveal()
 
-        if normalized == self.normalize_text(self.current_answer[0]):
+        if normalized in self.accepted_answers:
             return self.handle_correct_answer(user_id, display_name)
 
         return None
@@ -1,3 +1,4 @@
+import gc
 import os
 import multiprocessing
 
@@ -36,13 +37,30 @@ def on_reload(server):
     print("Bot Mesh Reloading...")
 
 def when_ready(server):
+    # بنوك المحتوى والقوالب المحملة في preload لا يمسها gc في الـ workers
+    # فتبقى صفحاتها مشتركة (copy-on-write) بدل نسخها في كل worker
+    gc.freeze()
     print("Bot Mesh Ready on port", port)
 
 def on_exit(server):
     print("Bot Mesh Shutting Down...")
 
+def post_worker_init(worker):
+    # اتصالات وخيوط الـ worker وانتخاب قائد المجدول قبل أول طلب
+    import lifecycle
+    lifecycle.start_worker()
+
 def worker_int(worker):
     print(f"Worker {worker.pid} interrupted")
 
+def worker_exit(server, worker):
+    # أحداث async المقبولة تعالج أولا، ثم تكتب النتائج وأوقات النشاط المؤجلة
+    # قبل خروج الـ worker (max_requests او ايقاف) - الانتظار محدود بـ graceful_timeout
+    import app
+    from database import DB
+    app.event_dispatcher.stop(timeout=max(1, server.cfg.graceful_timeout - 5))
+    DB.results.flush()
+    DB.flush_activity()
+
 def worker_abort(worker):
     print(f"Worker {worker.pid} aborted")
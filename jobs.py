@@ -0,0 +1,81 @@
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+
+import lifecycle
+from database import DB
+
+logger = logging.getLogger(__name__)
+
+
+class JobRunner:
+    """مهام الخلفية في عملية واحدة لكل مضيف: قائد ينتخب بقفل ملف في مجلد قاعدة البيانات
+
+    بقية الـ workers لا يشغلون المجدول فتبقى للطلبات. كل تشغيل يسجل في جدول jobs،
+    والمهام ذات min_interval تحجز تشغيلها فيه أولا، فلا تتكرر حتى لو وجد قائدان
+    (عدة مضيفات على نفس القرص، او قفل لا يعمل على نظام ملفات شبكي).
+    فشل مهمة محجوزة يحرر حجزها ويعيدها بعد retry_after ثانية بدل موعدها التالي.
+    """
+
+    def __init__(self, scheduler, lock_path, retry=60, retry_after=900):
+        self.scheduler = scheduler
+        self.leader = lifecycle.Leader(lock_path, scheduler.start, retry=retry, name="jobs")
+        self.retry_after = retry_after
+        self._names = []
+
+    def add(self, fn, trigger, min_interval=None, **trigger_args):
+        """تسجيل fn في المجدول باسمها - min_interval: أقل مدة بين تشغيلين ناجحين (ثوان)"""
+        name = fn.__name__
+        self._names.append(name)
+        self.scheduler.add_job(
+            self._run, trigger, args=(name, fn, min_interval), id=name, name=name,
+            max_instances=1, coalesce=True, **trigger_args
+        )
+
+    def _retry(self, name, fn, min_interval):
+        run_date = datetime.now() + timedelta(seconds=self.retry_after)
+        self.scheduler.add_job(
+            self._run, 'date', run_date=run_date, args=(name, fn, min_interval),
+            id=f"{name}:retry", name=f"{name}:retry", replace_existing=True
+        )
+        logger.info(f"Job {name} will be retried at {run_date:%H:%M:%S}")
+
+    def start(self):
+        """محاولة القيادة في العملية الحالية - تبدأ المجدول اذا انتخبت"""
+        self.leader.start()
+
+    @staticmethod
+    def _owner():
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _run(self, name, fn, min_interval):
+        owner = self._owner()
+        started = time.time()
+        if min_interval and not DB.claim_job(name, owner, started, min_interval):
+            logger.info(f"Job {name} skipped: already run within {min_interval}s")
+            return
+
+        timer = time.perf_counter()
+        error = None
+        try:
+            fn()
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            logger.error(f"Job {name} failed: {e}", exc_info=True)
+        duration_ms = round((time.perf_counter() - timer) * 1000, 2)
+        # فشل مهمة محجوزة يحرر حجزها في الجدول (finish_job)
+        DB.finish_job(name, owner, started, duration_ms, error)
+        if error is None:
+            logger.info(f"Job {name} finished in {duration_ms:.1f} ms")
+        elif min_interval:
+            self._retry(name, fn, min_interval)
+
+    def stats(self):
+        # من الجدول وليس من الذاكرة: أي worker يعرض تشغيلات القائد
+        jobs = DB.get_jobs() or {}
+        return {
+            **self.leader.stats(),
+            'jobs': {name: jobs.get(name) for name in self._names}
+        }
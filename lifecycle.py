@@ -0,0 +1,161 @@
+import fcntl
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# مراحل تشغيل العملية تحت gunicorn مع preload_app:
+#   preload  - في الـ master عند استيراد app: بيانات ثابتة تتشاركها الـ workers
+#              (بنوك المحتوى، النصوص، مخطط قاعدة البيانات) ثم اغلاق ما لا يعبر fork
+#   worker   - في كل worker بعد fork (post_worker_init او أول طلب): اتصالات
+#              وخيوط خاصة بالعملية، ومحاولة قيادة المجدول
+# بدون gunicorn_config (python app.py او gunicorn بدون -c) يبدأ الـ worker مع أول طلب
+
+_release_hooks = []
+_worker_hooks = []
+_lock = threading.Lock()
+_worker_pid = None
+_preload_ms = None
+_boot_ms = None
+
+
+def on_release(fn):
+    """fn تستدعى في نهاية preload - لاغلاق الاتصالات قبل fork"""
+    _release_hooks.append(fn)
+    return fn
+
+
+def on_worker(fn):
+    """fn تستدعى مرة واحدة في كل عملية تعالج الطلبات"""
+    _worker_hooks.append(fn)
+    return fn
+
+
+def preloaded(started):
+    """نهاية preload: started هو time.perf_counter() عند بدايته"""
+    global _preload_ms
+    for fn in _release_hooks:
+        try:
+            fn()
+        except Exception as e:
+            logger.error(f"Release hook {fn.__name__} failed: {e}")
+    _preload_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"Preload finished in {_preload_ms:.1f} ms (pid {os.getpid()})")
+
+
+def start_worker():
+    """تهيئة العملية الحالية مرة واحدة - ترجع زمن التهيئة بالملي ثانية"""
+    global _worker_pid, _boot_ms
+    if _worker_pid == os.getpid():
+        return _boot_ms
+    with _lock:
+        if _worker_pid == os.getpid():
+            return _boot_ms
+        started = time.perf_counter()
+        for fn in _worker_hooks:
+            try:
+                fn()
+            except Exception as e:
+                logger.error(f"Worker hook {fn.__name__} failed: {e}", exc_info=True)
+        _boot_ms = (time.perf_counter() - started) * 1000
+        _worker_pid = os.getpid()
+    logger.info(f"Worker {_worker_pid} ready in {_boot_ms:.1f} ms")
+    return _boot_ms
+
+
+class Leader:
+    """انتخاب عملية واحدة بقفل ملف (flock) - القفل يتحرر تلقائيا بخروج العملية
+
+    العمليات التي لم تحصل عليه تعيد المحاولة كل retry ثانية، فتستلم احداها
+    القيادة اذا خرج القائد (max_requests او توقف مفاجئ).
+    """
+
+    def __init__(self, path, on_elected, retry=60, name="leader"):
+        self.path = path
+        self.on_elected = on_elected
+        self.retry = retry
+        self.name = name
+        self._fd = None
+        self._pid = None
+        self.elected_at = None
+
+    def _try_acquire(self):
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        self.elected_at = int(time.time())
+        logger.info(f"{self.name}: pid {os.getpid()} elected")
+        self.on_elected()
+        return True
+
+    def start(self):
+        """محاولة القيادة في العملية الحالية - بدون انتظار"""
+        if self._pid == os.getpid():
+            return
+        # نسخة الـ fd الموروثة من الـ master (ان وجدت) لا تخص هذه العملية
+        self._fd = None
+        self.elected_at = None
+        self._pid = os.getpid()
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            if self._try_acquire():
+                return
+        except OSError as e:
+            logger.error(f"{self.name}: lock {self.path} unavailable: {e}")
+            return
+        threading.Thread(target=self._follow, name=f"{self.name}-follow", daemon=True).start()
+
+    def _follow(self):
+        while True:
+            time.sleep(self.retry)
+            try:
+                if self._try_acquire():
+                    return
+            except OSError as e:
+                logger.error(f"{self.name}: lock retry failed: {e}")
+
+    @property
+    def is_leader(self):
+        return self._fd is not None and self._pid == os.getpid()
+
+    def stats(self):
+        return {'leader': self.is_leader, 'lock': self.path, 'since': self.elected_at}
+
+
+def stats():
+    return {
+        'pid': os.getpid(),
+        'preload_ms': round(_preload_ms, 1) if _preload_ms is not None else None,
+        'boot_ms': round(_boot_ms, 1) if _worker_pid == os.getpid() and _boot_ms is not None else None
+    }
+
+
+if __name__ == '__main__':
+    # make boot-check: preload كما في الـ master ثم fork وتهيئة worker ضمن الحد
+    import sys
+    budget_ms = float(os.getenv('BOOT_BUDGET_MS', '250'))
+    import app  # يشغل preload ويسجل الـ hooks في وحدة lifecycle (وليس __main__)
+    registered = app.lifecycle
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        os.write(write_fd, f"{registered.start_worker():.1f}".encode())
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        boot_ms = float(f.read() or 'inf')
+    os.waitpid(pid, 0)
+
+    preload_ms = registered.stats()['preload_ms']
+    print(f"preload {preload_ms} ms, worker boot {boot_ms} ms (budget {budget_ms:.0f} ms)")
+    sys.exit(0 if boot_ms <= budget_ms else 1)
@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+import threading
+
+import urllib3
+from linebot.v3.messaging import Configuration, ApiClient, MessagingApi, ReplyMessageRequest
+from linebot.v3.messaging.exceptions import ApiException
+
+from config import Config
+from line_messages import message_json
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledApiClient(ApiClient):
+    """ApiClient بمهلة افتراضية لكل الطلبات (بما فيها push_message من الألعاب)"""
+
+    def __init__(self, configuration, timeout):
+        super().__init__(configuration)
+        self.timeout = timeout
+
+    def request(self, method, url, query_params=None, headers=None,
+                post_params=None, body=None, _preload_content=True,
+                _request_timeout=None):
+        return super().request(
+            method, url, query_params=query_params, headers=headers,
+            post_params=post_params, body=body,
+            _preload_content=_preload_content,
+            _request_timeout=_request_timeout or self.timeout
+        )
+
+
+class LineClient:
+    """عميل LINE واحد لكل عملية باتصالات keep-alive
+
+    ينشأ عند أول استخدام داخل كل عملية، لأن gunicorn يعمل بـ preload_app
+    واتصالات urllib3 لا يجب ان تنتقل للـ workers عبر fork.
+    """
+    _lock = threading.Lock()
+    _pid = None
+    _client = None
+    _api = None
+    _access_token = None
+    raw_replies = 0
+    sdk_replies = 0
+
+    @classmethod
+    def configure(cls, access_token):
+        cls._access_token = access_token
+
+    @classmethod
+    def api(cls):
+        if cls._pid == os.getpid():
+            return cls._api
+        with cls._lock:
+            if cls._pid != os.getpid():
+                configuration = Configuration(access_token=cls._access_token)
+                configuration.connection_pool_maxsize = Config.LINE_POOL_SIZE
+                # الاتصال المحجوز في pool يعاد استخدامه بدلا من فتح اتصال TLS جديد
+                cls._client = _PooledApiClient(
+                    configuration,
+                    (Config.LINE_CONNECT_TIMEOUT, Config.LINE_READ_TIMEOUT)
+                )
+                cls._api = MessagingApi(cls._client)
+                cls._pid = os.getpid()
+                logger.info(f"LINE client created for pid {cls._pid}: pool {Config.LINE_POOL_SIZE}")
+        return cls._api
+
+    @classmethod
+    def reply(cls, reply_token, messages):
+        """ارسال رد - JSON جاهز مباشرة الى LINE، و line-bot-sdk عند تعذر ذلك
+
+        reply token يستخدم مرة واحدة، لذلك لا يعاد الارسال عبر line-bot-sdk
+        بعد خطأ HTTP - فقط اذا تعذر تحويل الرسائل لـ JSON.
+        """
+        api = cls.api()
+        body = None
+        if Config.LINE_RAW_REPLY:
+            try:
+                body = '{"replyToken":%s,"messages":[%s]}' % (
+                    json.dumps(reply_token), ','.join(message_json(m) for m in messages)
+                )
+            except Exception as e:
+                logger.error(f"Raw reply serialization failed, using SDK: {e}")
+
+        if body is None:
+            api.reply_message(ReplyMessageRequest(reply_token=reply_token, messages=messages))
+            cls.sdk_replies += 1
+            return
+
+        response = cls._client.rest_client.pool_manager.request(
+            'POST', api.line_base_path + '/v2/bot/message/reply',
+            body=body.encode('utf-8'),
+            headers={
+                'Authorization': f'Bearer {cls._access_token}',
+                'Content-Type': 'application/json',
+                'User-Agent': cls._client.user_agent
+            },
+            timeout=urllib3.Timeout(connect=Config.LINE_CONNECT_TIMEOUT, read=Config.LINE_READ_TIMEOUT)
+        )
+        if response.status >= 400:
+            error = ApiException(status=response.status, reason=response.reason)
+            error.body = response.data.decode('utf-8', 'replace')
+            raise error
+        cls.raw_replies += 1
+
+    @classmethod
+    def stats(cls):
+        return {
+            'pool_size': Config.LINE_POOL_SIZE,
+            'timeout': [Config.LINE_CONNECT_TIMEOUT, Config.LINE_READ_TIMEOUT],
+            'ready': cls._pid == os.getpid(),
+            'raw_reply': Config.LINE_RAW_REPLY,
+            'raw_replies': cls.raw_replies,
+            'sdk_replies': cls.sdk_replies
+        }
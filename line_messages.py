@@ -0,0 +1,113 @@
+import json
+from copy import copy
+
+from linebot.v3.messaging import TextMessage, FlexMessage, FlexContainer
+
+
+class RawFlexContainer:
+    """محتوى Flex جاهز كـ dict - يمر عبر line-bot-sdk بدون تحقق pydantic
+
+    FlexMessage.to_dict و ApiClient يستدعيان to_dict() فقط، لذلك يكفي هذا
+    الكائن بدلا من شجرة FlexContainer كاملة. المحتوى يجب ان يكون متحققا منه
+    مسبقا (انظر FlexTemplate).
+    """
+    __slots__ = ('data', '_json')
+
+    def __init__(self, data):
+        self.data = data
+        self._json = None
+
+    def to_dict(self):
+        return self.data
+
+    def json(self):
+        # المحتوى لا يعدل بعد الانشاء، فيكفي تحويله لنص مرة واحدة
+        if self._json is None:
+            self._json = _dumps(self.data)
+        return self._json
+
+    @classmethod
+    def validated(cls, data):
+        """التحقق من dict مرة واحدة وحفظه بنفس صيغة line-bot-sdk"""
+        return cls(FlexContainer.from_dict(data).to_dict())
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def flex_message(alt_text, contents, quick_reply=None):
+    """FlexMessage من dict جاهز بدون اعادة التحقق من الشجرة"""
+    if not isinstance(contents, RawFlexContainer):
+        contents = RawFlexContainer(contents)
+    return FlexMessage.construct(
+        type='flex', alt_text=alt_text, contents=contents, quick_reply=quick_reply
+    )
+
+
+def text_message(text, quick_reply=None):
+    """TextMessage بدون تحقق - quick_reply يبقى نفس الكائن المحفوظ"""
+    return TextMessage.construct(type='text', text=str(text), quick_reply=quick_reply)
+
+
+# quick reply المحفوظ في UI يتحول لنص مرة واحدة فقط
+_quick_reply_json = {}
+
+
+def _quick_reply_fragment(quick_reply):
+    cached = _quick_reply_json.get(id(quick_reply))
+    if cached is None or cached[0] is not quick_reply:
+        if len(_quick_reply_json) > 16:
+            _quick_reply_json.clear()
+        cached = _quick_reply_json[id(quick_reply)] = (quick_reply, _dumps(quick_reply.to_dict()))
+    return cached[1]
+
+
+def message_json(message):
+    """JSON رسالة واحدة كنص للارسال المباشر
+
+    الرسائل المبنية بـ flex_message و text_message تكتب من أجزاء جاهزة، وبقية
+    رسائل line-bot-sdk تمر عبر to_dict الخاص بها.
+    """
+    if isinstance(message, FlexMessage) and isinstance(message.contents, RawFlexContainer) \
+            and message.sender is None:
+        body = f'{{"type":"flex","altText":{_dumps(message.alt_text)},"contents":{message.contents.json()}'
+    elif type(message) is TextMessage and message.sender is None \
+            and not message.emojis and not message.quote_token:
+        body = f'{{"type":"text","text":{_dumps(message.text)}'
+    else:
+        return _dumps(message.to_dict())
+    if message.quick_reply is not None:
+        body += f',"quickReply":{_quick_reply_fragment(message.quick_reply)}'
+    return body + '}'
+
+
+class FlexTemplate:
+    """قالب Flex يبنى ويتحقق منه مرة واحدة ثم تبدل فيه قيم محددة فقط
+
+    slots: اسم -> مسار (مفاتيح وأرقام) الى القيمة داخل القالب. عند render تنسخ
+    العقد على مسارات القيم فقط، وبقية الشجرة مشتركة بين كل الرسائل لذلك لا
+    يجب تعديل الناتج.
+    """
+
+    def __init__(self, bubble, slots):
+        self.bubble = bubble
+        self.slots = slots
+        # التحقق مرة واحدة عند البناء بدل التحقق مع كل رسالة
+        FlexContainer.from_dict(bubble)
+
+    def render(self, **values):
+        root = copy(self.bubble)
+        copies = {(): root}
+        for name, value in values.items():
+            path = self.slots[name]
+            node = root
+            for i in range(len(path) - 1):
+                prefix = path[:i + 1]
+                child = copies.get(prefix)
+                if child is None:
+                    child = copies[prefix] = copy(node[path[i]])
+                    node[path[i]] = child
+                node = child
+            node[path[-1]] = value
+        return root
@@ -0,0 +1,64 @@
+from functools import lru_cache
+
+# الحروف التي تتوحد عند المقارنة
+FOLDS = {
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ة': 'ه', 'ؤ': 'و', 'ئ': 'ي'
+}
+
+# التشكيل: فتحتان .. سكون وعلامات اخرى حتى U+065F، والألف الخنجرية
+DIACRITICS = tuple(range(0x064B, 0x0660)) + (0x0670,)
+
+# النصوص القصيرة (اجابات وأوامر) تتكرر كثيرا في المحادثات
+MEMO_SIZE = 4096
+MEMO_MAX_LENGTH = 64
+
+
+class _Table(dict):
+    """جدول str.translate يكمل نفسه عند أول ظهور لكل حرف
+
+    نفس قواعد التطبيع القديمة ([^\\w\\s] يحذف، المسافات تبقى) بدون بناء
+    جدول لكل Unicode مسبقا.
+    """
+
+    def __missing__(self, code):
+        ch = chr(code)
+        if ch.isspace():
+            value = ' '
+        elif ch.isalnum() or ch == '_':
+            value = code
+        else:
+            value = None
+        self[code] = value
+        return value
+
+
+_table = _Table({ord(k): v for k, v in FOLDS.items()})
+_table.update(dict.fromkeys(DIACRITICS))
+
+
+def _normalize(text):
+    return ' '.join(text.lower().translate(_table).split())
+
+
+_normalize_memo = lru_cache(maxsize=MEMO_SIZE)(_normalize)
+
+
+def normalize(text):
+    """تطبيع النص العربي للمقارنة: حذف التشكيل والرموز وتوحيد الحروف والمسافات"""
+    if not text:
+        return ""
+    text = str(text)
+    if len(text) <= MEMO_MAX_LENGTH:
+        return _normalize_memo(text)
+    return _normalize(text)
+
+
+def stats():
+    info = _normalize_memo.cache_info()
+    total = info.hits + info.misses
+    return {
+        'memo_size': info.currsize,
+        'hit_ratio': round(info.hits / total, 3) if total else 0.0,
+        'table_size': len(_table)
+    }
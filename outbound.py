@@ -0,0 +1,164 @@
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from linebot.v3.messaging import PushMessageRequest
+from linebot.v3.messaging.exceptions import ApiException
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class OutboundScheduler:
+    """ارسال رسائل push في الخلفية بعدد محدود من الخيوط
+
+    رسائل نفس المستلم تدمج في طلب واحد (حتى 5 رسائل وهو حد LINE) وترسل
+    بالترتيب، والمستلمون المختلفون يرسل لهم بالتوازي. الطلب الفاشل يعاد
+    بنفس X-Line-Retry-Key حتى لا تصل الرسالة مرتين.
+    """
+    MAX_MESSAGES = 5
+
+    def __init__(self, max_workers=8, retries=3, backoff=0.5):
+        self.max_workers = max(1, max_workers)
+        self.retries = retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._pending = {}
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def _ensure_started(self):
+        # الخيوط لا تنتقل مع fork - تبدأ عند أول استخدام داخل كل عملية
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="outbound"
+                )
+                self._pending = {}
+                self._pid = os.getpid()
+
+    def push(self, line_api, to, messages):
+        """جدولة رسائل push الى مستلم واحد
+
+        يرجع Future تكون نتيجته True عند الوصول و False عند الفشل النهائي.
+        """
+        self._ensure_started()
+        future = Future()
+        if not messages:
+            future.set_result(True)
+            return future
+        # [future, رسائل متبقية, نجاح كل الدفعات]
+        job = [future, len(messages), True]
+        with self._lock:
+            queue = self._pending.get(to)
+            start = queue is None
+            if start:
+                queue = self._pending[to] = deque()
+            for message in messages:
+                queue.append((line_api, message, job))
+        if start:
+            self._executor.submit(self._drain, to)
+        return future
+
+    def _drain(self, to):
+        # خيط واحد لكل مستلم في نفس الوقت - يحافظ على ترتيب رسائله
+        while True:
+            with self._lock:
+                queue = self._pending.get(to)
+                if not queue:
+                    self._pending.pop(to, None)
+                    return
+                batch = [queue.popleft() for _ in range(min(self.MAX_MESSAGES, len(queue)))]
+
+            ok = self._send(batch[-1][0], to, [message for _, message, _ in batch])
+            for _, _, job in batch:
+                job[1] -= 1
+                job[2] = job[2] and ok
+                if job[1] == 0:
+                    job[0].set_result(job[2])
+
+    def _send(self, line_api, to, messages):
+        retry_key = str(uuid.uuid4())
+        for attempt in range(self.retries + 1):
+            try:
+                line_api.push_message(
+                    PushMessageRequest(to=to, messages=messages),
+                    x_line_retry_key=retry_key
+                )
+                with self._lock:
+                    self.sent += 1
+                return True
+            except ApiException as e:
+                # 409: الطلب بنفس retry key وصل سابقا
+                if e.status == 409:
+                    with self._lock:
+                        self.sent += 1
+                    return True
+                if e.status is not None and e.status < 500 and e.status != 429:
+                    logger.error(f"Push to {to} rejected: {e.status} {e.reason}")
+                    break
+                error = f"{e.status} {e.reason}"
+            except Exception as e:
+                error = str(e)
+
+            if attempt < self.retries:
+                with self._lock:
+                    self.retried += 1
+                delay = self.backoff * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay))
+            else:
+                logger.error(f"Push to {to} failed after {attempt + 1} attempts: {error}")
+
+        with self._lock:
+            self.failed += 1
+        return False
+
+    @staticmethod
+    def when_done(futures, callback):
+        """استدعاء callback({key: ok}) بعد انتهاء كل الـ futures"""
+        futures = dict(futures)
+        if not futures:
+            callback({})
+            return
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                callback({key: f.result() for key, f in futures.items()})
+            except Exception as e:
+                logger.error(f"Outbound callback error: {e}", exc_info=True)
+
+        for future in futures.values():
+            future.add_done_callback(done)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'pending': sum(len(q) for q in self._pending.values()) if self._pid == os.getpid() else 0,
+                'sent': self.sent,
+                'failed': self.failed,
+                'retried': self.retried
+            }
+
+
+outbound = OutboundScheduler(
+    max_workers=Config.OUTBOUND_WORKERS,
+    retries=Config.OUTBOUND_RETRIES
+)
@@ -0,0 +1,239 @@
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from dispatcher import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class ResultQueue:
+    """طابور نتائج الألعاب - تكتب في قاعدة البيانات دفعة واحدة لكل نافذة
+
+    كل نتيجة تكتب أولا في journal خاص بالعملية ثم تنتظر الدفعة. اذا توقفت
+    العملية قبل الكتابة، تعاد النتائج من الـ journal لاحقا (at-least-once)
+    ومفتاح كل نتيجة يمنع احتسابها مرتين.
+    """
+
+    def __init__(self, commit, directory, window=0.1, max_batch=500, fsync=False):
+        self.commit = commit
+        self.directory = directory or '.'
+        self.window = window
+        self.max_batch = max_batch
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._lock_fd = None
+        self._pending = []
+        self._latency_ms = deque(maxlen=1000)
+        self._commit_ms = deque(maxlen=1000)
+        self._last_orphan_check = 0.0
+        self.submitted = 0
+        self.committed = 0
+        self.duplicates = 0
+        self.batches = 0
+        self.failures = 0
+
+    def _path(self, pid, suffix=''):
+        return os.path.join(self.directory, f"results-{pid}.journal{suffix}")
+
+    def _ensure_started(self):
+        # الخيط والـ journal لا ينتقلان مع fork - يبدآن عند أول استخدام داخل كل عملية
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            pid = os.getpid()
+            os.makedirs(self.directory, exist_ok=True)
+            self._lock_fd = self._acquire(self._path(pid, '.lock'))
+            # نفس الـ pid قد يتكرر بعد اعادة التشغيل (docker) - نتبنى ما بقي في ملفاته
+            flushing = self._path(pid, '.flushing')
+            leftovers = self._read_journals([flushing, self._path(pid)])
+            self._fd = os.open(self._path(pid), os.O_CREAT | os.O_WRONLY | os.O_APPEND, 0o644)
+            self._write(self._read_journals([flushing]))
+            if os.path.exists(flushing):
+                os.unlink(flushing)
+            now = time.monotonic()
+            self._pending = [(now, record) for record in leftovers]
+            self._pid = pid
+            threading.Thread(target=self._run, name="results-commit", daemon=True).start()
+            atexit.register(self.flush)
+
+    @staticmethod
+    def _acquire(path):
+        """قفل يثبت ان صاحب الـ journal ما زال يعمل"""
+        while True:
+            fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            # قد يحذف replay_orphans الملف بينما ننتظر القفل
+            try:
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    @staticmethod
+    def _read_journals(paths):
+        records = []
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # سطر ناقص اذا توقفت العملية اثناء الكتابة
+                        continue
+        return records
+
+    def _write(self, records):
+        if not records:
+            return
+        os.write(self._fd, ''.join(
+            json.dumps(r, ensure_ascii=False, separators=(',', ':')) + '\n' for r in records
+        ).encode('utf-8'))
+        if self.fsync:
+            os.fsync(self._fd)
+
+    def submit(self, user_id, points, won, game_name, group_id=None):
+        """اضافة نتيجة للطابور - ترجع مفتاح النتيجة"""
+        self._ensure_started()
+        record = {
+            'k': uuid.uuid4().hex, 'u': user_id, 'p': points,
+            'w': 1 if won else 0, 'g': game_name, 'c': group_id, 't': time.time()
+        }
+        with self._lock:
+            self._write([record])
+            self._pending.append((time.monotonic(), record))
+            self.submitted += 1
+            self._ready.notify()
+        return record['k']
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._ready.wait(timeout=60)
+                if self._pending:
+                    # نافذة التجميع تبدأ مع أول نتيجة في الدفعة
+                    deadline = self._pending[0][0] + self.window
+                    while len(self._pending) < self.max_batch:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._ready.wait(timeout=remaining)
+            failures = self.failures
+            try:
+                self.flush()
+                if time.monotonic() - self._last_orphan_check > 60:
+                    self._last_orphan_check = time.monotonic()
+                    self.replay_orphans()
+            except Exception as e:
+                logger.error(f"Result commit loop error: {e}", exc_info=True)
+            if self.failures != failures:
+                time.sleep(1)
+
+    def flush(self):
+        """كتابة كل النتائج المنتظرة الآن"""
+        if self._pid != os.getpid():
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, []
+                # تدوير الـ journal: النتائج الجديدة تذهب لملف جديد اثناء الكتابة
+                os.close(self._fd)
+                flushing = self._path(self._pid, '.flushing')
+                os.replace(self._path(self._pid), flushing)
+                self._fd = os.open(self._path(self._pid), os.O_CREAT | os.O_WRONLY | os.O_APPEND, 0o644)
+
+            records = [record for _, record in batch]
+            started = time.monotonic()
+            try:
+                applied = self.commit(records)
+            except Exception as e:
+                with self._lock:
+                    self._write(records)
+                    self._pending[:0] = batch
+                    self.failures += 1
+                os.unlink(flushing)
+                logger.error(f"Result commit failed for {len(records)} results: {e}")
+                return 0
+
+            os.unlink(flushing)
+            finished = time.monotonic()
+            with self._lock:
+                self.batches += 1
+                self.committed += applied
+                self.duplicates += len(records) - applied
+                self._commit_ms.append((finished - started) * 1000)
+                self._latency_ms.extend((finished - queued) * 1000 for queued, _ in batch)
+            return applied
+
+    def replay_orphans(self):
+        """اعادة نتائج العمليات المتوقفة التي بقيت في journals"""
+        replayed = 0
+        for lock_path in glob.glob(os.path.join(self.directory, 'results-*.journal.lock')):
+            pid = os.path.basename(lock_path)[len('results-'):-len('.journal.lock')]
+            if pid == str(self._pid):
+                continue
+            try:
+                fd = os.open(lock_path, os.O_RDWR)
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                continue
+            try:
+                paths = [p for p in (self._path(pid, '.flushing'), self._path(pid)) if os.path.exists(p)]
+                records = self._read_journals(paths)
+                if records:
+                    replayed += self.commit(records)
+                for path in paths:
+                    os.unlink(path)
+                os.unlink(lock_path)
+                logger.info(f"Replayed {len(records)} journaled results from pid {pid}")
+            except Exception as e:
+                logger.error(f"Result journal replay failed for pid {pid}: {e}")
+            finally:
+                os.close(fd)
+        return replayed
+
+    def stats(self):
+        with self._lock:
+            latency = list(self._latency_ms)
+            commit = list(self._commit_ms)
+            return {
+                'pending': len(self._pending) if self._pid == os.getpid() else 0,
+                'submitted': self.submitted,
+                'committed': self.committed,
+                'duplicates': self.duplicates,
+                'batches': self.batches,
+                'failures': self.failures,
+                'latency_ms': {
+                    'p50': round(percentile(latency, 50), 2),
+                    'p95': round(percentile(latency, 95), 2),
+                    'p99': round(percentile(latency, 99), 2)
+                },
+                'commit_ms': {
+                    'p50': round(percentile(commit, 50), 2),
+                    'p95': round(percentile(commit, 95), 2),
+                    'max': round(max(commit), 2) if commit else 0.0
+                }
+            }
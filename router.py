@@ -0,0 +1,56 @@
+import threading
+
+
+class Route:
+    TEXT = 'text'
+    START = 'start'
+    HELP = 'help'
+    TEXTS_MENU = 'texts_menu'
+    GAMES_MENU = 'games_menu'
+    REGISTER = 'register'
+    STATS = 'stats'
+    LEADERBOARD = 'leaderboard'
+    GROUP_LEADERBOARD = 'group_leaderboard'
+    GAME_LEADERBOARD = 'game_leaderboard'
+    THEME = 'theme'
+    WITHDRAW = 'withdraw'
+    STOP = 'stop'
+    GAME_START = 'game_start'
+    # نص ليس امرا: قد يكون اجابة للعبة نشطة او اسما عند التسجيل
+    ANSWER = 'answer'
+    # نص ليس امرا ولا توجد لعبة ولا تسجيل ينتظره
+    IGNORED = 'ignored'
+
+
+class CommandRouter:
+    """تصنيف الرسالة بقراءة dict واحدة على النص (lower + strip)
+
+    جدول الأوامر يبنى مرة واحدة عند التحميل، وكل نص غير موجود فيه مسار
+    ANSWER. لكل مسار عداد يظهر في /health.
+    """
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._counts = {Route.ANSWER: 0, Route.IGNORED: 0}
+
+    def add(self, route, keywords):
+        """keywords: قائمة كلمات، او dict كلمة -> قيمة ترجع مع المسار"""
+        items = keywords.items() if isinstance(keywords, dict) else ((k, None) for k in keywords)
+        for keyword, arg in items:
+            if keyword in self._routes:
+                raise ValueError(f"Duplicate command: {keyword}")
+            self._routes[keyword] = (route, arg)
+        self._counts.setdefault(route, 0)
+
+    def route(self, text):
+        """(المسار، القيمة) للنص"""
+        return self._routes.get(text, (Route.ANSWER, None))
+
+    def count(self, route):
+        with self._lock:
+            self._counts[route] = self._counts.get(route, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {'commands': len(self._routes), 'routes': dict(self._counts)}
@@ -0,0 +1,740 @@
+import logging
+import os
+import socket
+import sqlite3
+import struct
+import threading
+import time
+from datetime import datetime
+from threading import Lock
+from urllib.parse import urlparse
+
+from games import snapshot
+
+logger = logging.getLogger(__name__)
+
+# مدة بقاء الجلسة في المخازن المشتركة (تطابق GAME_TIMEOUT_MINUTES)
+DEFAULT_GAME_TTL = 30 * 60
+
+# عدد أقفال الكتابة في المخزن داخل العملية
+SESSION_STRIPES = int(os.getenv('SESSION_STRIPES', '16'))
+
+# المخازن المشتركة تكتب موعد انتهاء اللعبة مرة كل TOUCH_INTERVAL ثانية على الأكثر
+TOUCH_INTERVAL = 15
+
+# مفتاح اللعبة في Redis يبقى بعد موعدها قليلا حتى يستلمه المؤقت ويبلغ المجموعة
+REDIS_EXPIRY_GRACE = 60
+
+# قيمة اللعبة في Redis: رقم النسخة (8 بايت) ثم snapshot
+_REDIS_VERSION = struct.Struct('>Q')
+
+
+def encode_state(game):
+    """تحويل حالة اللعبة الى bytes قابلة للتخزين"""
+    return snapshot.dumps(game)
+
+
+def decode_state(data, line_api):
+    """استرجاع كائن اللعبة من bytes"""
+    return snapshot.loads(bytes(data), line_api)
+
+
+def _versioned(game, version):
+    # رقم نسخة اللعبة في المخزن عند قراءتها - set_game وpop_game يكتبان بشرطه
+    game._session_version = version
+    return game
+
+
+class SessionStore:
+    """واجهة مخزن الجلسات: الألعاب النشطة ومجموعات المستخدمين والثيمات"""
+
+    name = "base"
+
+    def get_game(self, group_id, line_api):
+        raise NotImplementedError
+
+    def set_game(self, group_id, game):
+        """حفظ لعبة قرئت من المخزن (get_game او get_or_create) بعد تعديلها
+
+        يرجع False اذا تغيرت او حذفت منذ قراءتها (طلب في worker آخر، ايقاف،
+        انتهاء المهلة) - القارئ يعيد قراءتها ويطبق التعديل من جديد.
+        """
+        raise NotImplementedError
+
+    def pop_game(self, group_id, game=None):
+        """حذف اللعبة - مع game: فقط اذا لم تتغير منذ قراءتها"""
+        raise NotImplementedError
+
+    def release(self):
+        """اغلاق اتصالات الخيط الحالي - في الـ master قبل fork"""
+
+    def has_game(self, group_id):
+        """هل توجد لعبة نشطة - بدون استرجاع حالتها"""
+        return self.get_game(group_id, None) is not None
+
+    def get_or_create(self, group_id, factory, line_api):
+        """اللعبة النشطة او لعبة جديدة من factory() - ترجع (game, created)
+
+        لا تستبدل لعبة قائمة حتى لو بدأ طلبان لنفس المجموعة في نفس الوقت.
+        """
+        raise NotImplementedError
+
+    def count_games(self):
+        raise NotImplementedError
+
+    def touch_game(self, group_id):
+        """تمديد مهلة اللعبة من آخر نشاط - يرجع الموعد الجديد، او None اذا لم يتغير"""
+        raise NotImplementedError
+
+    def game_deadline(self, group_id):
+        raise NotImplementedError
+
+    def expire_game(self, group_id, line_api):
+        """حذف اللعبة اذا انتهت مهلتها
+
+        يرجع (game, None) لمن حذفها فقط، او (None, الموعد الحالي) اذا مددت،
+        او (None, None) اذا لم تعد موجودة.
+        """
+        raise NotImplementedError
+
+    def expired_groups(self, now):
+        """المجموعات التي انتهت مهلة ألعابها ولم تحذف بعد"""
+        raise NotImplementedError
+
+    def _throttled(self, group_id, now):
+        touched = self._touched.get(group_id)
+        if touched is not None and now - touched < TOUCH_INTERVAL:
+            return True
+        self._touched[group_id] = now
+        # الألعاب التي تنتهي في worker آخر لا تحذف من هنا - المداخل الأقدم من
+        # TOUCH_INTERVAL لا تمنع شيئا فتحذف مرة كل فترة حتى لا يكبر القاموس
+        if now - self._pruned >= TOUCH_INTERVAL:
+            self._pruned = now
+            cutoff = now - TOUCH_INTERVAL
+            self._touched = {gid: at for gid, at in self._touched.copy().items() if at > cutoff}
+        return False
+
+    def add_member(self, set_name, user_id):
+        raise NotImplementedError
+
+    def discard_member(self, set_name, user_id):
+        raise NotImplementedError
+
+    def is_member(self, set_name, user_id):
+        raise NotImplementedError
+
+    def count_members(self, set_name):
+        raise NotImplementedError
+
+    def get_theme(self, user_id):
+        raise NotImplementedError
+
+    def set_theme(self, user_id, theme):
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """المخزن الافتراضي داخل العملية - يحتفظ بالكائنات الحية بدون تسلسل
+
+    القراءة بدون قفل (عمليات dict المفردة ذرية في CPython). الكتابة على
+    الألعاب تأخذ قفلا واحدا من SESSION_STRIPES حسب المجموعة، فالمجموعات
+    المختلفة لا تنتظر بعضها.
+    """
+
+    name = "memory"
+
+    def __init__(self, stripes=SESSION_STRIPES, ttl=DEFAULT_GAME_TTL):
+        self.ttl = ttl
+        self._stripes = tuple(Lock() for _ in range(max(1, stripes)))
+        self._games = {}
+        # موعد انتهاء كل لعبة من آخر نشاط
+        self._deadlines = {}
+        # اسم المجموعة -> dict (user_id -> True)
+        self._sets = {}
+        self._themes = {}
+
+    def _stripe(self, group_id):
+        return self._stripes[hash(group_id) % len(self._stripes)]
+
+    def get_game(self, group_id, line_api):
+        return self._games.get(group_id)
+
+    def set_game(self, group_id, game):
+        # الكائن نفسه مشترك: التعديل تم عليه، ويبقى التأكد انه لم يحذف او يستبدل
+        with self._stripe(group_id):
+            if self._games.get(group_id) is not game:
+                return False
+            self._deadlines[group_id] = time.time() + self.ttl
+            return True
+
+    def pop_game(self, group_id, game=None):
+        with self._stripe(group_id):
+            if game is not None and self._games.get(group_id) is not game:
+                return False
+            self._deadlines.pop(group_id, None)
+            return self._games.pop(group_id, None) is not None
+
+    def get_or_create(self, group_id, factory, line_api):
+        with self._stripe(group_id):
+            game = self._games.get(group_id)
+            if game is not None:
+                return game, False
+            game = self._games[group_id] = factory()
+            self._deadlines[group_id] = time.time() + self.ttl
+            return game, True
+
+    def has_game(self, group_id):
+        return group_id in self._games
+
+    def count_games(self):
+        return len(self._games)
+
+    def touch_game(self, group_id):
+        # تحت قفل المجموعة: لا يعاد موعد للعبة حذفتها expire_game او pop_game للتو
+        with self._stripe(group_id):
+            if group_id not in self._games:
+                return None
+            deadline = self._deadlines[group_id] = time.time() + self.ttl
+            return deadline
+
+    def game_deadline(self, group_id):
+        return self._deadlines.get(group_id) if group_id in self._games else None
+
+    def expire_game(self, group_id, line_api):
+        with self._stripe(group_id):
+            game = self._games.get(group_id)
+            deadline = self._deadlines.get(group_id)
+            if game is None:
+                self._deadlines.pop(group_id, None)
+                return None, None
+            if deadline is not None and deadline > time.time():
+                return None, deadline
+            del self._games[group_id]
+            self._deadlines.pop(group_id, None)
+            return game, None
+
+    def expired_groups(self, now):
+        # نسخة من المواعيد بدل المرور عليها وهي تتغير
+        return [gid for gid, deadline in self._deadlines.copy().items() if deadline <= now]
+
+    def _members(self, set_name):
+        members = self._sets.get(set_name)
+        if members is None:
+            members = self._sets.setdefault(set_name, {})
+        return members
+
+    def add_member(self, set_name, user_id):
+        self._members(set_name)[user_id] = True
+
+    def discard_member(self, set_name, user_id):
+        self._members(set_name).pop(user_id, None)
+
+    def is_member(self, set_name, user_id):
+        return user_id in self._members(set_name)
+
+    def count_members(self, set_name):
+        return len(self._members(set_name))
+
+    def get_theme(self, user_id):
+        return self._themes.get(user_id)
+
+    def set_theme(self, user_id, theme):
+        self._themes[user_id] = theme
+
+
+class SQLiteSessionStore(SessionStore):
+    """مخزن مشترك بين workers عبر ملف SQLite (يفضل على /dev/shm)"""
+
+    name = "sqlite"
+
+    def __init__(self, path, ttl=DEFAULT_GAME_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._touched = {}
+        self._pruned = 0.0
+        with self._conn() as c:
+            c.execute('''CREATE TABLE IF NOT EXISTS games (
+                group_id TEXT PRIMARY KEY,
+                state BLOB NOT NULL,
+                started REAL NOT NULL,
+                expires REAL NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0
+            )''')
+            try:
+                c.execute('ALTER TABLE games ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+            except sqlite3.OperationalError:
+                pass
+            c.execute('CREATE INDEX IF NOT EXISTS idx_games_expires ON games (expires)')
+            c.execute('''CREATE TABLE IF NOT EXISTS members (
+                set_name TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                PRIMARY KEY (set_name, user_id)
+            ) WITHOUT ROWID''')
+            c.execute('''CREATE TABLE IF NOT EXISTS themes (
+                user_id TEXT PRIMARY KEY,
+                theme TEXT NOT NULL
+            ) WITHOUT ROWID''')
+
+    def _conn(self):
+        # اتصال لكل خيط ولكل عملية (آمن بعد fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            db_dir = os.path.dirname(self.path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def release(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+    def get_game(self, group_id, line_api):
+        row = self._conn().execute(
+            'SELECT state, version FROM games WHERE group_id = ? AND expires > ?',
+            (group_id, time.time())
+        ).fetchone()
+        if not row:
+            return None
+        try:
+            return _versioned(decode_state(row[0], line_api), row[1])
+        except Exception as e:
+            logger.error(f"Corrupt session for {group_id}: {e}")
+            self.pop_game(group_id)
+            return None
+
+    def set_game(self, group_id, game):
+        # compare-and-swap على رقم النسخة: لا يكتب فوق تعديل worker آخر ولا يعيد لعبة حذفت
+        row = self._conn().execute(
+            'UPDATE games SET state = ?, expires = ?, version = version + 1 '
+            'WHERE group_id = ? AND version = ? RETURNING version',
+            (encode_state(game), time.time() + self.ttl, group_id,
+             getattr(game, '_session_version', None))
+        ).fetchone()
+        if row is None:
+            return False
+        _versioned(game, row[0])
+        return True
+
+    def pop_game(self, group_id, game=None):
+        self._touched.pop(group_id, None)
+        if game is None:
+            cur = self._conn().execute('DELETE FROM games WHERE group_id = ?', (group_id,))
+        else:
+            cur = self._conn().execute(
+                'DELETE FROM games WHERE group_id = ? AND version = ?',
+                (group_id, getattr(game, '_session_version', None))
+            )
+        return cur.rowcount > 0
+
+    def get_or_create(self, group_id, factory, line_api):
+        game = self.get_game(group_id, line_api)
+        if game is not None:
+            return game, False
+        game = factory()
+        started = getattr(game, '_started_at', None) or datetime.now()
+        now = time.time()
+        conn = self._conn()
+        # لعبة منتهية الصلاحية لا تمنع بدء لعبة جديدة
+        conn.execute('DELETE FROM games WHERE group_id = ? AND expires <= ?', (group_id, now))
+        cur = conn.execute(
+            'INSERT OR IGNORE INTO games (group_id, state, started, expires, version) VALUES (?, ?, ?, ?, 0)',
+            (group_id, encode_state(game), started.timestamp(), now + self.ttl)
+        )
+        if cur.rowcount:
+            return _versioned(game, 0), True
+        # worker آخر بدأ لعبة في نفس اللحظة
+        existing = self.get_game(group_id, line_api)
+        return (existing, False) if existing is not None else (game, False)
+
+    def has_game(self, group_id):
+        return self._conn().execute(
+            'SELECT 1 FROM games WHERE group_id = ? AND expires > ?', (group_id, time.time())
+        ).fetchone() is not None
+
+    def count_games(self):
+        return self._conn().execute(
+            'SELECT COUNT(*) FROM games WHERE expires > ?', (time.time(),)
+        ).fetchone()[0]
+
+    def touch_game(self, group_id):
+        now = time.time()
+        if self._throttled(group_id, now):
+            return None
+        deadline = now + self.ttl
+        cur = self._conn().execute(
+            'UPDATE games SET expires = ? WHERE group_id = ? AND expires > ?',
+            (deadline, group_id, now)
+        )
+        return deadline if cur.rowcount else None
+
+    def game_deadline(self, group_id):
+        row = self._conn().execute(
+            'SELECT expires FROM games WHERE group_id = ?', (group_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def expire_game(self, group_id, line_api):
+        # DELETE ... RETURNING: عملية واحدة فقط تحصل على اللعبة المنتهية
+        row = self._conn().execute(
+            'DELETE FROM games WHERE group_id = ? AND expires <= ? RETURNING state',
+            (group_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None, self.game_deadline(group_id)
+        self._touched.pop(group_id, None)
+        try:
+            return decode_state(row[0], line_api), None
+        except Exception as e:
+            logger.error(f"Corrupt session for {group_id}: {e}")
+            return None, None
+
+    def expired_groups(self, now):
+        return [row[0] for row in self._conn().execute(
+            'SELECT group_id FROM games WHERE expires <= ?', (now,)
+        )]
+
+    def add_member(self, set_name, user_id):
+        self._conn().execute(
+            'INSERT OR IGNORE INTO members (set_name, user_id) VALUES (?, ?)', (set_name, user_id)
+        )
+
+    def discard_member(self, set_name, user_id):
+        self._conn().execute(
+            'DELETE FROM members WHERE set_name = ? AND user_id = ?', (set_name, user_id)
+        )
+
+    def is_member(self, set_name, user_id):
+        return self._conn().execute(
+            'SELECT 1 FROM members WHERE set_name = ? AND user_id = ?', (set_name, user_id)
+        ).fetchone() is not None
+
+    def count_members(self, set_name):
+        return self._conn().execute(
+            'SELECT COUNT(*) FROM members WHERE set_name = ?', (set_name,)
+        ).fetchone()[0]
+
+    def get_theme(self, user_id):
+        row = self._conn().execute(
+            'SELECT theme FROM themes WHERE user_id = ?', (user_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_theme(self, user_id, theme):
+        self._conn().execute(
+            'INSERT OR REPLACE INTO themes (user_id, theme) VALUES (?, ?)', (user_id, theme)
+        )
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisConnection:
+    """عميل RESP2 بسيط - يكفي لأوامر المخزن بدون مكتبة redis"""
+
+    def __init__(self, host, port, db=0, password=None, timeout=5):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.reader = self.sock.makefile('rb')
+        if password:
+            self.execute('AUTH', password)
+        if db:
+            self.execute('SELECT', db)
+
+    @staticmethod
+    def _encode(args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def execute(self, *args):
+        self.sock.sendall(self._encode(args))
+        return self._read()
+
+    def pipeline(self, *commands):
+        """ارسال عدة أوامر دفعة واحدة وقراءة ردودها بالترتيب"""
+        self.sock.sendall(b''.join(self._encode(args) for args in commands))
+        replies = []
+        error = None
+        for _ in commands:
+            try:
+                replies.append(self._read())
+            except RedisError as e:
+                if str(e) == "Connection closed":
+                    raise
+                # بقية الردود تقرأ حتى لا تختلط بالأوامر التالية
+                error = error or e
+                replies.append(None)
+        if error is not None:
+            raise error
+        return replies
+
+    def _read(self):
+        line = self.reader.readline()
+        if not line:
+            raise RedisError("Connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode('utf-8')
+        if kind == b'-':
+            raise RedisError(rest.decode('utf-8'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length == -1:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            count = int(rest)
+            if count == -1:
+                return None
+            return [self._read() for _ in range(count)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisSessionStore(SessionStore):
+    """مخزن مشترك عبر بروتوكول Redis - يعمل مع أي خادم متوافق"""
+
+    name = "redis"
+
+    def __init__(self, url, ttl=DEFAULT_GAME_TTL, prefix='botmesh:'):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.password = parsed.password
+        self.ttl = ttl
+        self.prefix = prefix
+        self._local = threading.local()
+        self._touched = {}
+        self._pruned = 0.0
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = RedisConnection(self.host, self.port, self.db, self.password)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _execute(self, *args):
+        conn = self._connection()
+        try:
+            return conn.execute(*args)
+        except (OSError, RedisError) as e:
+            if isinstance(e, RedisError) and str(e) != "Connection closed":
+                raise
+            # إعادة الاتصال مرة واحدة عند انقطاع الاتصال
+            conn.close()
+            self._local.conn = None
+            conn = RedisConnection(self.host, self.port, self.db, self.password)
+            self._local.conn = conn
+            return conn.execute(*args)
+
+    def release(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+    def _key(self, *parts):
+        return self.prefix + ':'.join(parts)
+
+    @staticmethod
+    def _pack(game, version):
+        return _REDIS_VERSION.pack(version) + encode_state(game)
+
+    @staticmethod
+    def _version(data):
+        # قيمة بدون رقم نسخة (كتبت قبل اضافته) تبدأ بـ MAGIC وتعامل كنسخة 0
+        if data[0] == snapshot.MAGIC:
+            return 0, data
+        return _REDIS_VERSION.unpack_from(data)[0], data[_REDIS_VERSION.size:]
+
+    def _decode(self, data, line_api):
+        version, state = self._version(data)
+        return _versioned(decode_state(state, line_api), version)
+
+    def _compare_and_apply(self, group_id, game, *commands):
+        """تنفيذ commands ذريا فقط اذا بقيت نسخة اللعبة كما قرئت (WATCH/MULTI/EXEC)
+
+        يرجع ردود الأوامر، او None اذا تغيرت اللعبة او حذفت.
+        """
+        key = self._key('game', group_id)
+        version = getattr(game, '_session_version', None)
+        conn = self._connection()
+        try:
+            data = conn.pipeline(('WATCH', key), ('GET', key))[1]
+            if data is None or self._version(data)[0] != version:
+                conn.execute('UNWATCH')
+                return None
+            # EXEC يرجع None اذا كتب طلب آخر على المفتاح بعد WATCH
+            return conn.pipeline(('MULTI',), *commands, ('EXEC',))[-1]
+        except (OSError, RedisError) as e:
+            if isinstance(e, RedisError) and str(e) != "Connection closed":
+                raise
+            # حالة WATCH ضاعت مع الاتصال - القارئ يعيد المحاولة باتصال جديد
+            conn.close()
+            self._local.conn = None
+            return None
+
+    def get_game(self, group_id, line_api):
+        data = self._execute('GET', self._key('game', group_id))
+        if data is None:
+            self._execute('ZREM', self._key('games'), group_id)
+            return None
+        try:
+            return self._decode(data, line_api)
+        except Exception as e:
+            logger.error(f"Corrupt session for {group_id}: {e}")
+            self.pop_game(group_id)
+            return None
+
+    def set_game(self, group_id, game):
+        version = getattr(game, '_session_version', None)
+        if version is None:
+            return False
+        deadline = time.time() + self.ttl
+        replies = self._compare_and_apply(
+            group_id, game,
+            ('SET', self._key('game', group_id), self._pack(game, version + 1),
+             'EX', self.ttl + REDIS_EXPIRY_GRACE),
+            # ترتيب ZSET الألعاب حسب موعد الانتهاء
+            ('ZADD', self._key('games'), deadline, group_id)
+        )
+        if replies is None:
+            return False
+        _versioned(game, version + 1)
+        return True
+
+    def pop_game(self, group_id, game=None):
+        self._touched.pop(group_id, None)
+        if game is not None:
+            replies = self._compare_and_apply(
+                group_id, game,
+                ('DEL', self._key('game', group_id)),
+                ('ZREM', self._key('games'), group_id)
+            )
+            return replies is not None and replies[0] > 0
+        removed = self._execute('DEL', self._key('game', group_id))
+        self._execute('ZREM', self._key('games'), group_id)
+        return removed > 0
+
+    def get_or_create(self, group_id, factory, line_api):
+        game = self.get_game(group_id, line_api)
+        if game is not None:
+            return game, False
+        game = factory()
+        created = self._execute(
+            'SET', self._key('game', group_id), self._pack(game, 0),
+            'EX', self.ttl + REDIS_EXPIRY_GRACE, 'NX'
+        )
+        if created is not None:
+            self._execute('ZADD', self._key('games'), time.time() + self.ttl, group_id)
+            return _versioned(game, 0), True
+        existing = self.get_game(group_id, line_api)
+        return (existing, False) if existing is not None else (game, False)
+
+    def has_game(self, group_id):
+        return self._execute('EXISTS', self._key('game', group_id)) == 1
+
+    def count_games(self):
+        return self._execute('ZCARD', self._key('games'))
+
+    def touch_game(self, group_id):
+        now = time.time()
+        if self._throttled(group_id, now):
+            return None
+        if self._execute('EXPIRE', self._key('game', group_id), self.ttl + REDIS_EXPIRY_GRACE) != 1:
+            return None
+        self._execute('ZADD', self._key('games'), now + self.ttl, group_id)
+        return now + self.ttl
+
+    def game_deadline(self, group_id):
+        # مدة بقاء المفتاح هي المرجع - ZSET للبحث فقط
+        remaining = self._execute('PTTL', self._key('game', group_id))
+        if remaining is None or remaining < 0:
+            return None
+        return time.time() + remaining / 1000 - REDIS_EXPIRY_GRACE
+
+    def expire_game(self, group_id, line_api):
+        deadline = self.game_deadline(group_id)
+        if deadline is None:
+            self._execute('ZREM', self._key('games'), group_id)
+            return None, None
+        if deadline > time.time():
+            self._execute('ZADD', self._key('games'), deadline, group_id)
+            return None, deadline
+        # ZREM يرجع 1 لعملية واحدة فقط - هي التي تحذف اللعبة وتبلغ المجموعة
+        if self._execute('ZREM', self._key('games'), group_id) != 1:
+            return None, None
+        self._touched.pop(group_id, None)
+        data = self._execute('GET', self._key('game', group_id))
+        self._execute('DEL', self._key('game', group_id))
+        if data is None:
+            return None, None
+        try:
+            return self._decode(data, line_api), None
+        except Exception as e:
+            logger.error(f"Corrupt session for {group_id}: {e}")
+            return None, None
+
+    def expired_groups(self, now):
+        expired = self._execute('ZRANGEBYSCORE', self._key('games'), '-inf', now)
+        return [gid.decode('utf-8') for gid in expired or []]
+
+    def add_member(self, set_name, user_id):
+        self._execute('SADD', self._key(set_name), user_id)
+
+    def discard_member(self, set_name, user_id):
+        self._execute('SREM', self._key(set_name), user_id)
+
+    def is_member(self, set_name, user_id):
+        return self._execute('SISMEMBER', self._key(set_name), user_id) == 1
+
+    def count_members(self, set_name):
+        return self._execute('SCARD', self._key(set_name))
+
+    def get_theme(self, user_id):
+        theme = self._execute('HGET', self._key('themes'), user_id)
+        return theme.decode('utf-8') if theme else None
+
+    def set_theme(self, user_id, theme):
+        self._execute('HSET', self._key('themes'), user_id, theme)
+
+
+def create_session_store(url=None, ttl=DEFAULT_GAME_TTL):
+    """اختيار المخزن حسب SESSION_STORE: memory | sqlite[:///path] | redis://host:port/db"""
+    url = url or os.getenv('SESSION_STORE', 'memory')
+
+    if url.startswith('redis://'):
+        store = RedisSessionStore(url, ttl=ttl)
+    elif url.startswith('sqlite'):
+        path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else ''
+        if not path:
+            shm = '/dev/shm'
+            path = os.path.join(shm if os.path.isdir(shm) else 'data', 'botmesh_sessions.db')
+        store = SQLiteSessionStore(path, ttl=ttl)
+    else:
+        store = MemorySessionStore(ttl=ttl)
+
+    logger.info(f"Session store: {store.name}")
+    return store
@@ -0,0 +1,118 @@
+"""make stress: اجابات متزامنة كثيرة على مجموعة واحدة من عدة عمليات
+
+كل عملية (مثل worker في gunicorn) تستورد app بمخزن sqlite مشترك، وترسل من
+عدة خيوط الاجابة الصحيحة للسؤال الحالي عبر event_dispatcher كما في webhook.
+الـ dispatcher يرتب أحداث المجموعة داخل العملية فقط، وبين العمليات يمنع
+set_game المشروط بالنسخة الكتابة فوق تعديل عملية اخرى. لذلك يجب أن يحسب كل
+سؤال لاعبا واحدا فقط، وأن تسجل نقاط اللعبة مرة واحدة عند نهايتها.
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix='botmesh-stress-')
+os.environ.setdefault('LINE_CHANNEL_ACCESS_TOKEN', 'stress')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'stress')
+os.environ['DB_PATH'] = os.path.join(WORKDIR, 'bot.db')
+os.environ['SESSION_STORE'] = 'sqlite:///' + os.path.join(WORKDIR, 'sessions.db')
+os.environ['CONTENT_POLL_SECONDS'] = '0'
+
+PROCESSES = int(os.getenv('STRESS_PROCESSES', '4'))
+THREADS = int(os.getenv('STRESS_THREADS', '8'))
+QUESTIONS = int(os.getenv('STRESS_QUESTIONS', '300'))
+PLAYERS = 20
+GROUP_ID = 'stress-group'
+
+
+def current_answer(game):
+    answer = game.current_answer
+    return answer[0] if isinstance(answer, (list, tuple)) else answer
+
+
+def answer_until_over(app, sent):
+    rnd = random.Random()
+    while True:
+        game = app.sessions.get_game(GROUP_ID, None)
+        if game is None:
+            return
+        user_id = f'U{rnd.randrange(PLAYERS)}'
+        app.event_dispatcher.run(
+            GROUP_ID, app.process_message, current_answer(game), user_id, GROUP_ID, None
+        )
+        sent.append(1)
+
+
+def worker(app, write_fd):
+    sent = []
+    threads = [threading.Thread(target=answer_until_over, args=(app, sent)) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # النتائج تكتب في دفعات - قبل الخروج تكتب كلها
+    app.DB.results.flush()
+    os.write(write_fd, f"{len(sent)}\n".encode())
+
+
+def main():
+    import app
+    from games import RiddleGame
+
+    for i in range(PLAYERS):
+        app.DB.register_user(f'U{i}', f'player{i}')
+    game = RiddleGame(None)
+    game.start_game()
+    game.questions_count = QUESTIONS
+    app.sessions.get_or_create(GROUP_ID, lambda: game, None)
+
+    read_fd, write_fd = os.pipe()
+    started = time.perf_counter()
+    pids = []
+    for _ in range(PROCESSES):
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            try:
+                worker(app, write_fd)
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    os.close(write_fd)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    elapsed = time.perf_counter() - started
+    with os.fdopen(read_fd) as f:
+        sent = sum(int(line) for line in f.read().split())
+
+    with app.DB.conn() as c:
+        points, games = c.execute('SELECT SUM(points), SUM(games) FROM users').fetchone()
+        rows = c.execute('SELECT COUNT(*) FROM history').fetchone()[0]
+        scorers = c.execute('SELECT COUNT(*) FROM users WHERE points > 0').fetchone()[0]
+
+    print(f"{PROCESSES} processes x {THREADS} threads: {sent} answers in {elapsed:.1f} s "
+          f"({sent / elapsed:.0f}/s)")
+    print(f"questions {QUESTIONS}, points {points}, players credited {scorers}, "
+          f"games {games}, history rows {rows}")
+
+    failures = []
+    if app.sessions.has_game(GROUP_ID):
+        failures.append("game did not finish")
+    if points != QUESTIONS:
+        failures.append(f"expected {QUESTIONS} points - each question must score exactly once")
+    if games != scorers or rows != scorers:
+        failures.append("each player must be credited exactly once when the game ends")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    try:
+        status = main()
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    sys.exit(status)
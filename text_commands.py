@@ -1,12 +1,51 @@
 import random
 import os
+import itertools
+from array import array
+import logging
 from threading import Lock
 
+import text_pack
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class _Pool:
+    """سحب بدون تكرار حتى ينتهي المحتوى: عداد + ترتيب عشوائي لكل دورة
+
+    next() على itertools.count ذري تحت الـ GIL فلا حاجة لـ lock. ترتيب كل
+    دورة مشتق من seed ورقم الدورة، فالخيوط التي تصل لنفس الدورة تحسب نفس
+    الترتيب.
+    """
+
+    __slots__ = ('size', 'seed', '_counter', '_order')
+
+    def __init__(self, size):
+        self.size = size
+        self.seed = random.getrandbits(32)
+        self._counter = itertools.count()
+        self._order = (-1, ())
+
+    def next_index(self):
+        cycle, pos = divmod(next(self._counter), self.size)
+        current, order = self._order
+        if current != cycle:
+            order = list(range(self.size))
+            random.Random(self.seed + cycle).shuffle(order)
+            # array بدل list: 4 بايت لكل سطر في كل pool (الـ pools لكل مجموعة)
+            order = array('I', order)
+            self._order = (cycle, order)
+        return order[pos]
+
 
 class TextCommands:
     _data = {}
-    _remaining = {}
-    _lock = Lock()  # إصلاح: lock لمنع race condition عند الاستخدام المتزامن
+    # الأمر -> mtime الملف النصي والملف المبني عند آخر تحميل
+    _signatures = {}
+    # (المجموعة، الأمر) -> _Pool
+    _pools = {}
+    _lock = Lock()  # لانشاء الـ pools فقط - السحب نفسه بدون lock
 
     _files = {
         'questions':   'games/questions.txt',
@@ -24,32 +63,87 @@ class TextCommands:
     @classmethod
     def load_all(cls):
         for key, path in cls._files.items():
+            cls._load_key(key, path)
+        with cls._lock:
+            cls._pools = {}
+
+    @classmethod
+    def _load_key(cls, key, path):
+        cls._signatures[key] = cls._signature(key, path)
+        try:
+            if os.path.exists(path):
+                cls._data[key] = cls._load(key, path) or (f"المحتوى غير متوفر لـ {key}",)
+            else:
+                cls._data[key] = (f"المحتوى غير متوفر لـ {key}",)
+        except Exception as e:
+            logger.error(f"Text load error for {key}: {e}")
+            cls._data[key] = (f"خطأ في تحميل {key}",)
+
+    @staticmethod
+    def _signature(key, path):
+        signature = []
+        for p in (path, text_pack.pack_path(key)):
             try:
-                if os.path.exists(path):
-                    with open(path, 'r', encoding='utf-8') as f:
-                        lines = [line.strip() for line in f if line.strip()]
-                    cls._data[key] = lines
-                else:
-                    cls._data[key] = [f"المحتوى غير متوفر لـ {key}"]
-                cls._remaining[key] = cls._data[key].copy()
-            except Exception as e:
-                cls._data[key] = [f"خطأ في تحميل {key}"]
-                cls._remaining[key] = cls._data[key].copy()
+                signature.append(os.path.getmtime(p))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
 
     @classmethod
-    def get_random(cls, cmd):
+    def reload(cls):
+        """اعادة تحميل الأوامر التي تغير ملفها او ملفها المبني - ترجع أسماءها
+
+        المحتوى الجديد يستبدل بتعيين واحد، والـ pools تعاد لحجمه عند أول سحب.
+        """
+        changed = []
+        for key, path in cls._files.items():
+            if cls._signature(key, path) != cls._signatures.get(key):
+                cls._load_key(key, path)
+                changed.append(key)
+        return changed
+
+    @staticmethod
+    def _load(key, path):
+        # الملف المبني (make texts) يقرأ عبر mmap، وبدونه يقرأ النص كاملا
+        packed = text_pack.pack_path(key)
+        if text_pack.is_fresh(path, packed):
+            try:
+                return text_pack.PackedLines(packed)
+            except (OSError, text_pack.TextPackError) as e:
+                logger.error(f"Text pack error for {key}: {e}")
+        with open(path, 'r', encoding='utf-8') as f:
+            return tuple(line.strip() for line in f if line.strip())
+
+    @classmethod
+    def _pool(cls, cmd, group_id, size):
+        key = (group_id if Config.TEXT_POOLS_PER_GROUP else None, cmd)
+        pool = cls._pools.get(key)
+        # pool بحجم مختلف: المحتوى اعيد تحميله، فتبدأ دورة جديدة
+        if pool is None or pool.size != size:
+            with cls._lock:
+                pool = cls._pools.get(key)
+                if pool is None or pool.size != size:
+                    # حذف أقدم pool: المجموعة تبدأ دورة جديدة فقط
+                    if pool is None and len(cls._pools) >= Config.TEXT_POOLS_MAX:
+                        del cls._pools[next(iter(cls._pools))]
+                    pool = cls._pools[key] = _Pool(size)
+        return pool
+
+    @classmethod
+    def get_random(cls, cmd, group_id=None):
         if not cls._data:
             cls.load_all()
 
-        if cmd not in cls._data:
+        lines = cls._data.get(cmd)
+        if lines is None:
             return "لا يوجد محتوى"
 
-        # إصلاح: lock لضمان أمان الخيوط
-        with cls._lock:
-            if not cls._remaining.get(cmd):
-                cls._remaining[cmd] = cls._data[cmd].copy()
+        return lines[cls._pool(cmd, group_id, len(lines)).next_index()]
 
-            choice = random.choice(cls._remaining[cmd])
-            cls._remaining[cmd].remove(choice)
-
-        return choice
+    @classmethod
+    def stats(cls):
+        return {
+            'pools': len(cls._pools),
+            'per_group': Config.TEXT_POOLS_PER_GROUP,
+            'packed': sum(isinstance(lines, text_pack.PackedLines) for lines in cls._data.values())
+        }
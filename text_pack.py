@@ -0,0 +1,88 @@
+import mmap
+import os
+import struct
+
+# ملف نصوص مضغوط مع فهرس للأسطر:
+#   MAGIC | VERSION | عدد الأسطر (u32) | offsets (u32 × (count + 1)) | نص UTF-8
+# السطر i هو data[offsets[i]:offsets[i + 1]] - الأسطر الفارغة تحذف عند البناء
+MAGIC = b'MTXT'
+VERSION = 1
+_HEADER = struct.Struct('<4sBxxxI')
+
+BUILD_DIR = os.getenv('TEXTS_BUILD_DIR', 'build/texts')
+
+
+class TextPackError(ValueError):
+    pass
+
+
+def pack_path(key):
+    return os.path.join(BUILD_DIR, f'{key}.bin')
+
+
+def compile_file(src, dst):
+    """بناء ملف الأسطر المفهرس من ملف نصي - يكتب ملفا مؤقتا ثم يستبدل"""
+    with open(src, 'r', encoding='utf-8') as f:
+        lines = [line.strip().encode('utf-8') for line in f if line.strip()]
+
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+
+    os.makedirs(os.path.dirname(dst) or '.', exist_ok=True)
+    tmp = f'{dst}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(lines)))
+        f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        f.writelines(lines)
+    os.replace(tmp, dst)
+    return len(lines)
+
+
+class PackedLines:
+    """أسطر ملف مبني عبر mmap: الصفحات مشتركة بين الـ workers عبر page cache
+
+    لا يقرأ الملف كاملا - كل سطر يقتطع ويفك ترميزه عند طلبه فقط.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            raise TextPackError(f"Truncated text pack: {path}")
+        magic, version, self._count = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version > VERSION:
+            raise TextPackError(f"Not a text pack: {path}")
+        self._data_start = _HEADER.size + 4 * (self._count + 1)
+        if len(self._map) < self._data_start:
+            raise TextPackError(f"Truncated text pack: {path}")
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        start, end = struct.unpack_from('<II', self._map, _HEADER.size + 4 * index)
+        return self._map[self._data_start + start:self._data_start + end].decode('utf-8')
+
+
+def is_fresh(src, dst):
+    """الملف المبني موجود وليس أقدم من مصدره"""
+    try:
+        return os.path.getmtime(dst) >= os.path.getmtime(src)
+    except OSError:
+        return False
+
+
+def build_all(files):
+    """files: dict المفتاح -> مسار الملف النصي"""
+    for key, src in files.items():
+        if os.path.exists(src):
+            count = compile_file(src, pack_path(key))
+            print(f"{src} -> {pack_path(key)} ({count} lines)")
+
+
+if __name__ == '__main__':
+    from text_commands import TextCommands
+    build_all(TextCommands._files)
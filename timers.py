@@ -0,0 +1,89 @@
+import heapq
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryTimer:
+    """مؤقت مواعيد انتهاء لكل العملية - heap من (deadline, key)
+
+    schedule يضيف موعدا جديدا بدون حذف القديم من الـ heap، والموعد المعتمد
+    لكل مفتاح هو آخر موعد فقط. المواعيد بوقت النظام (time.time) لأنها
+    تقارن بانتهاء الجلسات في المخازن المشتركة.
+    """
+
+    def __init__(self, callback, name="expiry"):
+        self.callback = callback
+        self.name = name
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._pid = None
+        self._heap = []
+        self._deadlines = {}
+        self.fired = 0
+        self.failures = 0
+
+    def _ensure_started(self):
+        # الخيط لا ينتقل مع fork - يبدأ عند أول استخدام داخل كل عملية
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._heap = []
+            self._deadlines = {}
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name=self.name, daemon=True).start()
+
+    def schedule(self, key, deadline):
+        """استدعاء callback(key) عند deadline بدل أي موعد سابق لنفس المفتاح"""
+        self._ensure_started()
+        with self._lock:
+            self._deadlines[key] = deadline
+            heapq.heappush(self._heap, (deadline, key))
+            # المواعيد الملغاة او المستبدلة تبقى في الـ heap حتى يحين وقتها
+            if len(self._heap) > 2 * len(self._deadlines) + 64:
+                self._heap = [(d, k) for k, d in self._deadlines.items()]
+                heapq.heapify(self._heap)
+            if self._heap[0] == (deadline, key):
+                self._wake.notify()
+
+    def cancel(self, key):
+        with self._lock:
+            self._deadlines.pop(key, None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    deadline, key = heapq.heappop(self._heap)
+                    if self._deadlines.get(key) == deadline:
+                        del self._deadlines[key]
+                        due.append(key)
+                if not due:
+                    self._wake.wait(self._heap[0][0] - now if self._heap else None)
+                    continue
+
+            for key in due:
+                try:
+                    self.callback(key)
+                    self.fired += 1
+                except Exception as e:
+                    self.failures += 1
+                    logger.error(f"Expiry callback failed for {key}: {e}", exc_info=True)
+
+    def stats(self):
+        with self._lock:
+            active = self._pid == os.getpid()
+            return {
+                'scheduled': len(self._deadlines) if active else 0,
+                'heap': len(self._heap) if active else 0,
+                'next_in': round(self._heap[0][0] - time.time(), 1) if active and self._heap else None,
+                'fired': self.fired,
+                'failures': self.failures
+            }
@@ -1,5 +1,7 @@
 from linebot.v3.messaging import QuickReply, QuickReplyItem, MessageAction
 
+from line_messages import RawFlexContainer, FlexTemplate
+
 class UI:
     BUTTON_COLOR = "#F8FBFC"
     
@@ -18,6 +20,37 @@ class UI:
         }
     }
 
+    # محتوى Flex جاهز لكل (قالب، ثيم، params) - القوالب لا تتغير اثناء التشغيل
+    _rendered = {}
+    _templates = {}
+    _quick_reply = None
+
+    # موقع سطر "مرحبا {name}" داخل body في بطاقة welcome
+    WELCOME_NAME_SLOT = 1
+
+    @staticmethod
+    def render(template, theme="light", *params):
+        """محتوى Flex متحقق منه مرة واحدة فقط لكل قالب وثيم"""
+        key = (template, theme, params)
+        container = UI._rendered.get(key)
+        if container is None:
+            container = RawFlexContainer.validated(getattr(UI, template)(*params, theme=theme))
+            UI._rendered[key] = container
+        return container
+
+    @staticmethod
+    def welcome_container(name, registered, theme="light"):
+        """بطاقة welcome من قالب محفوظ مع تبديل الاسم فقط"""
+        key = (theme, registered)
+        template = UI._templates.get(key)
+        if template is None:
+            template = FlexTemplate(
+                UI.welcome("", registered, theme),
+                {"greeting": ("body", "contents", UI.WELCOME_NAME_SLOT, "text")}
+            )
+            UI._templates[key] = template
+        return template.render(greeting=f"مرحبا {name}")
+
     @staticmethod
     def _c(theme):
         return UI.THEMES.get(theme, UI.THEMES["light"])
@@ -32,13 +65,17 @@ class UI:
 
     @staticmethod
     def get_quick_reply():
+        """QuickReply واحد لكل العملية - يبنى مرة واحدة ولا يعدل"""
+        if UI._quick_reply is not None:
+            return UI._quick_reply
         items = [
             ("بداية", "بداية"), ("العاب", "العاب"), ("سؤال", "سؤال"),
             ("منشن", "منشن"), ("تحدي", "تحدي"), ("اعتراف", "اعتراف"),
             ("مجهول", "مجهول"), ("خاص", "خاص"), ("اقتباس", "اقتباس"),
             ("موقف", "موقف"), ("نصيحة", "نصيحة"), ("مساعدة", "مساعدة")
         ]
-        return QuickReply(items=[QuickReplyItem(action=MessageAction(label=l, text=t)) for l, t in items])
+        UI._quick_reply = QuickReply(items=[QuickReplyItem(action=MessageAction(label=l, text=t)) for l, t in items])
+        return UI._quick_reply
 
     @staticmethod
     def welcome(name, registered, theme="light"):
@@ -176,7 +213,7 @@ class UI:
     def help_card(theme="light"):
         c = UI._c(theme)
         sections = [
-            {"title": "الاوامر الاساسية", "items": ["بداية - القائمة الرئيسية", "تسجيل - تسجيل اسمك", "نقاطي - احصائياتك", "الصدارة - قائمة المتصدرين", "ثيم - تغيير المظهر", "انسحب - الخروج من اللعبة"]},
+            {"title": "الاوامر الاساسية", "items": ["بداية - القائمة الرئيسية", "تسجيل - تسجيل اسمك", "نقاطي - احصائياتك", "الصدارة - قائمة المتصدرين", "صدارة المجموعة - متصدرو المجموعة", "صدارة [لعبة] - متصدرو لعبة", "ثيم - تغيير المظهر", "انسحب - الخروج من اللعبة"]},
             {"title": "اوامر النصوص", "items": ["نص - قائمة النصوص", "سؤال - اسئلة متنوعة", "تحدي - تحديات", "اعتراف - اعترافات", "منشن - منشن اصدقائك", "اقتباس - اقتباسات ملهمة", "نصيحة - نصائح يومية", "مجهول - رسائل مجهولة", "خاص - رسائل خاصة", "شعر - قصائد", "موقف - مواقف"]},
             {"title": "اوامر اللعب", "items": ["لمح - تلميح للاجابة", "جاوب - اظهار الجواب", "ايقاف - ايقاف اللعبة", "انسحب - الانسحاب من الدورة"]},
             {"title": "ملاحظات مهمة", "items": ["يجب التسجيل قبل اللعب", "النقاط تحفظ تلقائيا", "يمكن تغيير الثيم بين فاتح وداكن", "الالعاب متعددة اللاعبين في المجموعات"]}
@@ -236,9 +273,11 @@ class UI:
         }
 
     @staticmethod
-    def stats(user, theme="light"):
+    def stats(user, theme="light", best_ms=None):
         c = UI._c(theme)
         win_rate = int((user['wins'] / user['games'] * 100)) if user['games'] > 0 else 0
+        best = [{"type": "text", "text": f"أسرع كتابة: {best_ms / 1000:.2f} ث", "size": "sm",
+                 "color": c["text2"], "align": "center", "margin": "md"}] if best_ms is not None else []
         
         return {
             "type": "bubble", "size": "mega",
@@ -272,6 +311,7 @@ class UI:
                             ]}
                         ]
                     },
+                    *best,
                     {"type": "separator", "margin": "lg", "color": c["border"]},
                     {"type": "box", "layout": "horizontal", "margin": "md", "spacing": "xs",
                      "contents": [UI._btn("الصدارة", "الصدارة"), UI._btn("رجوع", "بداية")]}
@@ -280,10 +320,10 @@ class UI:
         }
 
     @staticmethod
-    def leaderboard(leaders, theme="light"):
+    def leaderboard(leaders, theme="light", title="قائمة المتصدرين"):
         c = UI._c(theme)
         contents = [
-            {"type": "text", "text": "قائمة المتصدرين", "size": "xl", "weight": "bold", "align": "center", "color": c["primary"]},
+            {"type": "text", "text": title, "size": "xl", "weight": "bold", "align": "center", "color": c["primary"]},
             {"type": "separator", "margin": "md", "color": c["border"]}
         ]
         
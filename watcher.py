@@ -0,0 +1,89 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _rss_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ReloadWatcher:
+    """خيط واحد لكل عملية يستدعي دوال اعادة التحميل كل interval ثانية
+
+    كل دالة تفحص mtime ملفاتها وترجع أسماء ما استبدلته. البناء يتم في هذا
+    الخيط والاستبدال بتعيين واحد، فمعالجة الطلبات لا تتوقف اثناء التحميل.
+    """
+
+    def __init__(self, interval, name="reload-watch"):
+        self.interval = interval
+        self.name = name
+        self._sources = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self.reloads = 0
+        self.failures = 0
+        self.last = None
+
+    def register(self, source, reload_fn):
+        self._sources[source] = reload_fn
+
+    def ensure_started(self):
+        # الخيط لا ينتقل مع fork - يبدأ عند أول طلب داخل كل عملية
+        if self._pid == os.getpid() or self.interval <= 0:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name=self.name, daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.check()
+
+    def check(self):
+        """فحص كل المصادر مرة واحدة - يرجع {المصدر: الأسماء المستبدلة}"""
+        result = {}
+        for source, reload_fn in list(self._sources.items()):
+            rss_before = _rss_kb()
+            started = time.perf_counter()
+            try:
+                changed = reload_fn()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Reload failed for {source}: {e}", exc_info=True)
+                continue
+            if not changed:
+                continue
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            rss_after = _rss_kb()
+            rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+            self.reloads += 1
+            self.last = {
+                'source': source,
+                'names': changed,
+                'ms': round(elapsed_ms, 2),
+                'rss_delta_kb': rss_delta,
+                'at': int(time.time())
+            }
+            result[source] = changed
+            logger.info(f"Reloaded {source} {changed} in {elapsed_ms:.1f} ms (RSS delta {rss_delta} KB)")
+        return result
+
+    def stats(self):
+        return {
+            'interval': self.interval,
+            'running': self._pid == os.getpid(),
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last': self.last
+        }